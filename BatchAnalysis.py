@@ -0,0 +1,232 @@
+"""Analiza wielu pozycji z plików EPD lub PGN na puli procesów. Pozycje czytane są z pliku strumieniowo (wiersz po
+wierszu, partia po partii), więc rozmiar archiwum nie ma znaczenia - w kolejce czeka najwyżej kilka zadań na proces.
+Każdy proces ma własną tablicę transpozycji i wyszukiwanie, a wyniki zapisywane są na bieżąco jako linie JSON
+(id, FEN, najlepszy ruch, wynik, głębokość, liczba węzłów) w kolejności ukończenia.
+Awaria procesu roboczego (np. zabicie przez system) nie przerywa analizy: pula jest tworzona od nowa, a zadania,
+które były wtedy w toku, wykonywane są ponownie pojedynczo - zadanie powodujące awarię trafia do wyników z błędem.
+Przykład użycia:
+    python BatchAnalysis.py games.pgn --depth 4 --workers 4 --output analysis.jsonl
+    python BatchAnalysis.py positions.epd --movetime 500 --backend list
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import ChessAI
+import Perft
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_BACKEND = "bitboard" #reprezentacja planszy w procesach roboczych (Perft.BACKENDS), bitboardy są ok. 4x szybsze
+TASKS_PER_WORKER = 4 #liczba zadań w kolejce na jeden proces - ogranicza pamięć przy dużych plikach
+PGN_RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+#stan procesu roboczego
+worker_backend = None
+
+
+"""
+Pozycje z pliku EPD: słowniki z id (operacja id lub numer wiersza), FEN i najlepszym ruchem z pliku (operacja bm)
+"""
+def read_epd(f):
+    for line_number, line in enumerate(f, 1):
+        if not line.strip() or line.startswith("#"):
+            continue
+        try:
+            gs, operations = Perft.BACKENDS["list"].from_epd(line)
+        except ValueError:
+            yield {"id": "line%d" % line_number, "fen": line.split(";", 1)[0].strip(), "error": "invalid position"}
+            continue
+        position = {"id": operations.get("id", "line%d" % line_number), "fen": gs.to_fen()}
+        if "bm" in operations:
+            position["bm"] = operations["bm"]
+        yield position
+
+
+"""
+Partie z pliku PGN jako pary (nagłówki, lista ruchów SAN). Komentarze, warianty, oznaczenia NAG i numery ruchów są pomijane
+"""
+def read_pgn_games(f):
+    headers = {}
+    movetext = []
+    for line in f:
+        line = line.strip()
+        if line.startswith("%"):
+            continue
+        if line.startswith("["):
+            if movetext: #nagłówek po zapisie ruchów rozpoczyna kolejną partię
+                yield headers, parse_movetext(" ".join(movetext))
+                headers = {}
+                movetext = []
+            match = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+        elif line:
+            movetext.append(line.split(";", 1)[0]) #komentarz do końca wiersza
+    if headers or movetext:
+        yield headers, parse_movetext(" ".join(movetext))
+
+
+def parse_movetext(text):
+    text = re.sub(r"\{[^}]*\}", " ", text)
+    while "(" in text: #warianty mogą być zagnieżdżone - usuwane od najbardziej wewnętrznych
+        stripped = re.sub(r"\([^()]*\)", " ", text)
+        if stripped == text:
+            break
+        text = stripped
+    moves = []
+    for token in text.split():
+        token = re.sub(r"^\d+\.+", "", token) #numer ruchu może być sklejony z ruchem, np. 1.e4
+        if token and not token.startswith("$") and token not in PGN_RESULTS:
+            moves.append(token)
+    return moves
+
+
+"""
+Pozycje z pliku PGN: pozycja przed każdym ruchem partii (od ply skip, co every półruchów) razem z wykonanym ruchem
+"""
+def read_pgn(f, skip=0, every=1):
+    for game_number, (headers, moves) in enumerate(read_pgn_games(f), 1):
+        if "FEN" in headers:
+            try:
+                gs = Perft.BACKENDS["list"].from_fen(headers["FEN"])
+            except ValueError:
+                yield {"id": "game%d:ply0" % game_number, "fen": headers["FEN"], "error": "invalid position"}
+                continue
+        else:
+            gs = Perft.BACKENDS["list"]()
+        for ply, san in enumerate(moves):
+            move = gs.move_from_san(san)
+            if move is None: #dalsza część partii nie może zostać odtworzona
+                yield {"id": "game%d:ply%d" % (game_number, ply), "fen": gs.to_fen(), "error": "illegal move %s" % san}
+                break
+            if ply >= skip and (ply - skip) % every == 0:
+                yield {"id": "game%d:ply%d" % (game_number, ply), "fen": gs.to_fen(), "played": move.get_chess_notation()}
+            gs.make_move(move)
+
+
+def init_worker(backend, size_mb):
+    global worker_backend
+    worker_backend = Perft.BACKENDS[backend]
+    ChessAI.set_hash_size(size_mb)
+
+
+"""
+Zadanie procesu roboczego: wyszukiwanie najlepszego ruchu dla jednej pozycji. Zwraca słownik pozycji uzupełniony o wynik
+"""
+def analyse_position(position, depth, move_time_ms):
+    result = dict(position)
+    result.update({"bestmove": None, "score": 0, "depth": 0})
+
+    def info(depth, score, nodes, seconds, pv):
+        result["depth"] = depth
+        result["score"] = score
+
+    gs = worker_backend.from_fen(position["fen"])
+    start = time.perf_counter()
+    move = ChessAI.find_best_move_iterative_deepening(gs, gs.get_valid_moves(), move_time_ms, depth, info=info)
+    result["bestmove"] = move.get_chess_notation() if move is not None else None
+    result["nodes"] = ChessAI.nodes
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+"""
+Analizuje pozycje na puli procesów i zwraca wyniki (generator) w kolejności ukończenia. Pozycje z błędem odczytu
+przekazywane są bez analizy
+"""
+def analyse(positions, workers=DEFAULT_WORKERS, depth=ChessAI.DEPTH, move_time_ms=None, backend=DEFAULT_BACKEND, size_mb=ChessAI.TT_SIZE_MB):
+    def new_pool():
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(backend, size_mb))
+
+    pool = new_pool()
+    pending = {} #future -> pozycja
+    suspects = collections.deque() #pozycje przerwane awarią procesu, wykonywane ponownie pojedynczo
+    isolated = None #pozycja wykonywana pojedynczo
+    positions = iter(positions)
+    exhausted = False
+    try:
+        while True:
+            if suspects:
+                if not pending:
+                    isolated = suspects.popleft()
+                    pending[pool.submit(analyse_position, isolated, depth, move_time_ms)] = isolated
+            else:
+                isolated = None
+                while not exhausted and len(pending) < workers * TASKS_PER_WORKER:
+                    position = next(positions, None)
+                    if position is None:
+                        exhausted = True
+                    elif "error" in position:
+                        yield position
+                    else:
+                        pending[pool.submit(analyse_position, position, depth, move_time_ms)] = position
+            if not pending:
+                break
+
+            done, not_done = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                position = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if position is isolated:
+                        yield dict(position, error="worker crashed")
+                    else:
+                        suspects.append(position)
+                except Exception as error: #błąd w zadaniu nie psuje puli - pozostałe pozycje są analizowane dalej
+                    yield dict(position, error="%s: %s" % (type(error).__name__, error))
+            if broken:
+                suspects.extend(pending.values())
+                pending.clear()
+                pool.shutdown(wait=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analiza pozycji z plików EPD/PGN na wielu procesach, wyniki jako linie JSON")
+    parser.add_argument("file", help="plik EPD lub PGN")
+    parser.add_argument("--format", choices=("epd", "pgn"), help="format pliku (domyślnie według rozszerzenia)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument("--depth", type=int, default=ChessAI.DEPTH, help="maksymalna głębokość wyszukiwania")
+    parser.add_argument("--movetime", type=int, help="limit czasu na pozycję w ms")
+    parser.add_argument("--backend", choices=sorted(Perft.BACKENDS), default=DEFAULT_BACKEND, help="reprezentacja planszy")
+    parser.add_argument("--hash", type=int, default=ChessAI.TT_SIZE_MB, help="rozmiar tablicy transpozycji procesu w MB")
+    parser.add_argument("--skip", type=int, default=0, help="PGN: pomiń pierwsze półruchy każdej partii")
+    parser.add_argument("--every", type=int, default=1, help="PGN: analizuj co n-tą pozycję")
+    parser.add_argument("--output", help="plik wynikowy (domyślnie standardowe wyjście)")
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ("pgn" if args.file.lower().endswith(".pgn") else "epd")
+    start = time.perf_counter()
+    count = errors = 0
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        with open(args.file) as f:
+            positions = read_pgn(f, args.skip, max(1, args.every)) if file_format == "pgn" else read_epd(f)
+            for result in analyse(positions, args.workers, args.depth, args.movetime, args.backend, args.hash):
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                count += 1
+                errors += "error" in result
+    finally:
+        if args.output:
+            output.close()
+    seconds = time.perf_counter() - start
+    print("%d positions (%d errors), %.2fs, %.2f positions/s, %d workers" % (
+          count, errors, seconds, count / seconds if seconds > 0 else 0, args.workers), file=sys.stderr)
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""Alternatywna reprezentacja planszy oparta na bitboardach (64-bitowe liczby całkowite, jeden bit na pole).
+BitboardGameState ma to samo API co Engine.GameState - plansza w postaci listy 8x8 jest nadal utrzymywana
+(korzysta z niej interfejs graficzny oraz klasa Move), ale generowanie ruchów odbywa się wyłącznie na bitboardach.
+Numeracja pól: square = row * 8 + column, czyli bit 0 to a8, a bit 63 to h1 (tak samo jak indeksy listy board).
+"""
+
+import Engine
+from Engine import Move
+
+FULL = (1 << 64) - 1
+BIT = [1 << square for square in range(64)]
+SQUARES = [(square // 8, square % 8) for square in range(64)] #pole -> (row, column)
+FILE_A = sum(BIT[row * 8] for row in range(8))
+FILE_H = sum(BIT[row * 8 + 7] for row in range(8))
+PROMOTION_RANKS = sum(BIT[column] | BIT[56 + column] for column in range(8)) #rząd 8 i rząd 1
+PIECES = ("wp", "wR", "wN", "wB", "wQ", "wK", "bp", "bR", "bN", "bB", "bQ", "bK")
+
+ROOK_DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+"""
+Tablica ataków figur skaczących (skoczek, król, pion) - dla każdego pola bitboard pól atakowanych
+"""
+def offset_attacks(offsets):
+    table = []
+    for row, column in SQUARES:
+        attacks = 0
+        for d_row, d_column in offsets:
+            if 0 <= row + d_row < 8 and 0 <= column + d_column < 8:
+                attacks |= BIT[(row + d_row) * 8 + column + d_column]
+        table.append(attacks)
+    return table
+
+
+"""
+Ataki figury liniowej z pola square przy danym zajęciu planszy. Promień kończy się na pierwszej napotkanej figurze (włącznie).
+Używana tylko przy budowie tablic
+"""
+def ray_attacks(square, directions, occupied):
+    attacks = 0
+    row, column = SQUARES[square]
+    for d_row, d_column in directions:
+        end_row, end_column = row + d_row, column + d_column
+        while 0 <= end_row < 8 and 0 <= end_column < 8:
+            bit = BIT[end_row * 8 + end_column]
+            attacks |= bit
+            if occupied & bit:
+                break
+            end_row += d_row
+            end_column += d_column
+    return attacks
+
+
+"""
+Maska pól, których zajęcie wpływa na ataki figury liniowej z pola square (bez pól brzegowych na końcach promieni)
+"""
+def relevant_occupancy(square, directions):
+    mask = 0
+    row, column = SQUARES[square]
+    for d_row, d_column in directions:
+        end_row, end_column = row + d_row, column + d_column
+        while 0 <= end_row + d_row < 8 and 0 <= end_column + d_column < 8:
+            mask |= BIT[end_row * 8 + end_column]
+            end_row += d_row
+            end_column += d_column
+    return mask
+
+
+"""
+Tablice ataków figur liniowych. Dla każdego pola słownik {zajęcie pól z maski: bitboard ataków} zawierający wszystkie
+podzbiory maski - odpowiednik tablic "magic bitboards", w którym rolę funkcji mieszającej pełni słownik.
+Najpierw liczone są ataki wzdłuż każdej linii osobno (mało kombinacji), pełne tablice powstają z ich sumy
+"""
+def sliding_tables(directions):
+    masks = []
+    tables = []
+    line_pairs = (directions[0::2], directions[1::2]) #dwie linie: (góra, dół) i (lewo, prawo) lub dwie przekątne
+    for square in range(64):
+        line_masks = []
+        line_tables = []
+        for line in line_pairs:
+            line_mask = relevant_occupancy(square, line)
+            line_table = {}
+            subset = 0
+            while True: #iteracja po wszystkich podzbiorach maski
+                line_table[subset] = ray_attacks(square, line, subset)
+                subset = (subset - line_mask) & line_mask
+                if subset == 0:
+                    break
+            line_masks.append(line_mask)
+            line_tables.append(line_table)
+        first_mask, second_mask = line_masks
+        first_table, second_table = line_tables
+        table = {}
+        for first, first_attacks in first_table.items():
+            for second, second_attacks in second_table.items():
+                table[first | second] = first_attacks | second_attacks
+        masks.append(first_mask | second_mask)
+        tables.append(table)
+    return masks, tables
+
+
+"""
+Pola leżące pomiędzy dwoma polami na wspólnej linii (bez tych pól), 0 gdy pola nie leżą na jednej linii
+"""
+def between_table():
+    table = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        row, column = SQUARES[square]
+        for d_row, d_column in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            between = 0
+            end_row, end_column = row + d_row, column + d_column
+            while 0 <= end_row < 8 and 0 <= end_column < 8:
+                end_square = end_row * 8 + end_column
+                table[square][end_square] = between
+                between |= BIT[end_square]
+                end_row += d_row
+                end_column += d_column
+    return table
+
+
+KNIGHT_ATTACKS = offset_attacks(KNIGHT_OFFSETS)
+KING_ATTACKS = offset_attacks(KING_OFFSETS)
+PAWN_ATTACKS = {"w": offset_attacks(((-1, -1), (-1, 1))), "b": offset_attacks(((1, -1), (1, 1)))} #pola atakowane przez piona danego koloru
+ROOK_MASKS, ROOK_TABLES = sliding_tables(ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_TABLES = sliding_tables(BISHOP_DIRECTIONS)
+BETWEEN = between_table()
+
+#roszady: (prawo do roszady, pole króla, pole docelowe króla, pola które muszą być puste, pola które nie mogą być atakowane, pole wieży)
+CASTLES = {
+    "w": ((Engine.CASTLE_WKS, 60, 62, BIT[61] | BIT[62], BIT[61] | BIT[62], 63),
+          (Engine.CASTLE_WQS, 60, 58, BIT[57] | BIT[58] | BIT[59], BIT[58] | BIT[59], 56)),
+    "b": ((Engine.CASTLE_BKS, 4, 6, BIT[5] | BIT[6], BIT[5] | BIT[6], 7),
+          (Engine.CASTLE_BQS, 4, 2, BIT[1] | BIT[2] | BIT[3], BIT[2] | BIT[3], 0)),
+}
+
+
+def rook_attacks(square, occupied):
+    return ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+
+
+def bishop_attacks(square, occupied):
+    return BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+
+
+class BitboardGameState(Engine.GameState):
+    '''
+    Buduje bitboardy (po jednym na każdy rodzaj i kolor figury) oraz zajęcie pól przez każdy kolor na podstawie self.board
+    i list figur
+    '''
+    def init_bitboards(self):
+        bitboards = dict.fromkeys(PIECES, 0)
+        occupancy = {"w": 0, "b": 0}
+        for color, squares in self.piece_squares.items(): #listy figur - odwiedzane są tylko zajęte pola
+            for square in squares:
+                bitboards[self.board[square >> 3][square & 7]] |= BIT[square]
+                occupancy[color] |= BIT[square]
+        self.bitboards = bitboards
+        self.occupancy = occupancy
+
+    def set_fen(self, fields): #wywoływana także przez GameState.__init__
+        super().set_fen(fields)
+        self.init_bitboards()
+
+    def make_move(self, move):
+        super().make_move(move)
+        self.toggle_move_bits(move)
+
+    def undo_move(self):
+        if len(self.moveLog) != 0:
+            move = self.moveLog[-1]
+            super().undo_move()
+            self.toggle_move_bits(move)
+
+    '''
+    Aktualizuje bitboardy o dany ruch. Operacja XOR jest odwracalna, dlatego ta sama funkcja służy do wykonania i cofnięcia ruchu
+    '''
+    def toggle_move_bits(self, move):
+        bitboards = self.bitboards
+        color = move.piece_moved[0]
+        start = BIT[move.start_row * 8 + move.start_column]
+        end = BIT[move.end_row * 8 + move.end_column]
+        bitboards[move.piece_moved] ^= start
+        if move.pawn_promotion:
+            bitboards[color + move.promotion_piece] ^= end
+        else:
+            bitboards[move.piece_moved] ^= end
+        self.occupancy[color] ^= start | end
+        if move.piece_captured != "--":
+            captured = BIT[move.start_row * 8 + move.end_column] if move.en_passant else end
+            bitboards[move.piece_captured] ^= captured
+            self.occupancy[move.piece_captured[0]] ^= captured
+        if move.is_castle_move:
+            if move.end_column - move.start_column == 2: #roszada na skrzydle królewskim
+                rook = BIT[move.end_row * 8 + 7] | BIT[move.end_row * 8 + 5]
+            else:
+                rook = BIT[move.end_row * 8] | BIT[move.end_row * 8 + 3]
+            bitboards[color + "R"] ^= rook
+            self.occupancy[color] ^= rook
+
+    '''
+    Bitboard wszystkich pól atakowanych przez figury koloru color przy danym zajęciu planszy
+    '''
+    def attacked_squares(self, color, occupied):
+        bitboards = self.bitboards
+        pawns = bitboards[color + "p"]
+        if color == "w":
+            attacked = ((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)
+        else:
+            attacked = (((pawns & ~FILE_A) << 7) | ((pawns & ~FILE_H) << 9)) & FULL
+        attacked |= KING_ATTACKS[bitboards[color + "K"].bit_length() - 1]
+        knights = bitboards[color + "N"]
+        while knights:
+            bit = knights & -knights
+            knights ^= bit
+            attacked |= KNIGHT_ATTACKS[bit.bit_length() - 1]
+        sliders = bitboards[color + "R"] | bitboards[color + "Q"]
+        while sliders:
+            bit = sliders & -sliders
+            sliders ^= bit
+            square = bit.bit_length() - 1
+            attacked |= ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+        sliders = bitboards[color + "B"] | bitboards[color + "Q"]
+        while sliders:
+            bit = sliders & -sliders
+            sliders ^= bit
+            square = bit.bit_length() - 1
+            attacked |= BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+        return attacked
+
+    '''
+    Bitboard figur koloru color atakujących pole square
+    '''
+    def attackers_to(self, square, color, occupied):
+        bitboards = self.bitboards
+        enemy = "b" if color == "w" else "w"
+        return (KNIGHT_ATTACKS[square] & bitboards[color + "N"]) | \
+               (PAWN_ATTACKS[enemy][square] & bitboards[color + "p"]) | \
+               (KING_ATTACKS[square] & bitboards[color + "K"]) | \
+               (rook_attacks(square, occupied) & (bitboards[color + "R"] | bitboards[color + "Q"])) | \
+               (bishop_attacks(square, occupied) & (bitboards[color + "B"] | bitboards[color + "Q"]))
+
+    def square_under_attack(self, row, column):
+        enemy_color = "b" if self.whiteToMove else "w"
+        return self.attackers_to(row * 8 + column, enemy_color, self.occupancy["w"] | self.occupancy["b"]) != 0
+
+    '''
+    Wyznacza wszystkie legalne ruchy jako bitboardy pól docelowych. Zwraca krotkę:
+    (lista (pole, cele) dla figur, lista (pole, cele) dla pionów, lista pól pionów bijących w przelocie, lista pól docelowych roszad)
+    captures_only - tylko bicia i promocje (poza sytuacją szacha, gdy zwracane są wszystkie obrony)
+    '''
+    def legal_targets(self, captures_only=False):
+        bitboards = self.bitboards
+        if self.whiteToMove:
+            ally_color, enemy_color, forward, pawn_start_row = "w", "b", -8, 6
+        else:
+            ally_color, enemy_color, forward, pawn_start_row = "b", "w", 8, 1
+        own = self.occupancy[ally_color]
+        enemy = self.occupancy[enemy_color]
+        occupied = own | enemy
+        not_own = ~own & FULL
+        king_bit = bitboards[ally_color + "K"]
+        king_square = king_bit.bit_length() - 1
+        enemy_rooks = bitboards[enemy_color + "R"] | bitboards[enemy_color + "Q"]
+        enemy_bishops = bitboards[enemy_color + "B"] | bitboards[enemy_color + "Q"]
+        enemy_knights = bitboards[enemy_color + "N"]
+        enemy_pawns = bitboards[enemy_color + "p"]
+
+        checkers = (KNIGHT_ATTACKS[king_square] & enemy_knights) | \
+                   (PAWN_ATTACKS[ally_color][king_square] & enemy_pawns) | \
+                   (ROOK_TABLES[king_square][occupied & ROOK_MASKS[king_square]] & enemy_rooks) | \
+                   (BISHOP_TABLES[king_square][occupied & BISHOP_MASKS[king_square]] & enemy_bishops)
+        self.is_in_check = checkers != 0
+        if checkers:
+            captures_only = False
+        capture_mask = enemy if captures_only else FULL
+
+        #król nie może wejść na pole atakowane - ataki liczone bez króla, aby nie mógł się cofać wzdłuż linii szachującej figury
+        attacked = self.attacked_squares(enemy_color, occupied ^ king_bit)
+        piece_targets = [(king_square, KING_ATTACKS[king_square] & not_own & ~attacked & capture_mask)]
+        pawn_targets = []
+        en_passant_moves = []
+        castle_moves = []
+
+        if checkers & (checkers - 1) == 0: #brak szacha lub pojedynczy szach - mogą ruszać się pozostałe figury
+            if checkers:
+                check_mask = BETWEEN[king_square][checkers.bit_length() - 1] | checkers #zablokowanie lub zbicie szachującej figury
+            elif captures_only:
+                check_mask = FULL
+            else:
+                check_mask = FULL
+                rights = self.castling_rights
+                for right, king_start, king_end, empty, safe, rook_square in CASTLES[ally_color]:
+                    if rights & right and king_bit == BIT[king_start] and bitboards[ally_color + "R"] & BIT[rook_square] \
+                            and not occupied & empty and not attacked & safe:
+                        castle_moves.append(king_end)
+
+            #związania: figury przeciwnika na liniach króla, pomiędzy którymi a królem stoi dokładnie jedna własna figura
+            pin_masks = {}
+            snipers = (ROOK_TABLES[king_square][enemy & ROOK_MASKS[king_square]] & enemy_rooks) | \
+                      (BISHOP_TABLES[king_square][enemy & BISHOP_MASKS[king_square]] & enemy_bishops)
+            while snipers:
+                bit = snipers & -snipers
+                snipers ^= bit
+                between = BETWEEN[king_square][bit.bit_length() - 1]
+                blockers = between & occupied
+                if blockers and blockers & (blockers - 1) == 0 and blockers & own:
+                    pin_masks[blockers.bit_length() - 1] = between | bit #związana figura może poruszać się tylko wzdłuż linii związania
+
+            target_mask = not_own & check_mask & capture_mask
+            for piece, table, masks in (("N", None, None), ("B", BISHOP_TABLES, BISHOP_MASKS), ("R", ROOK_TABLES, ROOK_MASKS)):
+                pieces = bitboards[ally_color + piece]
+                if piece != "N":
+                    pieces |= bitboards[ally_color + "Q"]
+                while pieces:
+                    bit = pieces & -pieces
+                    pieces ^= bit
+                    square = bit.bit_length() - 1
+                    if table is None:
+                        targets = KNIGHT_ATTACKS[square] & target_mask
+                    else:
+                        targets = table[square][occupied & masks[square]] & target_mask
+                    if square in pin_masks:
+                        targets &= pin_masks[square]
+                    if targets:
+                        piece_targets.append((square, targets))
+
+            empty = ~occupied & FULL
+            pawn_attacks = PAWN_ATTACKS[ally_color]
+            pawns = bitboards[ally_color + "p"]
+            while pawns:
+                bit = pawns & -pawns
+                pawns ^= bit
+                square = bit.bit_length() - 1
+                targets = pawn_attacks[square] & enemy
+                one_step = square + forward
+                if BIT[one_step] & empty and (not captures_only or BIT[one_step] & PROMOTION_RANKS):
+                    targets |= BIT[one_step]
+                    if square // 8 == pawn_start_row and not captures_only and BIT[one_step + forward] & empty:
+                        targets |= BIT[one_step + forward]
+                targets &= check_mask
+                if square in pin_masks:
+                    targets &= pin_masks[square]
+                if targets:
+                    pawn_targets.append((square, targets))
+
+        #bicie w przelocie sprawdzane jest bezpośrednio - po usunięciu obu pionów król nie może być atakowany
+        if self.en_passant_possible != ():
+            en_passant_square = self.en_passant_possible[0] * 8 + self.en_passant_possible[1]
+            captured = BIT[en_passant_square - forward]
+            capturers = PAWN_ATTACKS[enemy_color][en_passant_square] & bitboards[ally_color + "p"]
+            while capturers:
+                bit = capturers & -capturers
+                capturers ^= bit
+                after = (occupied ^ bit ^ captured) | BIT[en_passant_square]
+                if not ((ROOK_TABLES[king_square][after & ROOK_MASKS[king_square]] & enemy_rooks) or
+                        (BISHOP_TABLES[king_square][after & BISHOP_MASKS[king_square]] & enemy_bishops) or
+                        (KNIGHT_ATTACKS[king_square] & enemy_knights) or
+                        (PAWN_ATTACKS[ally_color][king_square] & enemy_pawns & ~captured)):
+                    en_passant_moves.append(bit.bit_length() - 1)
+
+        return piece_targets, pawn_targets, en_passant_moves, castle_moves
+
+    def get_valid_moves(self):
+        moves = self.build_moves(*self.legal_targets())
+        self.check_mate = len(moves) == 0 and self.is_in_check
+        self.stale_mate = len(moves) == 0 and not self.is_in_check
+        return moves
+
+    '''
+    Legalne bicia i promocje, bez cichych ruchów (w przypadku szacha wszystkie legalne ruchy)
+    '''
+    def get_valid_captures(self):
+        return self.build_moves(*self.legal_targets(captures_only=True))
+
+    '''
+    Legalny ruch o danym ID lub None. Bitboardy pól docelowych liczone są raz dla całej pozycji, więc sprawdzany jest
+    tylko bit pola docelowego
+    '''
+    def get_hash_move(self, move_id, targets=None):
+        piece_targets, pawn_targets, en_passant_moves, castle_moves = targets or self.legal_targets()
+        start_square = move_id & 63
+        end_bit = BIT[move_id >> 6 & 63]
+        if move_id & Engine.MOVE_EN_PASSANT:
+            candidates = ([], [], [start_square] if start_square in en_passant_moves else [], [])
+        elif move_id & Engine.MOVE_CASTLE:
+            candidates = ([], [], [], [square for square in castle_moves if BIT[square] == end_bit])
+        else:
+            candidates = ([(square, bits & end_bit) for square, bits in piece_targets if square == start_square],
+                          [(square, bits & end_bit) for square, bits in pawn_targets if square == start_square], [], [])
+        for move in self.build_moves(*candidates):
+            if (move.move_id ^ move_id) & Engine.MOVE_KEY_MASK == 0:
+                return move
+        return None
+
+    '''
+    Etapowa generacja ruchów (patrz GameState.generate_moves). Pola docelowe liczone są raz, a dzielone na etapy
+    maską figur przeciwnika - obiekty Move tworzone są dopiero dla etapu, do którego dotarł wywołujący
+    '''
+    def generate_moves(self, hash_move_id=0, order_key=None):
+        targets = self.legal_targets()
+        is_in_check = self.is_in_check
+        hash_move = self.get_hash_move(hash_move_id, targets) if hash_move_id else None
+        if hash_move is not None:
+            hash_move_id = hash_move.move_id & Engine.MOVE_KEY_MASK
+            yield hash_move
+        else:
+            hash_move_id = -1
+
+        piece_targets, pawn_targets, en_passant_moves, castle_moves = targets
+        enemy = self.occupancy["b" if self.whiteToMove else "w"]
+        captures = ([(square, bits & enemy) for square, bits in piece_targets],
+                    [(square, bits & (enemy | PROMOTION_RANKS)) for square, bits in pawn_targets], en_passant_moves, [])
+        quiets = ([(square, bits & ~enemy) for square, bits in piece_targets],
+                  [(square, bits & ~(enemy | PROMOTION_RANKS)) for square, bits in pawn_targets], [], castle_moves)
+        for stage in (captures, quiets):
+            self.is_in_check = is_in_check
+            moves = self.build_moves(*stage)
+            if order_key is not None:
+                moves.sort(key=order_key, reverse=True)
+            for move in moves:
+                if move.move_id & Engine.MOVE_KEY_MASK != hash_move_id:
+                    yield move
+
+    '''
+    Zamienia bitboardy pól docelowych na listę obiektów Move
+    '''
+    def build_moves(self, piece_targets, pawn_targets, en_passant_moves, castle_moves):
+        board = self.board
+        moves = []
+        for square, targets in piece_targets:
+            start = SQUARES[square]
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                moves.append(Move(start, SQUARES[bit.bit_length() - 1], board))
+        for square, targets in pawn_targets:
+            start = SQUARES[square]
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = SQUARES[bit.bit_length() - 1]
+                if bit & PROMOTION_RANKS:
+                    for promotion_piece in Move.promotion_pieces:
+                        moves.append(Move(start, end, board, pawn_promotion = True, promotion_piece = promotion_piece))
+                else:
+                    moves.append(Move(start, end, board))
+        for square in en_passant_moves:
+            moves.append(Move(SQUARES[square], self.en_passant_possible, board, en_passant = True))
+        king_start = self.white_king_location if self.whiteToMove else self.black_king_location
+        for square in castle_moves:
+            moves.append(Move(king_start, SQUARES[square], board, is_castle_move = True))
+        return moves
+
+    '''
+    Liczba legalnych ruchów bez tworzenia obiektów Move - suma bitów w bitboardach pól docelowych
+    '''
+    def count_valid_moves(self):
+        piece_targets, pawn_targets, en_passant_moves, castle_moves = self.legal_targets()
+        count = len(en_passant_moves) + len(castle_moves)
+        for square, targets in piece_targets:
+            count += targets.bit_count()
+        for square, targets in pawn_targets:
+            count += targets.bit_count() + 3 * (targets & PROMOTION_RANKS).bit_count() #promocja to 4 różne ruchy
+        return count
+
+    def perft(self, depth):
+        if depth == 1:
+            return self.count_valid_moves()
+        return super().perft(depth)
@@ -0,0 +1,666 @@
+"""Moduł sztucznej inteligencji. Wyszukuje najlepszy ruch algorytmem negamax z obcinaniem alfa-beta,
+z tablicą transpozycji, która pamięta wyniki już przeszukanych pozycji (rozpoznawanych po kluczu Zobrista)
+"""
+
+import copy
+import random
+import threading
+import time
+
+import Tablebase
+from Engine import MOVE_KEY_MASK
+
+piece_score = {"K": 0, "Q": 900, "R": 500, "B": 330, "N": 320, "p": 100} #wartości figur w setnych częściach piona
+CHECKMATE = 100000
+STALEMATE = 0
+MATE_THRESHOLD = CHECKMATE - 1000 #wyniki powyżej tej wartości oznaczają mata w określonej liczbie półruchów
+TB_WIN = CHECKMATE // 2 #wygrana według tablic końcówek (bez liczby ruchów do mata, więc poniżej MATE_THRESHOLD)
+DEPTH = 3 #głębokość przeszukiwania drzewa gry
+TT_SIZE_MB = 16 #domyślny rozmiar tablicy transpozycji w MB
+MAX_DEPTH = 64 #maksymalna głębokość pogłębiania iteracyjnego
+MOVE_TIME_MS = 1000 #domyślny czas na ruch AI w milisekundach
+MOVE_OVERHEAD_MS = 30 #zapas czasu na komunikację i wykonanie ruchu przy grze na zegar
+TIME_CHECK_INTERVAL = 256 #co ile węzłów sprawdzany jest upływ czasu
+MAX_PLY = 128 #maksymalna odległość od korzenia, dla której pamiętane są ruchy zabójcze
+PAWN_TABLE_ENTRIES = 1 << 14 #liczba wpisów tablicy ocen struktury pionowej (potęga dwójki)
+DOUBLED_PAWN_PENALTY = 15 #za każdy dodatkowy pion na tej samej kolumnie
+ISOLATED_PAWN_PENALTY = 12 #pion bez własnych pionów na sąsiednich kolumnach
+PASSED_PAWN_BONUS = (0, 5, 10, 20, 35, 60, 100, 0) #pion wolny, indeks: rząd z perspektywy strony piona - 1 (2. rząd - 1, 7. rząd - 6)
+DELTA_MARGIN = 200 #przycinanie delta: bicie pomijane, gdy nawet po zyskaniu zbitej figury i tego marginesu wynik nie osiąga alfa
+
+#kolejność sprawdzania ruchów: ruch z tablicy transpozycji, bicia (MVV-LVA), ruchy zabójcze, pozostałe wg historii
+HASH_MOVE_ORDER = 1 << 30
+CAPTURE_ORDER = 1 << 26
+KILLER_ORDER = 1 << 25
+HISTORY_LIMIT = 1 << 24 #po przekroczeniu tej wartości tablica historii jest dzielona przez 2
+mvv_lva_value = {"p": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+
+#typy wyniku zapisanego w tablicy transpozycji
+EXACT = 0
+LOWER_BOUND = 1 #wynik jest co najmniej taki (nastąpiło obcięcie beta)
+UPPER_BOUND = 2 #wynik jest co najwyżej taki (żaden ruch nie poprawił alfa)
+
+
+"""
+Tablica transpozycji o stałym rozmiarze. Wpisy są przechowywane w jednym buforze 64-bitowych liczb, pamięć nie rośnie
+w trakcie gry. Każdy kubełek ma dwa miejsca: pierwsze preferuje wpisy z większą głębokością (zastępowane przez głębsze
+wpisy lub wpisy z poprzednich wyszukiwań), drugie jest zawsze nadpisywane.
+Wpis to dwie liczby: (klucz XOR dane, dane), gdzie dane = typ | głębokość << 2 | ID ruchu << 10 | wiek << 27 | wynik << 32.
+Dzięki zapisowi klucza XOR dane uszkodzony wpis (np. zapisywany równolegle przez inny proces) nie przejdzie sprawdzenia klucza.
+"""
+class TranspositionTable():
+    ENTRY_BYTES = 16
+    SCORE_OFFSET = 1 << 31 #wynik zapisywany jest jako liczba bez znaku
+
+    def __init__(self, size_mb=TT_SIZE_MB, buffer=None):
+        self.bucket_count = self.buckets_for_size(size_mb)
+        self.mask = self.bucket_count - 1
+        if buffer is None:
+            buffer = bytearray(self.buffer_size(size_mb))
+        self.buffer = buffer
+        self.slots = memoryview(buffer).cast("Q")
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    '''
+    Liczba kubełków dla danego rozmiaru w MB - potęga dwójki, indeks kubełka to maska bitowa klucza
+    '''
+    @classmethod
+    def buckets_for_size(cls, size_mb):
+        entries = max(2, size_mb * 1024 * 1024 // cls.ENTRY_BYTES)
+        return 1 << ((entries // 2).bit_length() - 1)
+
+    '''
+    Rozmiar bufora w bajtach potrzebny dla tablicy o danym rozmiarze (np. przy tworzeniu pamięci współdzielonej)
+    '''
+    @classmethod
+    def buffer_size(cls, size_mb):
+        return cls.buckets_for_size(size_mb) * 2 * cls.ENTRY_BYTES
+
+    def clear(self):
+        raw = self.slots.cast("B")
+        raw[:] = bytes(len(raw))
+        self.age = 0
+
+    '''
+    Wywoływana na początku każdego wyszukiwania - wpisy z poprzednich wyszukiwań mogą być zastępowane w pierwszej kolejności
+    '''
+    def new_search(self):
+        self.age = (self.age + 1) & 31
+
+    '''
+    Zwraca krotkę (głębokość, typ, wynik, ID ruchu) dla danego klucza lub None, gdy pozycji nie ma w tablicy
+    '''
+    def probe(self, key):
+        self.probes += 1
+        slots = self.slots
+        index = (key & self.mask) << 2
+        for i in (index, index + 2):
+            data = slots[i + 1]
+            if slots[i] ^ data == key and data:
+                self.hits += 1
+                return (data >> 2) & 255, data & 3, (data >> 32) - self.SCORE_OFFSET, (data >> 10) & 0x1FFFF
+        return None
+
+    def store(self, key, depth, flag, score, move_id):
+        self.stores += 1
+        slots = self.slots
+        index = (key & self.mask) << 2
+        data = flag | depth << 2 | move_id << 10 | self.age << 27 | (score + self.SCORE_OFFSET) << 32
+        stored = slots[index + 1]
+        #miejsce preferujące głębokość: ta sama pozycja, płytszy wpis lub wpis z wcześniejszego wyszukiwania
+        if slots[index] ^ stored == key or depth >= (stored >> 2) & 255 or (stored >> 27) & 31 != self.age:
+            slots[index] = key ^ data
+            slots[index + 1] = data
+        else: #miejsce zawsze nadpisywane
+            slots[index + 2] = key ^ data
+            slots[index + 3] = data
+
+    '''
+    Procent zajętych miejsc w tablicy (na podstawie próbki pierwszych kubełków)
+    '''
+    def usage(self, sample=1000):
+        sample = min(sample, self.bucket_count) * 2
+        used = sum(1 for i in range(sample) if self.slots[2 * i + 1])
+        return 100.0 * used / sample
+
+
+transposition_table = TranspositionTable(TT_SIZE_MB)
+
+
+"""
+Tablica ocen struktury pionowej o stałej liczbie wpisów, indeksowana kluczem pionów (GameState.pawn_key).
+Ustawienie pionów rzadko zmienia się między sąsiednimi węzłami drzewa, więc większość ocen odczytywana jest z tablicy.
+Pusta tablica ma klucze 0 i oceny 0 - to poprawny wpis dla pozycji bez pionów
+"""
+class PawnHashTable():
+    def __init__(self, entries=PAWN_TABLE_ENTRIES):
+        self.mask = entries - 1
+        self.keys = [0] * entries
+        self.scores = [0] * entries
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.keys = [0] * len(self.keys)
+        self.scores = [0] * len(self.scores)
+        self.probes = 0
+        self.hits = 0
+
+    '''
+    Ocena struktury pionowej z perspektywy białych - z tablicy lub liczona od nowa i zapisywana (zawsze nadpisuje wpis)
+    '''
+    def score(self, gs):
+        self.probes += 1
+        key = gs.pawn_key
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        score = evaluate_pawn_structure(gs.board)
+        self.keys[index] = key
+        self.scores[index] = score
+        return score
+
+    def hit_rate(self):
+        return 100.0 * self.hits / self.probes if self.probes else 0.0
+
+
+pawn_table = PawnHashTable()
+tablebase = Tablebase.Tablebase() #tablice końcówek, None wyłącza sondowanie
+
+
+"""
+Zmienia rozmiar domyślnej tablicy transpozycji (w MB)
+"""
+def set_hash_size(size_mb):
+    global transposition_table
+    transposition_table = TranspositionTable(size_mb)
+
+
+"""
+Wyjątek przerywający wyszukiwanie po przekroczeniu czasu lub po zatrzymaniu z zewnątrz (search_stop_event)
+"""
+class SearchTimeout(Exception):
+    pass
+
+
+nodes = 0 #liczba odwiedzonych węzłów w bieżącym wyszukiwaniu
+qnodes = 0 #w tym węzłów przeszukiwania stabilizującego (quiescence)
+killer_moves = [[0, 0] for ply in range(MAX_PLY)] #dwa ostatnie ciche ruchy, które spowodowały obcięcie, dla każdego ply
+history_table = [0] * 4096 #premia za obcięcia dla cichych ruchów, indeks: pole startowe i końcowe (12 najniższych bitów ID ruchu)
+cutoff_stats = {} #głębokość -> [liczba obcięć, liczba obcięć już na pierwszym ruchu]
+deadline = None #moment (time.perf_counter), po którym wyszukiwanie jest przerywane; None - bez limitu czasu
+search_stop_event = None #obiekt z metodą is_set() (threading.Event, multiprocessing.Event) - ustawienie przerywa wyszukiwanie
+
+
+"""
+Wywoływana co TIME_CHECK_INTERVAL węzłów - przerywa wyszukiwanie po upływie czasu lub na żądanie z innego wątku/procesu
+"""
+def check_stop():
+    if (deadline is not None and time.perf_counter() >= deadline) or (search_stop_event is not None and search_stop_event.is_set()):
+        raise SearchTimeout()
+
+
+"""
+Przygotowuje heurystyki kolejności ruchów do nowego wyszukiwania: czyści ruchy zabójcze i statystyki obcięć,
+a historię zmniejsza o połowę, aby starsze wyszukiwania miały mniejszy wpływ
+"""
+def reset_move_ordering():
+    for killers in killer_moves:
+        killers[0] = killers[1] = 0
+    for i in range(len(history_table)):
+        history_table[i] >>= 1
+    cutoff_stats.clear()
+
+
+"""
+Klucz sortowania (malejąco) ruchów: ruch z tablicy transpozycji, bicia od najcenniejszej ofiary najtańszym napastnikiem
+(MVV-LVA), promocje na hetmana, ruchy zabójcze dla danego ply, pozostałe ciche ruchy według tablicy historii
+"""
+def move_order_key(hash_move_id, ply):
+    killers = killer_moves[ply] if ply < MAX_PLY else (0, 0)
+
+    def move_order(move):
+        move_id = move.move_id
+        if move_id == hash_move_id:
+            return HASH_MOVE_ORDER
+        if move.is_capture:
+            return CAPTURE_ORDER + mvv_lva_value[move.piece_captured[1]] * 8 - mvv_lva_value[move.piece_moved[1]]
+        if move.pawn_promotion:
+            return CAPTURE_ORDER if move.promotion_piece == "Q" else 0
+        if move_id == killers[0]:
+            return KILLER_ORDER
+        if move_id == killers[1]:
+            return KILLER_ORDER - 1
+        return history_table[move_id & 4095]
+
+    return move_order
+
+
+"""
+Sortuje ruchy w miejscu według move_order_key
+"""
+def order_moves(valid_moves, hash_move_id, ply):
+    valid_moves.sort(key=move_order_key(hash_move_id, ply), reverse=True)
+
+
+"""
+Aktualizacja heurystyk po obcięciu beta przez cichy ruch (nie bicie i nie promocja)
+"""
+def update_quiet_move_heuristics(move, depth, ply):
+    move_id = move.move_id
+    if ply < MAX_PLY:
+        killers = killer_moves[ply]
+        if killers[0] != move_id:
+            killers[1] = killers[0]
+            killers[0] = move_id
+    index = move_id & 4095
+    history_table[index] += depth * depth
+    if history_table[index] > HISTORY_LIMIT:
+        for i in range(len(history_table)):
+            history_table[i] >>= 1
+
+
+"""
+Statystyki kolejności ruchów z ostatniego wyszukiwania: dla każdej pozostałej głębokości liczba obcięć beta
+oraz jaki ich procent nastąpił już na pierwszym sprawdzonym ruchu (im bliżej 100%, tym lepsza kolejność)
+"""
+def get_ordering_stats():
+    stats = {}
+    for depth, (cutoffs, first_move_cutoffs) in sorted(cutoff_stats.items()):
+        stats[depth] = {"cutoffs": cutoffs, "first_move_cutoffs": first_move_cutoffs,
+                        "first_move_cutoff_rate": 100.0 * first_move_cutoffs / cutoffs}
+    return stats
+
+
+"""
+Liczniki węzłów z ostatniego wyszukiwania: wszystkie węzły oraz węzły przeszukiwania stabilizującego.
+Liczniki tablicy struktury pionowej i tablic końcówek obejmują cały czas ich istnienia (do doboru PAWN_TABLE_ENTRIES)
+"""
+def get_search_stats():
+    stats = {"nodes": nodes, "qnodes": qnodes, "qnode_rate": 100.0 * qnodes / nodes if nodes else 0.0,
+             "pawn_probes": pawn_table.probes, "pawn_hits": pawn_table.hits, "pawn_hit_rate": pawn_table.hit_rate()}
+    if tablebase is not None:
+        stats.update({"tb_probes": tablebase.probes, "tb_hits": tablebase.hits, "tb_cache_hits": tablebase.cache_hits})
+    return stats
+
+
+"""
+Wybiera i zwraca losowy ruch
+"""
+def find_random_move(valid_moves):
+    return valid_moves[random.randint(0, len(valid_moves) - 1)]
+
+
+"""
+Funkcja pomocnicza wywołująca pierwsze wywołanie rekurencyjnego algorytmu negamax z obcinaniem alfa-beta.
+Można przekazać osobną tablicę transpozycji (np. gdy w jednym procesie toczy się wiele gier) - jest ona używana
+tylko w tym wyszukiwaniu, domyślna tablica modułu pozostaje bez zmian
+"""
+def find_best_move_negamax_alphabeta_recursion_first_call(gs, valid_moves, table=None):
+    global next_move, nodes, qnodes
+    if table is None:
+        table = transposition_table
+    next_move = None
+    nodes = qnodes = 0
+    random.shuffle(valid_moves) #różne ruchy przy takich samych wynikach
+    table.new_search()
+    reset_move_ordering()
+    find_move_negamax_alphabeta(gs, valid_moves, DEPTH, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1, 0, table)
+    return next_move
+
+
+"""
+Pogłębianie iteracyjne z kontrolą czasu: przeszukuje kolejno na głębokość 1, 2, 3... aż do wyczerpania czasu
+i zwraca najlepszy ruch z ostatniej ukończonej głębokości. Czas można podać wprost (move_time_ms) lub jako stan
+zegara (wtime/btime w ms, winc/binc - dodawany czas na ruch, movestogo - liczba ruchów do kontroli czasu).
+Po każdej iteracji wywoływana jest funkcja info(depth, score, nodes, seconds, pv).
+Ustawienie stop_event przerywa wyszukiwanie tak jak upływ czasu. start_depth > 1 pozwala pominąć pierwsze iteracje
+(wykorzystywane przez procesy pomocnicze w wyszukiwaniu równoległym). table - tablica transpozycji tylko dla tego
+wyszukiwania (domyślnie tablica modułu)
+"""
+def find_best_move_iterative_deepening(gs, valid_moves, move_time_ms=None, max_depth=MAX_DEPTH, wtime=None, btime=None,
+                                       winc=0, binc=0, movestogo=None, table=None, info=None, stop_event=None, start_depth=1):
+    global next_move, nodes, qnodes, deadline, search_stop_event
+    if table is None:
+        table = transposition_table
+    search_stop_event = stop_event
+    if len(valid_moves) == 0:
+        return None
+    if move_time_ms is None and (wtime is not None or btime is not None):
+        move_time_ms = allocate_time(gs, wtime, btime, winc, binc, movestogo)
+    start = time.perf_counter()
+    deadline = start + move_time_ms / 1000 if move_time_ms is not None else None
+    if tablebase is not None: #w końcówce z tablic przeszukiwane są tylko ruchy z najlepszym wynikiem i najmniejszym DTZ;
+        valid_moves = tablebase.filter_root_moves(gs, valid_moves, deadline) #sondowanie liczy się do czasu na ruch
+    nodes = qnodes = 0
+    best_move = None
+    root_ply = len(gs.moveLog)
+    turn_multiplier = 1 if gs.whiteToMove else -1
+    random.shuffle(valid_moves)
+    table.new_search()
+    reset_move_ordering()
+    try:
+        for depth in range(min(start_depth, max_depth), max_depth + 1):
+            next_move = None
+            try:
+                score = find_move_negamax_alphabeta(gs, valid_moves, depth, -CHECKMATE, CHECKMATE, turn_multiplier, 0, table)
+            except SearchTimeout:
+                while len(gs.moveLog) > root_ply: #wyjątek przerwał wyszukiwanie w trakcie - cofnięcie wykonanych ruchów
+                    gs.undo_move()
+                break
+            best_move = next_move
+            seconds = time.perf_counter() - start
+            if info is not None:
+                info(depth, score, nodes, seconds, get_principal_variation(gs, depth, table))
+            if abs(score) > MATE_THRESHOLD or len(valid_moves) == 1: #znaleziony mat lub jedyny możliwy ruch
+                break
+            if deadline is not None and seconds > move_time_ms / 2000: #następna iteracja i tak nie zdąży się zakończyć
+                break
+    finally:
+        deadline = None
+        search_stop_event = None
+    return best_move if best_move is not None else (next_move or valid_moves[0])
+
+
+"""
+Wyszukiwanie ruchu AI w osobnym wątku, tak aby interfejs graficzny nie zamarzał na czas wyszukiwania.
+Wątek pracuje na kopii stanu gry - plansza wyświetlana przez interfejs nie zmienia się w trakcie przeszukiwania.
+Główna pętla sprawdza done() i odbiera ruch przez result(); cancel() przerywa wyszukiwanie (np. przy cofnięciu ruchu).
+Jednocześnie może działać tylko jedno wyszukiwanie, ponieważ stan wyszukiwania przechowywany jest w zmiennych modułu
+"""
+class BackgroundSearch():
+    def __init__(self, gs, move_time_ms=MOVE_TIME_MS, parallel_search=None, info=None):
+        self.gs = copy.deepcopy(gs)
+        self.move_time_ms = move_time_ms
+        self.parallel_search = parallel_search
+        self.info = info
+        self.stop_event = threading.Event()
+        self.move = None
+        self.depth = 0
+        self.score = 0
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        valid_moves = self.gs.get_valid_moves()
+        if self.parallel_search is not None:
+            self.move = self.parallel_search.search(self.gs, valid_moves, self.move_time_ms, info=self.update_info)
+        else:
+            self.move = find_best_move_iterative_deepening(self.gs, valid_moves, self.move_time_ms, info=self.update_info,
+                                                           stop_event=self.stop_event)
+
+    def update_info(self, depth, score, nodes, seconds, pv):
+        self.depth = depth
+        self.score = score
+        if self.info is not None:
+            self.info(depth, score, nodes, seconds, pv)
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    '''
+    Liczba węzłów przeszukanych do tej pory (przy wyszukiwaniu równoległym dostępna dopiero po jego zakończeniu)
+    '''
+    def nodes(self):
+        if self.parallel_search is not None:
+            return self.parallel_search.nodes if self.done() else 0
+        return nodes
+
+    def seconds(self):
+        return time.perf_counter() - self.start_time
+
+    '''
+    Znaleziony ruch jako obiekt z listy valid_moves bieżącej pozycji (None, gdy wyszukiwanie nie zwróciło ruchu)
+    '''
+    def result(self, valid_moves):
+        self.thread.join()
+        for move in valid_moves:
+            if move == self.move:
+                return move
+        return None
+
+    '''
+    Przerywa wyszukiwanie i czeka na zakończenie wątku - po powrocie można rozpocząć nowe wyszukiwanie
+    '''
+    def cancel(self):
+        self.stop_event.set()
+        if self.parallel_search is not None:
+            self.parallel_search.stop()
+        self.thread.join()
+        if self.parallel_search is not None: #sygnał mógł dotrzeć już po zakończeniu wyszukiwania - nie może zatrzymać następnego
+            self.parallel_search.stop_event.clear()
+
+
+"""
+Przydział czasu na ruch przy grze na zegar (w ms)
+"""
+def allocate_time(gs, wtime, btime, winc=0, binc=0, movestogo=None):
+    remaining, increment = (wtime, winc) if gs.whiteToMove else (btime, binc)
+    if remaining is None:
+        return MOVE_TIME_MS
+    moves_left = movestogo if movestogo else 30
+    budget = remaining / moves_left + increment * 3 / 4
+    return max(1, min(budget, remaining / 2) - MOVE_OVERHEAD_MS)
+
+
+"""
+Główny wariant - ciąg najlepszych ruchów odczytany z tablicy transpozycji, zaczynając od bieżącej pozycji
+"""
+def get_principal_variation(gs, max_length, table=None):
+    if table is None:
+        table = transposition_table
+    pv = []
+    while len(pv) < max_length:
+        entry = table.probe(gs.zobrist_key)
+        if entry is None or entry[3] == 0:
+            break
+        move = next(gs.generate_moves(entry[3]), None) #pierwszy ruch to ruch z tablicy, jeśli jest legalny
+        if move is None or (move.move_id ^ entry[3]) & MOVE_KEY_MASK:
+            break
+        pv.append(move)
+        gs.make_move(move)
+    for _ in pv:
+        gs.undo_move()
+    return pv
+
+
+"""
+Wypisuje statystyki iteracji wyszukiwania w formacie zbliżonym do protokołu UCI
+"""
+def print_search_info(depth, score, nodes, seconds, pv):
+    print("info depth %d score cp %d nodes %d nps %d time %d pv %s" % (depth, score, nodes, nodes / seconds if seconds > 0 else 0,
+          seconds * 1000, " ".join(move.get_chess_notation() for move in pv)))
+
+
+"""
+Wynik matowy zapisywany jest w tablicy jako odległość od bieżącej pozycji, a nie od korzenia drzewa
+"""
+def score_to_table(score, ply):
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+def score_from_table(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+"""
+Rekurencyjny algorytm negamax z obcinaniem alfa-beta. turn_multiplier: 1 gdy ruch mają białe, -1 gdy czarne.
+ply - odległość od korzenia drzewa (liczba wykonanych półruchów), table - tablica transpozycji wyszukiwania.
+valid_moves przekazywane jest tylko w korzeniu, w pozostałych węzłach ruchy generowane są etapami
+(GameState.generate_moves) dopiero po sprawdzeniu tablicy transpozycji - po obcięciu na ruchu z tablicy lub na biciu
+ciche ruchy nie są w ogóle tworzone
+"""
+def find_move_negamax_alphabeta(gs, valid_moves, depth, alpha, beta, turn_multiplier, ply, table):
+    global next_move, nodes
+    nodes += 1
+    if nodes % TIME_CHECK_INTERVAL == 0:
+        check_stop()
+    if ply > 0 and (gs.is_repetition() or gs.is_fifty_move_draw()):
+        return STALEMATE #powtórzenie pozycji lub zasada 50 ruchów - remis, poddrzewo nie jest przeszukiwane
+    key = gs.zobrist_key
+    alpha_original = alpha
+    hash_move_id = 0
+    entry = table.probe(key)
+    if entry is not None:
+        table_depth, flag, table_score, hash_move_id = entry
+        if ply > 0 and table_depth >= depth: #w korzeniu zawsze przeszukujemy, aby ustalić next_move
+            table_score = score_from_table(table_score, ply)
+            if flag == EXACT:
+                return table_score
+            elif flag == LOWER_BOUND:
+                alpha = max(alpha, table_score)
+            else:
+                beta = min(beta, table_score)
+            if alpha >= beta:
+                return table_score
+
+    if ply > 0 and gs.halfmove_clock == 0 and tablebase is not None:
+        wdl = tablebase.probe_wdl(gs)
+        if wdl is not None: #dokładny wynik z tablic końcówek - tylko tuż po biciu lub ruchu pionem, wynik WDL zakłada
+            return tablebase_score(wdl, ply) #wyzerowany licznik 50 ruchów
+    if depth == 0:
+        return quiescence_search(gs, alpha, beta, turn_multiplier, ply)
+    if valid_moves is None:
+        valid_moves = gs.generate_moves(hash_move_id, move_order_key(0, ply))
+    else:
+        order_moves(valid_moves, hash_move_id, ply)
+
+    max_score = -CHECKMATE
+    best_move = None
+    for i, move in enumerate(valid_moves):
+        gs.make_move(move)
+        score = -find_move_negamax_alphabeta(gs, None, depth - 1, -beta, -alpha, -turn_multiplier, ply + 1, table)
+        gs.undo_move()
+        if score > max_score:
+            max_score = score
+            best_move = move
+            if ply == 0:
+                next_move = move
+        if max_score > alpha:
+            alpha = max_score
+        if alpha >= beta: #obcięcie
+            if not move.is_capture and not move.pawn_promotion:
+                update_quiet_move_heuristics(move, depth, ply)
+            stats = cutoff_stats.setdefault(depth, [0, 0])
+            stats[0] += 1
+            if i == 0:
+                stats[1] += 1
+            break
+
+    if best_move is None: #brak legalnych ruchów - mat lub pat, szybszy mat jest lepszy
+        return -CHECKMATE + ply if gs.is_in_check else STALEMATE
+    if max_score <= alpha_original:
+        flag = UPPER_BOUND
+    elif max_score >= beta:
+        flag = LOWER_BOUND
+    else:
+        flag = EXACT
+    table.store(key, depth, flag, score_to_table(max_score, ply), best_move.move_id)
+    return max_score
+
+
+"""
+Wynik WDL z tablic końcówek zamieniony na wynik wyszukiwania. Bliższa wygrana jest lepsza, wygrane i przegrane
+niemożliwe do osiągnięcia przed upływem 50 ruchów liczone są jako remis
+"""
+def tablebase_score(wdl, ply):
+    if wdl == Tablebase.WIN:
+        return TB_WIN - ply
+    if wdl == Tablebase.LOSS:
+        return -TB_WIN + ply
+    return STALEMATE
+
+
+"""
+Przeszukiwanie stabilizujące (quiescence) w liściach drzewa: sprawdzane są tylko bicia i promocje, aby ocena nie
+zapadała w środku wymiany. Strona na ruchu może poprzestać na bieżącej ocenie (stand pat), chyba że jest szachowana -
+wtedy sprawdzane są wszystkie obrony przed szachem. Przycinanie delta pomija bicia, które nawet z zapasem
+DELTA_MARGIN nie są w stanie podnieść wyniku do alfa
+"""
+def quiescence_search(gs, alpha, beta, turn_multiplier, ply):
+    global nodes, qnodes
+    nodes += 1
+    qnodes += 1
+    if nodes % TIME_CHECK_INTERVAL == 0:
+        check_stop()
+    moves = gs.get_valid_captures()
+    if gs.is_in_check:
+        if len(moves) == 0:
+            return -CHECKMATE + ply
+        max_score = -CHECKMATE
+        stand_pat = None
+    else:
+        stand_pat = turn_multiplier * score_board(gs)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        max_score = stand_pat
+
+    order_moves(moves, 0, ply)
+    for move in moves:
+        if stand_pat is not None and not move.pawn_promotion \
+                and stand_pat + piece_score[move.piece_captured[1]] + DELTA_MARGIN < alpha: #przycinanie delta
+            continue
+        gs.make_move(move)
+        score = -quiescence_search(gs, -beta, -alpha, -turn_multiplier, ply + 1)
+        gs.undo_move()
+        if score > max_score:
+            max_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return max_score
+
+
+"""
+Ocena pozycji z perspektywy białych: dodatni wynik oznacza przewagę białych, ujemny przewagę czarnych.
+Materiał i tablice figura-pole są aktualizowane przyrostowo przez GameState, więc ocena nie przegląda planszy
+"""
+def score_board(gs):
+    return gs.evaluate() + pawn_table.score(gs)
+
+
+"""
+Ocena struktury pionowej z perspektywy białych: kary za piony zdublowane i izolowane, premie za piony wolne
+"""
+def evaluate_pawn_structure(board):
+    pawn_rows = {"w": [[] for column in range(8)], "b": [[] for column in range(8)]} #rzędy pionów na każdej kolumnie
+    for row in range(1, 7):
+        for column in range(8):
+            piece = board[row][column]
+            if piece[1] == 'p':
+                pawn_rows[piece[0]][column].append(row)
+    score = 0
+    for color, sign in (("w", 1), ("b", -1)):
+        own = pawn_rows[color]
+        enemy = pawn_rows["b" if color == "w" else "w"]
+        for column in range(8):
+            rows = own[column]
+            if not rows:
+                continue
+            if len(rows) > 1:
+                score -= sign * DOUBLED_PAWN_PENALTY * (len(rows) - 1)
+            if (column == 0 or not own[column - 1]) and (column == 7 or not own[column + 1]):
+                score -= sign * ISOLATED_PAWN_PENALTY * len(rows)
+            for row in rows:
+                blockers = (enemy[c] for c in range(max(0, column - 1), min(8, column + 2)))
+                if color == "w":
+                    if not any(enemy_row < row for enemy_rows in blockers for enemy_row in enemy_rows):
+                        score += PASSED_PAWN_BONUS[7 - row]
+                elif not any(enemy_row > row for enemy_rows in blockers for enemy_row in enemy_rows):
+                    score -= PASSED_PAWN_BONUS[row]
+    return score
@@ -1,17 +1,25 @@
 """Glowny plik sterownika. Odpowiedzialny za obsługę akcji użytkownika i wyświetlanie aktualnego stanu gry."""
 
 import pygame as p
+import Bitboard
 import Engine
 import ChessAI
+import OpeningBook
+import ParallelSearch
 
 
 BOARD_WIDTH = BOARD_HEIGHT = 512
 MOVE_LOG_PANEL_WIDTH = 250
 MOVE_LOG_PANEL_HEIGHT = BOARD_HEIGHT
+MOVES_PER_ROW = 3 #liczba pełnych ruchów w jednym wierszu logu
+MOVE_LOG_PADDING = 5
+MOVE_LOG_LINE_SPACING = 2
 DIMENSION = 8 #Wymiary szachownicy to 8x8 pól
 SQ_SIZE = BOARD_WIDTH // DIMENSION #Rozmiar pojedynczego pola: 512/8=64
 MAX_FPS = 60 #Parametr animacji, maksymalna liczba klatek na sekundę
 IMAGES = {}
+GAME_STATE = Bitboard.BitboardGameState #reprezentacja planszy (Engine.GameState - lista 8x8, ok. 4x wolniejsza)
+AI_WORKERS = 1 #liczba procesów wyszukujących ruch AI, przy więcej niż jednym używane jest wyszukiwanie równoległe
 
 """
 Inicjalizuje globalny słownik obrazów. Zostanie wywołane tylko jeden raz w funkcji main() ze względu na oszczędność zasobów 
@@ -31,19 +39,23 @@ def main():
     p.init()
     screen = p.display.set_mode((BOARD_WIDTH + MOVE_LOG_PANEL_WIDTH, BOARD_HEIGHT))
     clock = p.time.Clock()
-    screen.fill(p.Color("white"))
     move_log_font = p.font.SysFont("Arial", 16, False, False)
-    gs = Engine.GameState() #inicjalizacja obiektu Stanu Gry
+    gs = GAME_STATE() #inicjalizacja obiektu Stanu Gry
     valid_moves = gs.get_valid_moves()
     move_made = False #flaga sprawdzająca czy ruch został wykonany
     animate = False #flaga mówiąca kiedy ruch powinien być animowany
     load_images()
+    renderer = BoardRenderer(screen, move_log_font)
     running = True
     sq_selected = () #początkowo żadne pole nie jest zaznaczone, śledzi ostatnie kliknięcie użytkownika (krotka: (row, col))
     player_clicks = [] #śledzi kliknięcia użytkownika (dwie krotki: [(6, 4), (4, 4)] - odpowiada ruchowi pionka o dwa pola)
     game_over = False
+    draw_reason = None #remis przez powtórzenie pozycji lub zasadę 50 ruchów (Engine.DRAW_*)
     player_one = True #Kiedy człowiek gra białymi - True, gdy AI gra białymi - False
     player_two = True #Kiedy człowiek gra czarnymi - True, gdy AI gra czarnymi - False
+    parallel_search = ParallelSearch.ParallelSearch(AI_WORKERS) if AI_WORKERS > 1 else None
+    ai_search = None #wyszukiwanie ruchu AI działające w tle (ChessAI.BackgroundSearch), None gdy AI nie myśli
+    opening_book = OpeningBook.open_book() #None, gdy brak pliku księgi otwarć
     while running:
         is_human_turn = (gs.whiteToMove and player_one) or (not gs.whiteToMove and player_two) #(tura białych i człowiek gra białymi) lub (tura czarnych i człowiek gra czarnymi)
         for e in p.event.get():
@@ -74,16 +86,25 @@ def main():
                                 print(move.get_chess_notation())
                         if not move_made:
                             player_clicks = [sq_selected]
+            elif e.type == p.MOUSEWHEEL: #przewijanie logu ruchów
+                renderer.move_log_panel.scroll(-e.y)
             #obsługa klawiszy klawiaturowych
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z: #cofnij ruch po kliknięci 'z' na klawiaturze
+                    if ai_search is not None: #przerwanie wyszukiwania, które dotyczyło pozycji sprzed cofnięcia
+                        ai_search.cancel()
+                        ai_search = None
                     gs.undo_move() 
                     move_made = True
                     animate = False #przy cofaniu wykonanego ruchu animacja jest niepotrzebna
                     game_over = False
                 if e.key == p.K_r: #reset całej gry
-                    gs = Engine.GameState()
+                    if ai_search is not None:
+                        ai_search.cancel()
+                        ai_search = None
+                    gs = GAME_STATE()
                     valid_moves = gs.get_valid_moves()
+                    draw_reason = None
                     sq_selected = ()
                     player_clicks = []
                     move_made = False
@@ -91,43 +112,141 @@ def main():
                     game_over = False
 
 
-        #Ruchy AI
-        if not game_over and not is_human_turn:
-            AI_move = ChessAI.find_best_move_negamax_alphabeta_recursion_first_call(gs, valid_moves)
-            if AI_move is None:
-                AI_move = ChessAI.find_random_move(valid_moves)
-            gs.make_move(AI_move)
-            print(AI_move.get_chess_notation())
-            move_made = True
-            animate = True
+        #Ruchy AI - najpierw księga otwarć, potem wyszukiwanie w osobnym wątku, pętla działa dalej i tylko sprawdza, czy ruch jest gotowy
+        if not game_over and not is_human_turn and not move_made:
+            AI_move = None
+            if ai_search is None:
+                if opening_book is not None:
+                    AI_move = opening_book.choose_move(gs, valid_moves)
+                if AI_move is None:
+                    ai_search = ChessAI.BackgroundSearch(gs, ChessAI.MOVE_TIME_MS, parallel_search, info=ChessAI.print_search_info)
+            elif ai_search.done():
+                AI_move = ai_search.result(valid_moves)
+                ai_search = None
+                if AI_move is None:
+                    AI_move = ChessAI.find_random_move(valid_moves)
+            if AI_move is not None:
+                gs.make_move(AI_move)
+                print(AI_move.get_chess_notation())
+                move_made = True
+                animate = True
 
 
         if move_made:
             if animate:
-                animate_move(gs.moveLog[-1], screen, gs.board, clock)
+                animate_move(gs.moveLog[-1], screen, gs.board, clock, renderer)
             valid_moves = gs.get_valid_moves()
+            draw_reason = gs.get_draw_reason()
             move_made = False
             animate = False
 
-        draw_game_state(screen, gs, valid_moves, sq_selected, move_log_font)
-
+        end_text = None
         if gs.check_mate or gs.stale_mate:
             game_over = True
-            text =  "Koniec gry - pat" if gs.stale_mate else ("BLACK WON!!!" if gs.whiteToMove else "WHITE WON!!!")
-            draw_end_game_text(screen, text) #wypisanie na ekranie koncowego rezultatu gry
+            end_text =  "Koniec gry - pat" if gs.stale_mate else ("BLACK WON!!!" if gs.whiteToMove else "WHITE WON!!!")
+        elif draw_reason is not None:
+            game_over = True
+            end_text = "Remis - powtórzenie pozycji" if draw_reason == Engine.DRAW_REPETITION else "Remis - zasada 50 ruchów"
+        dirty_rects = renderer.render(gs, valid_moves, sq_selected, ai_search, end_text)
+        if dirty_rects: #bez zmian na ekranie klatka jest pomijana
+            p.display.update(dirty_rects)
         clock.tick(MAX_FPS)
-        p.display.flip()
+
+    if ai_search is not None:
+        ai_search.cancel()
+    if parallel_search is not None:
+        parallel_search.close()
+    if opening_book is not None:
+        opening_book.close()
+
 
 
+HIGHLIGHT_SELECTED = 1 #zaznaczona bierka
+HIGHLIGHT_TARGET = 2 #pole, na które może przejść zaznaczona bierka
+HIGHLIGHT_CAPTURE = 3 #pole z bierką przeciwnika, którą może zbić zaznaczona bierka
 
 """
-Odpowiedzialna za grafikę powiązaną z danym stanem gry 
+Warstwa rysowania odświeżająca tylko zmienione fragmenty ekranu (dirty rectangles). Pola szachownicy rysowane są raz
+do osobnej powierzchni, a w każdej klatce stan każdego pola (bierka i podświetlenie) porównywany jest z ostatnio
+narysowanym - przerysowywane są tylko pola, które się zmieniły. render() zwraca listę zmienionych prostokątów
+dla p.display.update(), pusta lista oznacza, że klatkę można pominąć
 """
-def draw_game_state(screen, gs, valid_moves, sq_selected, move_log_font):
-    drawBoard(screen) #rysuje pola na szachownicy
-    highlight_squares(screen, gs, valid_moves, sq_selected)
-    drawPieces(screen, gs.board) #rysuje figury szachowe na polach szachownicy 
-    drawMoveLog(screen, gs, move_log_font)
+class BoardRenderer():
+    def __init__(self, screen, font):
+        self.screen = screen
+        self.font = font
+        self.board_surface = p.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        drawBoard(self.board_surface)
+        self.overlays = {}
+        for highlight, layers in ((HIGHLIGHT_SELECTED, (("yellow", 100),)), (HIGHLIGHT_TARGET, (("green", 100),)),
+                                  (HIGHLIGHT_CAPTURE, (("green", 100), ("red", 150)))):
+            self.overlays[highlight] = []
+            for color, alpha in layers:
+                s = p.Surface((SQ_SIZE, SQ_SIZE))
+                s.set_alpha(alpha) #poziom przezroczystości - wartość 0 oznacza pełną przezroczystość, 255 oznacza brak pezroczystości
+                s.fill(p.Color(color))
+                self.overlays[highlight].append(s)
+        self.drawn_squares = [None] * (DIMENSION * DIMENSION) #(bierka, podświetlenie) narysowane na każdym polu
+        self.move_log_panel = MoveLogPanel(font)
+        self.panel_state = None
+        self.end_text = None
+
+    '''
+    Wymusza przerysowanie pól (lista krotek (row, column)) w następnej klatce, None - całego ekranu
+    '''
+    def invalidate(self, squares=None):
+        if squares is None:
+            self.drawn_squares = [None] * (DIMENSION * DIMENSION)
+            self.panel_state = None
+        else:
+            for row, column in squares:
+                self.drawn_squares[row * DIMENSION + column] = None
+
+    '''
+    Rysuje jedno pole: tło z powierzchni szachownicy, podświetlenie i bierkę. Zwraca prostokąt pola
+    '''
+    def draw_square(self, row, column, piece, highlight=0):
+        rect = p.Rect(column*SQ_SIZE, row*SQ_SIZE, SQ_SIZE, SQ_SIZE)
+        self.screen.blit(self.board_surface, rect, rect)
+        if highlight:
+            for overlay in self.overlays[highlight]:
+                self.screen.blit(overlay, rect)
+        if piece != "--": #Sprawdzenie czy pole nie jest puste
+            self.screen.blit(IMAGES[piece], rect)
+        return rect
+
+    '''
+    Przerysowuje pola, których bierka lub podświetlenie różni się od narysowanych, i zwraca ich prostokąty
+    '''
+    def update_squares(self, board, highlights):
+        dirty_rects = []
+        for r in range(DIMENSION):
+            for c in range(DIMENSION):
+                state = (board[r][c], highlights.get((r, c), 0))
+                if self.drawn_squares[r * DIMENSION + c] != state:
+                    dirty_rects.append(self.draw_square(r, c, *state))
+                    self.drawn_squares[r * DIMENSION + c] = state
+        return dirty_rects
+
+    def render(self, gs, valid_moves, sq_selected, ai_search=None, end_text=None):
+        if end_text != self.end_text: #napis końca gry zasłania środek planszy - po jego zmianie przerysowywana jest cała plansza
+            self.invalidate([(r, c) for r in range(DIMENSION) for c in range(DIMENSION)])
+        dirty_rects = self.update_squares(gs.board, get_highlights(gs, valid_moves, sq_selected))
+        if end_text is not None and dirty_rects:
+            draw_end_game_text(self.screen, end_text) #wypisanie na ekranie koncowego rezultatu gry
+            dirty_rects.append(p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT))
+        self.end_text = end_text
+
+        text = thinking_text(ai_search) if ai_search is not None else None
+        panel_state = (len(gs.moveLog), gs.moveLog[-1].move_id if gs.moveLog else 0, text, self.move_log_panel.first_line)
+        if panel_state != self.panel_state:
+            self.move_log_panel.draw(self.screen, gs)
+            if text is not None:
+                draw_thinking_text(self.screen, text, self.font)
+            dirty_rects.append(p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT))
+            self.panel_state = panel_state
+        return dirty_rects
+
 
 """
 rysuje pola na szachownicy. Pole w lewym górnym rogu jest jasnego koloru
@@ -142,101 +261,139 @@ def drawBoard(screen):
 
 
 """
-Funkcja odpowiedzialna za podświetlenie wybranej bierki i pól na które dana bierka może przejść w danym ruchu
+Podświetlenie wybranej bierki i pól, na które dana bierka może przejść w danym ruchu: słownik (row, column) -> rodzaj podświetlenia
 """
-def highlight_squares(screen, gs, valid_moves, sq_selected):
+def get_highlights(gs, valid_moves, sq_selected):
+    highlights = {}
     if sq_selected != ():
         row, col = sq_selected
         if gs.board[row][col][0] == ('w' if gs.whiteToMove else 'b'): #zaznaczone pole należy do gracza wykonującego ruch w danej turze
-            #podświetlenie zaznaczonego pola
-            s = p.Surface((SQ_SIZE, SQ_SIZE))
-            s.set_alpha(100) #poziom przezroczystości - wartość 0 oznacza pełną przezroczystość, 255 oznacza brak pezroczystości
-            s.fill(p.Color('yellow'))
-            screen.blit(s, (col*SQ_SIZE, row*SQ_SIZE))
-            #podświetlenie pól na które dana bierka może przejść w danym ruchu
-            s.fill(p.Color('green'))
+            highlights[(row, col)] = HIGHLIGHT_SELECTED
+            enemy_color = 'b' if gs.whiteToMove else 'w'
             for move in valid_moves:
                 if move.start_row == row and move.start_column == col:
-                    screen.blit(s, (move.end_column * SQ_SIZE, move.end_row * SQ_SIZE))
-            s.fill(p.Color('red'))
-            s.set_alpha(150)
-            for move in valid_moves:
-                if move.start_row == row and move.start_column == col:
-                    if gs.board[move.end_row][move.end_column][0] == ('b' if gs.whiteToMove else 'w'):
-                        screen.blit(s, (move.end_column * SQ_SIZE, move.end_row *SQ_SIZE))
+                    capture = gs.board[move.end_row][move.end_column][0] == enemy_color
+                    highlights[(move.end_row, move.end_column)] = HIGHLIGHT_CAPTURE if capture else HIGHLIGHT_TARGET
+    return highlights
 
 """
-Rysuje figury na szachownicy w oparciu o aktualny stan gry: GamesState.board
+Log z wykonanymi ruchami po prawej stronie szachownicy. Napisy ruchów i wyrenderowane wiersze są zapamiętywane -
+nowy ruch renderuje tylko swój wiersz, a cofnięcie ruchu unieważnia tylko ostatni. Rysowane są wyłącznie wiersze
+mieszczące się w panelu: domyślnie ostatnie, a po przewinięciu (scroll) wybrany fragment logu
 """
-def drawPieces(screen, board):
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            piece = board[r][c]
-            if piece != "--": #Sprawdzenie czy pole nie jest puste
-                screen.blit(IMAGES[piece], p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE))
-
-"""
-Wypisuje log z wykonanymi ruchami po prawej stronie szachownicy
-"""
-def drawMoveLog(screen, gs, font):
-    move_log_rect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
-    p.draw.rect(screen, p.Color("#E7DFC6"), move_log_rect)
-    move_log = gs.moveLog
-    move_texts = []
-    for i in range(0, len(move_log), 2):
-        move_string = str(i//2 + 1) + ". " + str(move_log[i]) + " " #pierwsza tura wyświetlana jako 1. a nie 0. oraz dwa ruchy stanowią jedną pełną turę
-        if i+1 < len(move_log): #warunek zapewniający, że drugi gracz wykonał swój ruch
-            move_string += str(move_log[i+1]) + " "
-        move_texts.append(move_string) 
-    
-    moves_per_row = 3
-    padding_text = 5
-    line_spacing = 2
-    text_y = padding_text
-    for i in range(0, len(move_texts), moves_per_row):
+class MoveLogPanel():
+    def __init__(self, font):
+        self.font = font
+        self.moves = [] #ruchy, dla których zbudowane są napisy (porównywane z gs.moveLog po tożsamości obiektów)
+        self.move_strings = []
+        self.lines = [] #wyrenderowane wiersze, None - wiersz do wyrenderowania
+        self.line_height = font.get_linesize() + MOVE_LOG_LINE_SPACING
+        #ostatni wiersz panelu zajmuje wskaźnik pracy AI
+        self.visible_lines = (MOVE_LOG_PANEL_HEIGHT - 2 * MOVE_LOG_PADDING) // self.line_height - 1
+        self.first_line = None #pierwszy widoczny wiersz, None - log przewijany automatycznie do ostatniego ruchu
+
+    '''
+    Dopasowuje zapamiętane napisy do gs.moveLog: usuwa cofnięte ruchy i dodaje nowe, unieważniając ich wiersze
+    '''
+    def sync(self, move_log):
+        plies_per_line = 2 * MOVES_PER_ROW
+        while len(self.moves) > len(move_log) or (self.moves and self.moves[-1] is not move_log[len(self.moves) - 1]):
+            self.moves.pop()
+            self.move_strings.pop()
+            self.lines[len(self.moves) // plies_per_line] = None
+        while len(self.moves) < len(move_log):
+            move = move_log[len(self.moves)]
+            if len(self.moves) % plies_per_line == 0:
+                self.lines.append(None)
+            self.lines[len(self.moves) // plies_per_line] = None
+            self.moves.append(move)
+            self.move_strings.append(str(move))
+        del self.lines[(len(self.moves) + plies_per_line - 1) // plies_per_line:]
+
+    def render_line(self, index):
         text = ""
-        for j in range(moves_per_row):
-            if i + j < len(move_texts):
-                text += move_texts[i+j]
-        text_object = font.render(text, True, p.Color("#131B23"))
-        text_location = move_log_rect.move(padding_text, text_y)
-        screen.blit(text_object, text_location)
-        text_y += text_object.get_height() + line_spacing
+        start = index * 2 * MOVES_PER_ROW
+        for i in range(start, min(start + 2 * MOVES_PER_ROW, len(self.move_strings)), 2):
+            text += str(i//2 + 1) + ". " + self.move_strings[i] + " " #pierwsza tura wyświetlana jako 1. a nie 0. oraz dwa ruchy stanowią jedną pełną turę
+            if i+1 < len(self.move_strings): #warunek zapewniający, że drugi gracz wykonał swój ruch
+                text += self.move_strings[i+1] + " "
+        return self.font.render(text, True, p.Color("#131B23"))
 
+    def get_first_line(self):
+        last_first_line = max(0, len(self.lines) - self.visible_lines)
+        return last_first_line if self.first_line is None else min(self.first_line, last_first_line)
+
+    '''
+    Przewija log o lines wierszy (ujemne - w górę). Przewinięcie do końca przywraca automatyczne przewijanie
+    '''
+    def scroll(self, lines):
+        first_line = max(0, self.get_first_line() + lines)
+        self.first_line = first_line if first_line < max(0, len(self.lines) - self.visible_lines) else None
+
+    def draw(self, screen, gs):
+        self.sync(gs.moveLog)
+        move_log_rect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
+        p.draw.rect(screen, p.Color("#E7DFC6"), move_log_rect)
+        first_line = self.get_first_line()
+        text_y = MOVE_LOG_PADDING
+        for index in range(first_line, min(len(self.lines), first_line + self.visible_lines)):
+            if self.lines[index] is None:
+                self.lines[index] = self.render_line(index)
+            screen.blit(self.lines[index], move_log_rect.move(MOVE_LOG_PADDING, text_y))
+            text_y += self.line_height
 
 
 """
-Funkcja odpowiedzialna za animację ruchu
+Wskaźnik pracy AI na dole panelu z logiem ruchów: czas, ukończona głębokość i liczba przeszukanych węzłów
 """
-def animate_move(move, screen, board, clock):
-    global colors
+def thinking_text(ai_search):
+    return "AI myśli... %.1fs  głębokość %d  węzły %d" % (ai_search.seconds(), ai_search.depth, ai_search.nodes())
+
+def draw_thinking_text(screen, text, font):
+    text_object = font.render(text, True, p.Color("#131B23"))
+    text_location = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT).move(5, MOVE_LOG_PANEL_HEIGHT - text_object.get_height() - 5)
+    screen.blit(text_object, text_location)
+
+"""
+Funkcja odpowiedzialna za animację ruchu. Plansza po ruchu rysowana jest raz, a w każdej klatce odświeżane są tylko
+dwa pola: poprzednie i bieżące położenie poruszającej się bierki
+"""
+def animate_move(move, screen, board, clock, renderer):
+    dirty_rects = renderer.update_squares(board, {})
+    #wykasowanie poruszanej bierki z jej końcowego pola
+    captured_squares = [(move.end_row, move.end_column)]
+    dirty_rects.append(renderer.draw_square(move.end_row, move.end_column, "--" if move.en_passant else move.piece_captured))
+    #ponowne narysowanie zbitej figury w przypadku bicia w przelocie
+    if move.en_passant:
+        en_passant_row = move.end_row + 1 if move.piece_captured[0] == 'b' else move.end_row - 1
+        captured_squares.append((en_passant_row, move.end_column))
+        dirty_rects.append(renderer.draw_square(en_passant_row, move.end_column, move.piece_captured))
+    renderer.invalidate(captured_squares) #po animacji pola zostaną narysowane zgodnie ze stanem gry
+    p.display.update(dirty_rects)
+    background = screen.copy()
+
     dR = move.end_row - move.start_row
     dC = move.end_column - move.start_column
     frames_per_square = 3 #liczba klatek odpowiadająca ruchowi o jedno pole
     frame_count = (abs(dR) + abs(dC)) * frames_per_square
+    previous_rect = None
     for frame in range(frame_count + 1):
         row, column = (move.start_row + dR*frame/frame_count, move.start_column + dC*frame/frame_count)
-        drawBoard(screen)
-        drawPieces(screen, board)
-        #wykasowanie poruszanej bierki z jej końcowego pola
-        color = colors[(move.end_row + move.end_column)%2]
-        end_square = p.Rect(move.end_column*SQ_SIZE, move.end_row*SQ_SIZE, SQ_SIZE, SQ_SIZE)
-        p.draw.rect(screen, color, end_square)
-        #ponowne narysowanie zbitej figury w przypadku, gdy ruch był biciem
-        if move.piece_captured != "--":
-            if move.en_passant:
-                en_passant_row = move.end_row + 1 if move.piece_captured[0] == 'b' else move.end_row - 1
-                end_square = p.Rect(move.end_column*SQ_SIZE, en_passant_row*SQ_SIZE, SQ_SIZE, SQ_SIZE) 
-            screen.blit(IMAGES[move.piece_captured], end_square)
+        rect = p.Rect(column * SQ_SIZE, row * SQ_SIZE, SQ_SIZE, SQ_SIZE)
+        dirty_rects = [rect]
+        if previous_rect is not None:
+            screen.blit(background, previous_rect, previous_rect)
+            dirty_rects.append(previous_rect)
         #narysowanie poruszającej się figury
-        screen.blit(IMAGES[move.piece_moved], p.Rect(column * SQ_SIZE, row * SQ_SIZE, SQ_SIZE, SQ_SIZE))
-        p.display.flip()
+        screen.blit(IMAGES[move.piece_moved], rect)
+        p.display.update(dirty_rects)
+        previous_rect = rect
         clock.tick(60)
 
 def draw_end_game_text(screen, text):
     font = p.font.SysFont("Helvitca", 32, True, False)
     text_object = font.render(text, 0, p.Color("green"))
-    text_location = p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT).move(BOARD_WIDTH/2 - text_object.get_BOARD_WIDTH()/2, BOARD_HEIGHT/2 - text_object.get_BOARD_HEIGHT()/2) #wyśrodkowanie napisu na ekranie
+    text_location = p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT).move(BOARD_WIDTH/2 - text_object.get_width()/2, BOARD_HEIGHT/2 - text_object.get_height()/2) #wyśrodkowanie napisu na ekranie
     screen.blit(text_object, text_location)
     text_object = font.render(text, 0, p.Color("blue"))
     screen.blit(text_object, text_location.move(2, 2))
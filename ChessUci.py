@@ -0,0 +1,162 @@
+"""Silnik szachowy w protokole UCI (stdin/stdout) - do gry z innymi programami i analizy bez interfejsu graficznego.
+Nie importuje pygame ani nie wczytuje obrazów, więc startuje szybko i można uruchomić wiele procesów naraz.
+Obsługiwane komendy: uci, isready, ucinewgame, setoption name Hash value <MB>, position [startpos | fen <FEN>]
+[moves <ruchy>], go [depth N] [movetime ms] [wtime ms] [btime ms] [winc ms] [binc ms] [movestogo N] [infinite], stop, quit.
+Przykład użycia:
+    echo -e "position startpos moves e2e4\\ngo depth 4" | python ChessUci.py
+"""
+
+import sys
+import threading
+
+import Bitboard
+import ChessAI
+
+ENGINE_NAME = "ChessEngine"
+ENGINE_AUTHOR = "ChessEngine developers"
+MAX_HASH_MB = 1024
+GAME_STATE = Bitboard.BitboardGameState #reprezentacja planszy (Engine.GameState - lista 8x8, ok. 4x wolniejsza)
+
+
+"""
+Wynik w formacie UCI z perspektywy strony na ruchu: "cp <setne części piona>" lub "mate <liczba ruchów>"
+(ujemna, gdy strona na ruchu dostaje mata)
+"""
+def format_score(score):
+    if score > ChessAI.MATE_THRESHOLD:
+        return "mate %d" % ((ChessAI.CHECKMATE - score + 1) // 2)
+    if score < -ChessAI.MATE_THRESHOLD:
+        return "mate %d" % -((ChessAI.CHECKMATE + score) // 2)
+    return "cp %d" % score
+
+
+class UciEngine():
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock() #informacje z wątku wyszukiwania i odpowiedzi na komendy nie mogą się przeplatać
+        self.gs = GAME_STATE()
+        self.stop_event = threading.Event()
+        self.search_thread = None
+        self.infinite = False
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    '''
+    Obsługuje jedną linię z wejścia. Zwraca False po komendzie quit
+    '''
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            self.send("id name %s" % ENGINE_NAME)
+            self.send("id author %s" % ENGINE_AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max %d" % (ChessAI.TT_SIZE_MB, MAX_HASH_MB))
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            ChessAI.transposition_table.clear()
+            ChessAI.pawn_table.clear()
+            self.gs = GAME_STATE()
+        elif command == "setoption":
+            self.set_option(tokens[1:])
+        elif command == "position":
+            self.stop()
+            self.set_position(tokens[1:])
+        elif command == "go":
+            self.stop()
+            self.go(tokens[1:])
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True #nieznane komendy są pomijane, zgodnie z protokołem
+
+    def set_option(self, tokens):
+        if "name" not in tokens or "value" not in tokens:
+            return
+        name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")]).lower()
+        value = " ".join(tokens[tokens.index("value") + 1:])
+        if name == "hash" and value.isdigit():
+            self.stop()
+            ChessAI.set_hash_size(max(1, min(int(value), MAX_HASH_MB)))
+
+    '''
+    position startpos [moves ...] lub position fen <6 pól FEN> [moves ...]. Ruchy w notacji e2e4, e7e8q, e1g1
+    '''
+    def set_position(self, tokens):
+        moves_index = tokens.index("moves") if "moves" in tokens else len(tokens)
+        if tokens and tokens[0] == "fen":
+            try:
+                self.gs = GAME_STATE.from_fen(" ".join(tokens[1:moves_index]))
+            except ValueError:
+                self.send("info string invalid fen")
+                return
+        else:
+            self.gs = GAME_STATE()
+        for notation in tokens[moves_index + 1:]:
+            move = next((move for move in self.gs.get_valid_moves() if move.get_chess_notation() == notation), None)
+            if move is None:
+                self.send("info string illegal move %s" % notation)
+                break
+            self.gs.make_move(move)
+
+    def go(self, tokens):
+        options = {}
+        for i, token in enumerate(tokens[:-1]):
+            if token in ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo") and tokens[i + 1].lstrip("-").isdigit():
+                options[token] = int(tokens[i + 1])
+        #bez limitu głębokości i czasu wyszukiwanie trwa do komendy stop
+        self.infinite = "infinite" in tokens or not any(key in options for key in ("depth", "movetime", "wtime", "btime"))
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.search, args=(options, self.infinite), daemon=True)
+        self.search_thread.start()
+
+    def search(self, options, infinite):
+        valid_moves = self.gs.get_valid_moves()
+        move = ChessAI.find_best_move_iterative_deepening(
+            self.gs, valid_moves, move_time_ms=options.get("movetime"), max_depth=options.get("depth", ChessAI.MAX_DEPTH),
+            wtime=options.get("wtime"), btime=options.get("btime"), winc=options.get("winc", 0), binc=options.get("binc", 0),
+            movestogo=options.get("movestogo"), info=self.info, stop_event=self.stop_event)
+        if infinite: #w trybie infinite bestmove wysyłany jest dopiero po komendzie stop
+            self.stop_event.wait()
+        self.send("bestmove %s" % (move.get_chess_notation() if move is not None else "0000"))
+
+    def info(self, depth, score, nodes, seconds, pv):
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" % (
+            depth, format_score(score), nodes, nodes / seconds if seconds > 0 else 0, seconds * 1000,
+            " ".join(move.get_chess_notation() for move in pv)))
+
+    '''
+    Przerywa trwające wyszukiwanie i czeka, aż wątek wyśle bestmove
+    '''
+    def stop(self):
+        if self.search_thread is not None:
+            self.stop_event.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+
+def main(input=sys.stdin, output=sys.stdout):
+    engine = UciEngine(output)
+    while True:
+        line = input.readline()
+        if not line: #koniec wejścia działa jak quit, ale wyszukiwanie z limitem głębokości lub czasu może się zakończyć
+            if engine.search_thread is not None and not engine.infinite:
+                engine.search_thread.join()
+            engine.stop()
+            break
+        if not engine.handle(line):
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
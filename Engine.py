@@ -3,40 +3,236 @@ Odpowiada również za określanie legalnych ruchów przy danym stanie gry
 Zawiera log z wykonanymi ruchami
 """
 
+import random
+
 class GameState():
-    def __init__(self):
+    def __init__(self, fen=None):
+        self.move_functions = {"p": self.get_pawn_moves, "R": self.get_rook_moves, "N": self.get_knight_moves,
+                               "B": self.get_bishop_moves, "Q": self.get_queen_moves, "K": self.get_king_moves}
+        self.capture_functions = {"p": self.get_pawn_captures, "R": self.get_rook_captures, "N": self.get_knight_captures,
+                                  "B": self.get_bishop_captures, "Q": self.get_queen_captures, "K": self.get_king_captures}
+        self.quiet_functions = {"p": self.get_pawn_quiets, "R": self.get_rook_quiets, "N": self.get_knight_quiets,
+                                "B": self.get_bishop_quiets, "Q": self.get_queen_quiets, "K": self.get_king_quiets}
+        self.is_in_check = False
+        self.pin_masks = {} #pole związanej figury -> maska pól na linii związania (wyznaczane w get_valid_moves)
+        self.check_mask = ALL_SQUARES #pola, na które musi trafić figura inna niż król, aby zasłonić szacha lub zbić szachującą figurę
+        self.zobrist_self_check = False #tryb diagnostyczny - po każdym ruchu klucz jest porównywany z kluczem liczonym od zera
+        self.evaluation_self_check = False #tryb diagnostyczny - po każdym ruchu ocena jest porównywana z oceną liczoną od zera
+        #stos stanów do cofania ruchów - rekord o indeksie len(moveLog) zapisywany jest w make_move, rekordy są używane ponownie.
+        #Rekordy tworzone są porcjami dopiero przy wykonywaniu ruchów, więc wczytanie pozycji ich nie alokuje
+        self.undo_stack = []
         #Reprezentacja planszy przy pomocy 8x8 2d listy, każdy element listy składa się z 2 znaków
         #Pierwszy znak reprezentuje kolor danej figury: b-black, w-white
         #Drugi znak reprezentuje rodzaj figury: R - Rook, N - Knight, B - Bishop, Q - Queen, K - King, p - pawn
         # "--" oznacza niezajęte pole na szachownicy
-        self.board = [
-            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"], 
-            ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
-            ["--", "--", "--", "--","--", "--","--", "--"],
-            ["--", "--", "--", "--","--", "--","--", "--"],
-            ["--", "--", "--", "--","--", "--","--", "--"],
-            ["--", "--", "--", "--","--", "--","--", "--"],
-            ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
-        self.move_functions = {"p": self.get_pawn_moves, "R": self.get_rook_moves, "N": self.get_knight_moves,
-                               "B": self.get_bishop_moves, "Q": self.get_queen_moves, "K": self.get_king_moves}
-        self.whiteToMove = True
+        #Pozostały stan pozycji (strona na ruchu, prawa do roszady, liczniki, klucze, ocena, listy figur) ustawia set_fen.
+        #Bez podanego FEN gra zaczyna się od pozycji początkowej
+        self.set_fen((fen or START_FEN).split())
+
+
+    '''
+    Tworzy stan gry z pozycji zapisanej w notacji FEN. Pola FEN dotyczące liczników ruchów są opcjonalne
+    '''
+    @classmethod
+    def from_fen(cls, fen):
+        return cls(fen)
+
+    '''
+    Tworzy stan gry z linii EPD, zwraca krotkę (stan gry, słownik operacji EPD np. {"bm": "Nf3", "D1": "20"})
+    '''
+    @classmethod
+    def from_epd(cls, line):
+        segments = line.split(";")
+        fields = segments[0].split()
+        #po 4 polach pozycji mogą wystąpić liczniki ruchów (zapis FEN) lub pierwsza operacja EPD
+        position_fields = 6 if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else 4
+        gs = cls(" ".join(fields[:position_fields]))
+        operations = {}
+        segments[0] = " ".join(fields[position_fields:])
+        for segment in segments:
+            operation = segment.split(None, 1)
+            if operation:
+                operations[operation[0]] = operation[1].strip().strip('"') if len(operation) > 1 else ""
+        return gs, operations
+
+    '''
+    Ustawia pozycję opisaną polami FEN: rozstawienie figur, strona na ruchu, prawa do roszady, pole bicia w przelocie,
+    licznik półruchów, numer ruchu. Stan pochodny (położenia królów, listy figur, klucze Zobrista, ocena) wyznaczany
+    jest w jednym przejściu podczas wczytywania rozstawienia.
+    Niepoprawny zapis (inna liczba rzędów lub pól w rzędzie, brak lub nadmiar królów, pion na pierwszym lub ostatnim rzędzie,
+    nieznana strona na ruchu, pole bicia w przelocie bez piona po ruchu o dwa pola, szach dla strony, która nie ma ruchu)
+    powoduje ValueError. Prawa do roszady bez króla i wieży na polach początkowych są pomijane
+    '''
+    def set_fen(self, fields):
+        if len(fields) < 4:
+            raise ValueError("FEN: oczekiwano co najmniej 4 pól: %s" % " ".join(fields))
+        board = []
+        white_king_location = black_king_location = None
+        piece_squares = {"w": set(), "b": set()}
+        key = pawn_key = mg = eg = phase = 0
+        for rank in fields[0].split("/"):
+            row = []
+            first_square = len(board) * 8
+            for char in rank:
+                data = FEN_PIECE_DATA.get(char)
+                if data is None: #cyfra oznacza liczbę kolejnych pustych pól
+                    if char not in EMPTY_RUNS:
+                        raise ValueError("FEN: niepoprawny znak %r w rozstawieniu figur" % char)
+                    row.extend(EMPTY_RUNS[char])
+                    continue
+                square = first_square + len(row)
+                piece, color, zobrist, square_mg, square_eg, phase_weight = data
+                if piece[1] == "p":
+                    if len(board) in (0, 7):
+                        raise ValueError("FEN: pion na pierwszym lub ostatnim rzędzie: %s" % rank)
+                    pawn_key ^= zobrist[square]
+                elif piece == "wK":
+                    white_king_location = (len(board), len(row))
+                elif piece == "bK":
+                    black_king_location = (len(board), len(row))
+                piece_squares[color].add(square)
+                key ^= zobrist[square]
+                mg += square_mg[square]
+                eg += square_eg[square]
+                phase += phase_weight
+                row.append(piece)
+            if len(row) != 8:
+                raise ValueError("FEN: rząd %s nie ma 8 pól" % rank)
+            board.append(row)
+        if len(board) != 8:
+            raise ValueError("FEN: rozstawienie figur nie ma 8 rzędów")
+        if fields[0].count("K") != 1 or fields[0].count("k") != 1:
+            raise ValueError("FEN: każda strona musi mieć dokładnie jednego króla")
+        if fields[1] not in ("w", "b"):
+            raise ValueError("FEN: niepoprawna strona na ruchu %r" % fields[1])
+        if fields[2] != "-" and any(char not in "KQkq" for char in fields[2]):
+            raise ValueError("FEN: niepoprawne prawa do roszady %r" % fields[2])
+        if fields[3] != "-" and (len(fields[3]) != 2 or fields[3][0] not in Move.files_to_cols or
+                                 fields[3][1] != ("6" if fields[1] == "w" else "3")):
+            raise ValueError("FEN: niepoprawne pole bicia w przelocie %r" % fields[3])
+        if fields[3] != "-": #pion, który wykonał ruch o dwa pola, stoi za polem bicia, a pole bicia i pole startowe piona są puste
+            row, column = Move.ranks_to_rows[fields[3][1]], Move.files_to_cols[fields[3][0]]
+            direction, pawn = (1, "bp") if fields[1] == "w" else (-1, "wp")
+            if board[row + direction][column] != pawn or board[row][column] != "--" or board[row - direction][column] != "--":
+                raise ValueError("FEN: pole bicia w przelocie %r bez piona, który wykonał ruch o dwa pola" % fields[3])
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0 #liczba półruchów od ostatniego bicia lub ruchu pionem (zasada 50 ruchów)
+        self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1 #numer pełnego ruchu, zwiększany po ruchu czarnych
+        self.board = board
+        self.white_king_location = white_king_location
+        self.black_king_location = black_king_location
+        self.piece_squares = piece_squares #listy figur: zbiory pól (row * 8 + column) zajętych przez każdy kolor
+        self.whiteToMove = fields[1] == "w"
+        waiting_king_row, waiting_king_column = black_king_location if self.whiteToMove else white_king_location
+        if self.is_attacked_by(waiting_king_row, waiting_king_column, fields[1]): #ruch mógłby zbić króla
+            raise ValueError("FEN: król strony, która nie ma ruchu, jest szachowany")
+        castling_rights = 0 #prawa do roszady jako 4 bity (CASTLE_WKS, CASTLE_BKS, CASTLE_WQS, CASTLE_BQS)
+        for char, right in CASTLING_FEN:
+            if char in fields[2]:
+                castling_rights |= right
+        for square, piece in CASTLING_HOME_SQUARES: #prawo do roszady wymaga króla i wieży na polach początkowych
+            if board[square >> 3][square & 7] != piece:
+                castling_rights &= CASTLING_MASKS[square]
+        self.castling_rights = castling_rights
+        key ^= ZOBRIST_CASTLING[castling_rights]
+        if fields[3] != "-": #współrzędne pola, na którym jest możliwe bicie w przelocie
+            self.en_passant_possible = (Move.ranks_to_rows[fields[3][1]], Move.files_to_cols[fields[3][0]])
+            key ^= self.en_passant_key()
+        else:
+            self.en_passant_possible = ()
+        if not self.whiteToMove:
+            key ^= ZOBRIST_BLACK_TO_MOVE
         self.moveLog = []
-        self.white_king_location = (7, 4)
-        self.black_king_location = (0, 4)
-        self.is_in_check = False
-        self.pins = []
-        self.checks = []
         self.check_mate = False
         self.stale_mate = False
-        self.en_passant_possible = () #współrzędne pola, na którym jest możliwe bicie w przelocie
-        self.en_passant_possible_log = [self.en_passant_possible]
-        self.current_castling_rights = CastleRights(True, True, True, True)
-        self.castle_rights_log = [CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
-                                                 self.current_castling_rights.wqs, self.current_castling_rights.bks)]
+        self.enemy_attack_map = None #pola atakowane przez przeciwnika w bieżącej pozycji, liczone przy pierwszym użyciu
+        self.zobrist_key = key #64-bitowy klucz pozycji, aktualizowany przyrostowo w make_move
+        self.pawn_key = pawn_key #klucz Zobrista samego ustawienia pionów (do tablicy ocen struktury pionowej)
+        #ocena materiału i pozycji figur z perspektywy białych (gra środkowa, końcówka) oraz faza gry, aktualizowane w make_move
+        self.mg_score, self.eg_score, self.phase = mg, eg, phase
+
+    '''
+    Legalny ruch zapisany w notacji algebraicznej (SAN, np. Nf3, exd5, O-O, e8=Q+, R1a3) lub None, gdy zapis nie
+    odpowiada dokładnie jednemu legalnemu ruchowi
+    '''
+    def move_from_san(self, san, valid_moves=None):
+        if valid_moves is None:
+            valid_moves = self.get_valid_moves()
+        san = san.rstrip("+#!?")
+        if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+            queenside = len(san) == 5
+            for move in valid_moves:
+                if move.is_castle_move and (move.end_column == 2) == queenside:
+                    return move
+            return None
+        promotion_piece = None
+        if "=" in san:
+            san, promotion_piece = san.split("=", 1)
+        elif len(san) > 2 and san[0].islower() and san[-1] in "QRBN": #promocja bez znaku "=", np. e8Q
+            san, promotion_piece = san[:-1], san[-1]
+        piece = san[0] if san[:1] in ("K", "Q", "R", "B", "N") else "p"
+        body = (san[1:] if piece != "p" else san).replace("x", "").replace(":", "")
+        if len(body) < 2 or body[-2] not in Move.files_to_cols or body[-1] not in Move.ranks_to_rows:
+            return None
+        end_row = Move.ranks_to_rows[body[-1]]
+        end_column = Move.files_to_cols[body[-2]]
+        candidates = []
+        for move in valid_moves:
+            if move.piece_moved[1] != piece or move.end_row != end_row or move.end_column != end_column:
+                continue
+            if move.pawn_promotion and move.promotion_piece != promotion_piece:
+                continue
+            #ujednoznacznienie: kolumna i/lub rząd pola startowego
+            if all(move.start_column == Move.files_to_cols[char] if char in Move.files_to_cols else
+                   move.start_row == Move.ranks_to_rows.get(char) for char in body[:-2]):
+                candidates.append(move)
+        return candidates[0] if len(candidates) == 1 else None
+
+    '''
+    Zwraca bieżącą pozycję w notacji FEN
+    '''
+    def to_fen(self):
+        ranks = []
+        for row in self.board:
+            rank = []
+            empty = 0
+            for piece in row:
+                if piece == "--":
+                    empty += 1
+                else:
+                    if empty:
+                        rank.append(str(empty))
+                        empty = 0
+                    rank.append(PIECE_TO_FEN[piece])
+            if empty:
+                rank.append(str(empty))
+            ranks.append("".join(rank))
+        castling = "".join(char for char, right in CASTLING_FEN if self.castling_rights & right)
+        if self.en_passant_possible != ():
+            en_passant = Move.cols_to_files[self.en_passant_possible[1]] + Move.rows_to_ranks[self.en_passant_possible[0]]
+        else:
+            en_passant = "-"
+        return " ".join(("/".join(ranks), "w" if self.whiteToMove else "b", castling or "-", en_passant,
+                         str(self.halfmove_clock), str(self.fullmove_number)))
 
 
     def make_move(self, move):
+        #składnik klucza z kolumną bicia w przelocie zależy od ustawienia pionów, więc jest liczony przed zmianą planszy
+        key = self.zobrist_key ^ self.en_passant_key() if self.en_passant_possible != () else self.zobrist_key
+        #zapamiętanie stanu, którego nie da się odtworzyć z samego ruchu - bez tworzenia nowych obiektów
+        ply = len(self.moveLog)
+        if ply == len(self.undo_stack):
+            self.undo_stack.extend(UndoRecord() for i in range(UNDO_STACK_CHUNK))
+        record = self.undo_stack[ply]
+        record.castling_rights = self.castling_rights
+        record.en_passant_possible = self.en_passant_possible
+        record.halfmove_clock = self.halfmove_clock
+        record.zobrist_key = self.zobrist_key
+        record.pawn_key = self.pawn_key
+        record.mg_score = self.mg_score
+        record.eg_score = self.eg_score
+        record.phase = self.phase
+
+        self.enemy_attack_map = None
         self.board[move.start_row][move.start_column] = "--"
         self.board[move.end_row][move.end_column] = move.piece_moved
         self.moveLog.append(move) #dodanie wykonanego ruchu do logu
@@ -56,8 +252,7 @@ class GameState():
             self.board[move.start_row][move.end_column] = "--"
         #promocja pionów
         if move.pawn_promotion:
-            promoted_piece = "Q" #TO-DO do wykorzystania przy rozwijaniu UI
-            self.board[move.end_row][move.end_column] = move.piece_moved[0] + promoted_piece
+            self.board[move.end_row][move.end_column] = move.piece_moved[0] + move.promotion_piece
         #roszada
         if move.is_castle_move:
             if move.end_column - move.start_column == 2: #król dokonuje roszady na skrzydle królewskim
@@ -67,18 +262,73 @@ class GameState():
                 self.board[move.end_row][move.end_column+1] = self.board[move.end_row][move.end_column-2] #jedno pole po prawej od króla po roszadzie = wieża (która znajdowała się dwa pola po lewej od pola na którym wylądował króla po roszadzie)
                 self.board[move.end_row][move.end_column-2] = "--"
 
-        self.en_passant_possible_log.append(self.en_passant_possible)
+        #liczniki ruchów - bicie lub ruch pionem zeruje licznik półruchów
+        if move.piece_moved[1] == 'p' or move.is_capture:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if move.piece_moved[0] == 'b':
+            self.fullmove_number += 1
 
         #aktualizacja praw do roszady - w przypadk ruchu którejś z wież lub króli
         self.update_castle_rights(move)
-        self.castle_rights_log.append(CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
-                                                 self.current_castling_rights.wqs, self.current_castling_rights.bks))
+
+        #przyrostowa aktualizacja klucza Zobrista (XOR usuwa lub dodaje składnik klucza) oraz oceny materiału i pozycji figur
+        start_square = move.start_row * 8 + move.start_column
+        end_square = move.end_row * 8 + move.end_column
+        piece_moved = move.piece_moved
+        piece_placed = self.board[move.end_row][move.end_column] #po promocji na polu stoi już nowa figura
+        key ^= ZOBRIST_BLACK_TO_MOVE
+        key ^= ZOBRIST_PIECES[piece_moved][start_square] ^ ZOBRIST_PIECES[piece_placed][end_square]
+        own_squares = self.piece_squares[piece_moved[0]]
+        own_squares.remove(start_square)
+        own_squares.add(end_square)
+        mg = self.mg_score + PIECE_SQUARE_MG[piece_placed][end_square] - PIECE_SQUARE_MG[piece_moved][start_square]
+        eg = self.eg_score + PIECE_SQUARE_EG[piece_placed][end_square] - PIECE_SQUARE_EG[piece_moved][start_square]
+        if move.pawn_promotion:
+            self.phase += PHASE_WEIGHTS[move.promotion_piece]
+        if move.is_capture:
+            captured = move.piece_captured
+            captured_square = move.start_row * 8 + move.end_column if move.en_passant else end_square
+            key ^= ZOBRIST_PIECES[captured][captured_square]
+            self.piece_squares[captured[0]].remove(captured_square)
+            mg -= PIECE_SQUARE_MG[captured][captured_square]
+            eg -= PIECE_SQUARE_EG[captured][captured_square]
+            self.phase -= PHASE_WEIGHTS[captured[1]]
+            if captured[1] == 'p':
+                self.pawn_key ^= ZOBRIST_PIECES[captured][captured_square]
+        if piece_moved[1] == 'p': #klucz pionów zmienia się tylko przy ruchu piona (po promocji pion znika z planszy)
+            self.pawn_key ^= ZOBRIST_PIECES[piece_moved][start_square]
+            if not move.pawn_promotion:
+                self.pawn_key ^= ZOBRIST_PIECES[piece_moved][end_square]
+        if move.is_castle_move:
+            rook = piece_moved[0] + "R"
+            if move.end_column - move.start_column == 2:
+                rook_start, rook_end = end_square + 1, end_square - 1
+            else:
+                rook_start, rook_end = end_square - 2, end_square + 1
+            key ^= ZOBRIST_PIECES[rook][rook_start] ^ ZOBRIST_PIECES[rook][rook_end]
+            own_squares.remove(rook_start)
+            own_squares.add(rook_end)
+            mg += PIECE_SQUARE_MG[rook][rook_end] - PIECE_SQUARE_MG[rook][rook_start]
+            eg += PIECE_SQUARE_EG[rook][rook_end] - PIECE_SQUARE_EG[rook][rook_start]
+        self.mg_score = mg
+        self.eg_score = eg
+        if self.en_passant_possible != ():
+            key ^= self.en_passant_key()
+        key ^= ZOBRIST_CASTLING[record.castling_rights] ^ ZOBRIST_CASTLING[self.castling_rights]
+        self.zobrist_key = key
+        if self.zobrist_self_check:
+            self.verify_zobrist_key()
+        if self.evaluation_self_check:
+            self.verify_evaluation()
 
 
 
     def undo_move(self):
         if len(self.moveLog) != 0: #upewnienie się, że istnieje jakikolwiek ruch, który można cofnąć
             move = self.moveLog.pop()
+            self.enemy_attack_map = None
             self.board[move.start_row][move.start_column] = move.piece_moved
             self.board[move.end_row][move.end_column] = move.piece_captured
             self.whiteToMove = not self.whiteToMove
@@ -92,12 +342,35 @@ class GameState():
                 self.board[move.end_row][move.end_column] = "--" #Usuwa pionka, który został dodany na niewłaściwym polu
                 self.board[move.start_row][move.end_column] = move.piece_captured #Ustawia z powrotem pionka na polu z którego nastąpiło bicie
                
-            self.en_passant_possible_log.pop()
-            self.en_passant_possible = self.en_passant_possible_log[-1]
+            #przywrócenie stanu sprzed ruchu (prawa do roszady, bicie w przelocie, licznik półruchów, klucze, ocena)
+            record = self.undo_stack[len(self.moveLog)]
+            self.castling_rights = record.castling_rights
+            self.en_passant_possible = record.en_passant_possible
+            self.halfmove_clock = record.halfmove_clock
+            self.zobrist_key = record.zobrist_key
+            self.pawn_key = record.pawn_key
+            self.mg_score = record.mg_score
+            self.eg_score = record.eg_score
+            self.phase = record.phase
+            if move.piece_moved[0] == 'b':
+                self.fullmove_number -= 1
+
+            #cofnięcie zmian w listach figur
+            start_square = move.start_row * 8 + move.start_column
+            end_square = move.end_row * 8 + move.end_column
+            own_squares = self.piece_squares[move.piece_moved[0]]
+            own_squares.remove(end_square)
+            own_squares.add(start_square)
+            if move.is_capture:
+                self.piece_squares[move.piece_captured[0]].add(move.start_row * 8 + move.end_column if move.en_passant else end_square)
+            if move.is_castle_move:
+                if move.end_column - move.start_column == 2:
+                    own_squares.remove(end_square - 1)
+                    own_squares.add(end_square + 1)
+                else:
+                    own_squares.remove(end_square + 1)
+                    own_squares.add(end_square - 2)
 
-            #Cofnięcie stanu praw do roszady
-            self.castle_rights_log.pop() #skasowanie praw do roszady, które były następstwem ruchu, który cofamy
-            self.current_castling_rights  = self.castle_rights_log[-1] #ustawienie aktualnych praw do roszady, jako ostatni element listy (z której usunęliśmy wyżej ostatni element)
             #Cofnięcie roszady
             if move.is_castle_move:
                 if move.end_column - move.start_column == 2: #roszada na skrzydle królewskim
@@ -106,91 +379,166 @@ class GameState():
                 else: #roszada na skrzydle hetmańskim
                     self.board[move.end_row][move.end_column-2] = self.board[move.end_row][move.end_column+1] #wieża z pozycji po roszadzie na skrzydle hetmańskim wraca na pierwotne pole w rogu szachownicy
                     self.board[move.end_row][move.end_column+1] = "--" #wyczyszczenie pola na którym stała wieża po roszadzie na skrzydle hetmańskim
-   
+
+            if self.zobrist_self_check:
+                self.verify_zobrist_key()
+            if self.evaluation_self_check:
+                self.verify_evaluation()
+
             self.check_mate = False
             self.stale_mate = False
-   
-   
+
+    '''
+    Sprawdza, czy bieżąca pozycja wystąpiła w partii łącznie co najmniej count razy (domyślnie: czy już się powtórzyła).
+    Historia kluczy to stos cofania - undo_stack[i].zobrist_key to klucz pozycji przed i-tym ruchem. Sprawdzane są tylko
+    pozycje od ostatniego nieodwracalnego ruchu (bicie lub ruch pionem zeruje halfmove_clock) z tą samą stroną na ruchu
+    '''
+    def is_repetition(self, count=2):
+        key = self.zobrist_key
+        ply = len(self.moveLog)
+        occurrences = 1
+        for i in range(ply - 4, max(ply - self.halfmove_clock, 0) - 1, -2): #pozycja nie może się powtórzyć wcześniej niż po 4 półruchach
+            if self.undo_stack[i].zobrist_key == key:
+                occurrences += 1
+                if occurrences >= count:
+                    return True
+        return False
+
+    '''
+    Zasada 50 ruchów: remis po FIFTY_MOVE_PLIES półruchach bez bicia i ruchu pionem, chyba że strona na ruchu dostała
+    mata - mat ma pierwszeństwo. Ruchy generowane są dopiero po osiągnięciu limitu i tylko do pierwszego legalnego
+    '''
+    def is_fifty_move_draw(self):
+        return self.halfmove_clock >= FIFTY_MOVE_PLIES and (self.has_legal_moves() or not self.is_in_check)
+
+    '''
+    Remis wynikający z historii partii: DRAW_REPETITION (trzykrotne powtórzenie pozycji), DRAW_FIFTY_MOVES
+    (50 ruchów każdej strony bez bicia i ruchu pionem) lub None
+    '''
+    def get_draw_reason(self):
+        if self.is_fifty_move_draw():
+            return DRAW_FIFTY_MOVES
+        if self.is_repetition(3):
+            return DRAW_REPETITION
+        return None
+
+
+    '''
+    Liczy klucz Zobrista bieżącej pozycji od zera: rozstawienie figur, strona na ruchu, prawa do roszady, kolumna bicia w przelocie
+    '''
+    def compute_zobrist_key(self):
+        key = 0
+        for row in range(8):
+            for column in range(8):
+                piece = self.board[row][column]
+                if piece != "--":
+                    key ^= ZOBRIST_PIECES[piece][row * 8 + column]
+        if not self.whiteToMove:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        key ^= ZOBRIST_CASTLING[self.castling_rights]
+        if self.en_passant_possible != ():
+            key ^= self.en_passant_key()
+        return key
+
+    '''
+    Składnik klucza Zobrista z kolumną bicia w przelocie - tylko gdy pion strony na ruchu stoi obok piona, który
+    wykonał ruch o dwa pola (tak jak w kluczu Polyglot). Bez tego pozycja tuż po ruchu o dwa pola nie byłaby
+    rozpoznawana jako powtórzenie tej samej pozycji osiągniętej później
+    '''
+    def en_passant_key(self):
+        row, column = self.en_passant_possible
+        pawn_row, pawn = (row + 1, "wp") if self.whiteToMove else (row - 1, "bp")
+        board_row = self.board[pawn_row]
+        if (column > 0 and board_row[column - 1] == pawn) or (column < 7 and board_row[column + 1] == pawn):
+            return ZOBRIST_EN_PASSANT[column]
+        return 0
+
+    '''
+    Liczy od zera klucz Zobrista ustawienia pionów obu stron
+    '''
+    def compute_pawn_key(self):
+        key = 0
+        for row in range(8):
+            for column in range(8):
+                piece = self.board[row][column]
+                if piece[1] == 'p':
+                    key ^= ZOBRIST_PIECES[piece][row * 8 + column]
+        return key
+
+    '''
+    Tryb diagnostyczny: porównuje klucze (pozycji i pionów) aktualizowane przyrostowo z kluczami liczonymi od zera
+    '''
+    def verify_zobrist_key(self):
+        expected = self.compute_zobrist_key()
+        if self.zobrist_key != expected:
+            raise AssertionError("Niezgodny klucz Zobrista po ruchu %s: %016x zamiast %016x (%s)" % (
+                self.moveLog[-1].get_chess_notation() if self.moveLog else "-", self.zobrist_key, expected, self.to_fen()))
+        expected = self.compute_pawn_key()
+        if self.pawn_key != expected:
+            raise AssertionError("Niezgodny klucz pionów po ruchu %s: %016x zamiast %016x (%s)" % (
+                self.moveLog[-1].get_chess_notation() if self.moveLog else "-", self.pawn_key, expected, self.to_fen()))
+
+    '''
+    Liczy ocenę od zera: krotka (ocena gry środkowej, ocena końcówki, faza gry), oceny z perspektywy białych
+    '''
+    def compute_evaluation(self):
+        mg = eg = phase = 0
+        for row in range(8):
+            for column in range(8):
+                piece = self.board[row][column]
+                if piece != "--":
+                    mg += PIECE_SQUARE_MG[piece][row * 8 + column]
+                    eg += PIECE_SQUARE_EG[piece][row * 8 + column]
+                    phase += PHASE_WEIGHTS[piece[1]]
+        return mg, eg, phase
+
+    '''
+    Ocena materiału i pozycji figur z perspektywy białych, interpolowana między grą środkową a końcówką według fazy gry
+    '''
+    def evaluate(self):
+        phase = min(self.phase, MAX_PHASE) #po promocjach faza może przekroczyć wartość początkową
+        return (self.mg_score * phase + self.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+
+    '''
+    Tryb diagnostyczny: porównuje ocenę aktualizowaną przyrostowo z oceną liczoną od zera
+    '''
+    def verify_evaluation(self):
+        expected = self.compute_evaluation()
+        if (self.mg_score, self.eg_score, self.phase) != expected:
+            raise AssertionError("Niezgodna ocena po ruchu %s: %s zamiast %s (%s)" % (
+                self.moveLog[-1].get_chess_notation() if self.moveLog else "-", (self.mg_score, self.eg_score, self.phase),
+                expected, self.to_fen()))
+
     """
-    Aktualizuje zasady dotyczące roszady dostając na wejściu dany ruch
+    Aktualizuje zasady dotyczące roszady dostając na wejściu dany ruch. Ruch z pola króla lub wieży albo na takie pole
+    (bicie wieży) odbiera odpowiednie prawa - maski pól zastępują sprawdzanie każdego przypadku osobno
     """
     def update_castle_rights(self, move):
-        if move.piece_moved == "wK":
-            self.current_castling_rights.wks = False
-            self.current_castling_rights.wqs = False
-        elif move.piece_moved == "bK":
-            self.current_castling_rights.bks = False
-            self.current_castling_rights.bqs = False
-        elif move.piece_moved == "wR":
-            if move.start_row == 7:
-                if move.start_column == 0: #wieża na białym skrzydle hetmańskim
-                    self.current_castling_rights.wqs = False 
-                elif move.start_column == 7: #wieża na białym skrzydle królewskim
-                    self.current_castling_rights.wks = False
-        elif move.piece_moved == "bR":
-            if move.start_row == 0:
-                if move.start_column == 0: #wieża na czarnym skrzydle hetmańskim
-                    self.current_castling_rights.bqs = False
-                elif move.start_column == 7: #wieża na czarnym skrzydle królewskim
-                    self.current_castling_rights.bks = False
-
-        #gdy wieża jest zbita
-        if move.piece_captured == "wR":
-            if move.end_row == 7:
-                if move.end_column == 0:
-                    self.current_castling_rights.wqs = False
-                elif move.end_column == 7:
-                    self.current_castling_rights.wks = False
-        elif move.piece_captured == "bR":
-            if move.end_row == 0:
-                if move.end_column == 0:
-                    self.current_castling_rights.bqs = False
-                elif move.end_column == 7:
-                    self.current_castling_rights.bks = False
-
-
+        self.castling_rights &= CASTLING_MASKS[move.start_row * 8 + move.start_column] & CASTLING_MASKS[move.end_row * 8 + move.end_column]
 
     '''
     Wszystkie ruchy, które mogą dać szacha
     '''
     def get_valid_moves(self):
-        moves = []
-        self.is_in_check, self.pins, self.checks = self.check_for_pins_and_checks()
-        temp_castle_rights = CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks, self.current_castling_rights.wqs, self.current_castling_rights.bqs)
+        self.is_in_check, self.pin_masks, self.check_mask = self.check_for_pins_and_checks()
         if self.whiteToMove:
             king_row = self.white_king_location[0]
             king_column = self.white_king_location[1]
         else:
             king_row = self.black_king_location[0]
             king_column = self.black_king_location[1]
-        if self.is_in_check:
-            if len(self.checks) == 1: #tylko jedna figura szachuje króla, zablokuj szacha lub porusz się królem
-                moves = self.get_all_possible_moves()
-                #Aby zablokować szacha powinno się mieć jakąś figurę pomiędzy przeciwną figurą dającą szacha a królem
-                check = self.checks[0]
-                check_row = check[0]
-                check_column = check[1]
-                piece_checking = self.board[check_row][check_column] #przeciwna figura dająca szacha
-                valid_squares = [] #pola, na które może przejść figura
-                #gdy figurą szachującą jest przeciwny skoczek, należy zbić skoczka lub ruszyć się królem, szach ze strony pozostałych figur można zablokować
-                if piece_checking[1] == "N":
-                    valid_squares = [(check_row, check_column)]
-                else:
-                    for i in range(1, 8):
-                        valid_square = (king_row + check[2] * i, king_column + check[3] * i) #check[2] oraz check[3] są to kierunki z których pochodzi szach
-                        valid_squares.append(valid_square)
-                        if valid_square[0] == check_row and valid_square[1] == check_column: #zbicie szachującej figury, kończy szacha
-                            break
-                #pozbycie się ruchów, które nie blokują szacha lub ruszenia królem
-                for i in range(len(moves)- 1, -1, -1): #w przypadku usuwania z listy bardziej opłaca się iterować od końca listy
-                    if moves[i].piece_moved[1] != "K": #ruch, który nie był poruszeniem się królem, zatem blokujący lub bijący figurę szachującą
-                        if not(moves[i].end_row, moves[i].end_column) in valid_squares: #ruchy, które nie blokują szacha lub nie biją figury szachującej
-                            moves.remove(moves[i])
-            else: #podwójny szach, wymagany ruch króla
-                self.get_king_moves(king_row, king_column, moves)
-        else: #nie ma szacha, wszystkie legalne ruchy dozwolone
+        if self.is_in_check and self.check_mask == 0: #podwójny szach, wymagany ruch króla
+            moves = []
+            self.get_king_moves(king_row, king_column, moves)
+        else:
+            #generatory same pomijają ruchy figur związanych poza linią związania, a w przypadku szacha ruchy,
+            #które nie zasłaniają króla ani nie biją szachującej figury - lista nie wymaga późniejszego filtrowania
             moves = self.get_all_possible_moves()
-             
+
+        if self.whiteToMove:
+            self.get_castle_moves(self.white_king_location[0], self.white_king_location[1], moves)
+        else:
+            self.get_castle_moves(self.black_king_location[0], self.black_king_location[1], moves)
 
         if len(moves) == 0:
             if self.is_in_check:
@@ -200,20 +548,20 @@ class GameState():
         else:
             self.check_mate = False
             self.stale_mate = False
-        if self.whiteToMove:
-            self.get_castle_moves(self.white_king_location[0], self.white_king_location[1], moves)
-        else:
-            self.get_castle_moves(self.black_king_location[0], self.black_king_location[1], moves)
 
-        self.current_castling_rights = temp_castle_rights
         return moves
 
-                    
-
+    '''
+    Sprawdza linie wychodzące od króla strony na ruchu oraz pola skoczków. Zwraca krotkę:
+    (czy król jest szachowany, {pole związanej figury: maska pól na linii związania}, maska pól blokujących szacha).
+    Maski to liczby 64-bitowe z jednym bitem na pole (row * 8 + column). Maska szacha obejmuje pola pomiędzy królem
+    a szachującą figurą razem z nią samą, ALL_SQUARES gdy nie ma szacha i 0 przy podwójnym szachu
+    '''
     def check_for_pins_and_checks(self):
-        pins = [] #pola na których znajduje się włana związana figura oraz kierunek powodujący związanie
-        checks = [] #pola które są szachowane przez przeciwnika
-        is_in_check = False
+        pin_masks = {} #pole związanej figury -> pola, na które może się ruszyć (linia od króla do figury wiążącej)
+        check_mask = ALL_SQUARES
+        checks = 0 #liczba figur szachujących
+        board = self.board
         if self.whiteToMove:
             enemy_color = "b"
             ally_color = "w"
@@ -228,15 +576,18 @@ class GameState():
         directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
         for j in range(len(directions)):
             d = directions[j]
-            possible_pin = () #resetowanie możliwych związań
+            possible_pin = None #resetowanie możliwych związań
+            ray = 0 #pola przejrzane na danym kierunku
             for i in range(1, 8):
                 end_row = start_row + d[0] * i
                 end_column = start_column + d[1] * i
                 if 0 <= end_row < 8 and 0 <= end_column < 8:
-                    stop_square = self.board[end_row][end_column] #figura na którą napotykamy sprawdzając kierunki wychodzące od króla
+                    square = end_row * 8 + end_column
+                    ray |= 1 << square
+                    stop_square = board[end_row][end_column] #figura na którą napotykamy sprawdzając kierunki wychodzące od króla
                     if stop_square[0] == ally_color and stop_square[1] != "K":
-                        if possible_pin == (): #pierwsza własna figura- może być związana
-                            possible_pin = (end_row, end_column, d[0], d[1])
+                        if possible_pin is None: #pierwsza własna figura- może być związana
+                            possible_pin = square
                         else: #druga własna figura, zatem nie ma mowy o związaniu lub szachu
                             break
                     elif stop_square[0] == enemy_color:
@@ -251,28 +602,24 @@ class GameState():
                                 (4 <= j <= 7 and type_of_piece == "B") or \
                                 (i == 1 and type_of_piece == "p" and ((enemy_color == "w" and 6 <= j <= 7) or (enemy_color == "b" and 4 <= j <= 5))) or \
                                 (type_of_piece == "Q") or (i == 1 and type_of_piece == "K"):
-                            if possible_pin == (): #brak blokującej figury, zatem pozycja szachowa
-                                is_in_check = True
-                                checks.append((end_row, end_column, d[0], d[1]))
-                                break
+                            if possible_pin is None: #brak blokującej figury, zatem pozycja szachowa
+                                checks += 1
+                                check_mask = ray if checks == 1 else 0
                             else: #blokująca figura, zatem związanie
-                                pins.append(possible_pin)
-                                break
-                        else: #figura przeciwnika nie daje pozycji szachowej
-                            break 
+                                pin_masks[possible_pin] = ray
+                        break #figura przeciwnika zasłania dalszą część linii
                 else: #poza szachownicą
                     break
         #Obsługa przypadku gdy figurą dająca szacha jest skoczek
-        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        for m in knight_moves:
+        for m in KNIGHT_OFFSETS:
             end_row = start_row + m[0]
             end_column = start_column + m[1]
             if 0 <= end_row < 8 and 0 <= end_column < 8:
-                stop_square = self.board[end_row][end_column]
+                stop_square = board[end_row][end_column]
                 if stop_square[0] == enemy_color and stop_square[1] == "N": #skoczek przeciwnika atakuje króla gracza 
-                    is_in_check = True
-                    checks.append((end_row, end_column, m[0], m[1]))
-        return is_in_check, pins, checks
+                    checks += 1
+                    check_mask = 1 << (end_row * 8 + end_column) if checks == 1 else 0
+        return checks > 0, pin_masks, check_mask
 
 
 
@@ -291,45 +638,114 @@ class GameState():
     Funkcja określająca, czy przeciwnik może atakować pole zadane przez (row,column)
     """
     def square_under_attack(self, row, column):
-        self.whiteToMove = not self.whiteToMove #przełączenie tury, aby ocenić pozycję z perspektywy gracza atakującego
-        opponent_moves = self.get_all_possible_moves() #wygenerowanie wszystkich możliwych ruchów przeciwnika
-        self.whiteToMove = not self.whiteToMove  #powrót do właściwej tury (gracza, który miał turę przed sprawdzeniem czy jego pozycja jest atakowana)
-        for move in opponent_moves:
-            if move.end_row == row and move.end_column == column:  #pole jest atakowane
+        return self.is_attacked_by(row, column, "b" if self.whiteToMove else "w")
+
+
+    """
+    Sprawdza, czy figury koloru attacker_color atakują pole (row, column). Zamiast generować wszystkie ruchy przeciwnika,
+    z zadanego pola wychodzą promienie (wieża/goniec/hetman) oraz sprawdzane są pola skoczka, piona i króla
+    """
+    def is_attacked_by(self, row, column, attacker_color):
+        board = self.board
+        for d_row, d_column, attackers in ATTACK_RAYS:
+            end_row = row + d_row
+            end_column = column + d_column
+            while 0 <= end_row < 8 and 0 <= end_column < 8:
+                stop_square = board[end_row][end_column]
+                if stop_square != "--":
+                    if stop_square[0] == attacker_color and stop_square[1] in attackers:
+                        return True
+                    break
+                end_row += d_row
+                end_column += d_column
+        for d_row, d_column in KNIGHT_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and board[end_row][end_column] == attacker_color + "N":
+                return True
+        for d_row, d_column in KING_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and board[end_row][end_column] == attacker_color + "K":
                 return True
-        return False #pole nie jest atakowane
+        pawn_row = row + 1 if attacker_color == "w" else row - 1 #biały pion atakuje z rzędu poniżej, czarny z rzędu powyżej
+        if 0 <= pawn_row < 8:
+            if column > 0 and board[pawn_row][column - 1] == attacker_color + "p":
+                return True
+            if column < 7 and board[pawn_row][column + 1] == attacker_color + "p":
+                return True
+        return False
 
 
+    """
+    Zbiór pól (row, column) atakowanych przez przeciwnika gracza, który ma turę. Liczony raz na pozycję i zapamiętywany do
+    następnego ruchu. Własny król jest pomijany, aby nie mógł uciec wzdłuż linii, na której jest szachowany
+    """
+    def get_enemy_attack_map(self):
+        if self.enemy_attack_map is None:
+            board = self.board
+            if self.whiteToMove:
+                enemy_color = "b"
+                king_row, king_column = self.white_king_location
+                pawn_direction = 1
+            else:
+                enemy_color = "w"
+                king_row, king_column = self.black_king_location
+                pawn_direction = -1
+            king = board[king_row][king_column]
+            board[king_row][king_column] = "--"
+            attacked = set()
+            for square in self.piece_squares[enemy_color]:
+                row, column = SQUARE_COORDINATES[square]
+                piece_type = board[row][column][1]
+                if piece_type == "p":
+                    attacked.add((row + pawn_direction, column - 1))
+                    attacked.add((row + pawn_direction, column + 1))
+                elif piece_type == "N":
+                    for d_row, d_column in KNIGHT_OFFSETS:
+                        attacked.add((row + d_row, column + d_column))
+                elif piece_type == "K":
+                    for d_row, d_column in KING_OFFSETS:
+                        attacked.add((row + d_row, column + d_column))
+                else:
+                    for d_row, d_column, attackers in ATTACK_RAYS:
+                        if piece_type not in attackers:
+                            continue
+                        end_row = row + d_row
+                        end_column = column + d_column
+                        while 0 <= end_row < 8 and 0 <= end_column < 8:
+                            attacked.add((end_row, end_column))
+                            if board[end_row][end_column] != "--":
+                                break
+                            end_row += d_row
+                            end_column += d_column
+            board[king_row][king_column] = king
+            self.enemy_attack_map = attacked #pola poza planszą w zbiorze nie przeszkadzają - nigdy nie są sprawdzane
+        return self.enemy_attack_map
+
 
 
 
     '''
-    Wszystkie ruchy, które nie mogą dać szacha
+    Wszystkie ruchy, które nie mogą dać szacha. Odwiedzane są tylko pola z listy figur strony na ruchu
     '''
     def get_all_possible_moves(self):
         moves = []
-        for row in range(len(self.board)): #iteracja po rzędach
-            for column in range(len(self.board[row])): #iteracja po kolumnach w danym rzędzie
-                turn = self.board[row][column][0]  #w celu określenia koloru figury, pobiera pierwszą literę z oznaczenia figury (b: black, w: white, -: puste pole)
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[row][column][1] #w celu określenia rodzaju figury, pobiera drugą literę z oznaczenia figury
-                    self.move_functions[piece](row, column, moves)
+        board = self.board
+        for square in self.piece_squares["w" if self.whiteToMove else "b"]:
+            row, column = SQUARE_COORDINATES[square]
+            piece = board[row][column][1] #w celu określenia rodzaju figury, pobiera drugą literę z oznaczenia figury
+            self.move_functions[piece](row, column, moves)
         return moves
 
 
     '''
-    Pobiera wszystkie ruchy pionków stojących na row, column i dodaje te ruchy do listy moves
+    Pobiera wszystkie ruchy pionków stojących na row, column i dodaje te ruchy do listy moves.
+    allowed - pola docelowe zgodne ze związaniem piona i blokujące ewentualnego szacha
     '''
     def get_pawn_moves(self, row, column, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1): 
-            if self.pins[i][0] == row and self.pins[i][1] == column:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
-        
+        pin_mask = self.pin_masks.get(row * 8 + column, ALL_SQUARES)
+        allowed = self.check_mask & pin_mask
         if self.whiteToMove:
             move_amount = -1
             start_row = 6
@@ -340,124 +756,113 @@ class GameState():
             start_row = 1
             back_row = 7
             enemy_color = 'w'
-        pawn_promotion = False
-
-        if self.board[row+move_amount][column] == "--": #ruch o 1 pole
-            if not piece_pinned or pin_direction == (move_amount, 0):
-                if row + move_amount == back_row: #jeśli pion dojdzie do ostatniej linii, następuje promocja piona
-                    pawn_promotion = True
-                moves.append(Move((row, column), (row + move_amount, column), self.board, pawn_promotion = pawn_promotion))
-                if row == start_row and self.board[row + 2*move_amount][column] == "--": #ruch o 2 pola
-                    moves.append(Move((row, column), (row + 2*move_amount, column), self.board))
-        if column-1 >= 0: #bicie w lewo
-            if not piece_pinned or pin_direction == (move_amount, -1):
-                if self.board[row + move_amount][column - 1][0] == enemy_color:
-                    if row + move_amount == back_row: #jeśli pion dojdzie do ostatniej linii następuje promocja piona
-                        pawn_promotion = True
-                    moves.append(Move((row, column), (row + move_amount, column - 1), self.board, pawn_promotion = pawn_promotion))
-                if (row + move_amount, column - 1) == self.en_passant_possible:
-                    moves.append(Move((row, column), (row + move_amount, column - 1), self.board, en_passant= True))
-        if column + 1 <= 7: #bicie w prawo
-            if not piece_pinned or pin_direction == (move_amount, 1):
-                if self.board[row + move_amount][column + 1][0] == enemy_color:
-                    if row + move_amount == back_row: #jeśli pion dojdzie do ostatniej linii następuje promocja piona
-                        pawn_promotion = True
-                    moves.append(Move((row, column), (row + move_amount, column + 1), self.board, pawn_promotion = pawn_promotion))
-                if (row + move_amount, column + 1) == self.en_passant_possible:
-                    moves.append(Move((row, column), (row + move_amount, column + 1), self.board, en_passant= True))
+        end_row = row + move_amount
+        pawn_promotion = end_row == back_row #jeśli pion dojdzie do ostatniej linii, następuje promocja piona
 
-        
+        if self.board[end_row][column] == "--": #ruch o 1 pole
+            if allowed >> (end_row * 8 + column) & 1:
+                self.add_pawn_move((row, column), (end_row, column), pawn_promotion, moves)
+            if row == start_row and self.board[end_row + move_amount][column] == "--" \
+                    and allowed >> ((end_row + move_amount) * 8 + column) & 1: #ruch o 2 pola (może zasłonić szacha, gdy ruch o 1 pole nie zasłania)
+                moves.append(Move((row, column), (end_row + move_amount, column), self.board))
+        for end_column in (column - 1, column + 1): #bicie w lewo i w prawo
+            if 0 <= end_column <= 7:
+                if self.board[end_row][end_column][0] == enemy_color:
+                    if allowed >> (end_row * 8 + end_column) & 1:
+                        self.add_pawn_move((row, column), (end_row, end_column), pawn_promotion, moves)
+                elif (end_row, end_column) == self.en_passant_possible and pin_mask >> (end_row * 8 + end_column) & 1 \
+                        and not self.en_passant_exposes_king(row, column, end_column): #bicie w przelocie sprawdzane jest w całości, także przy szachu
+                    moves.append(Move((row, column), (end_row, end_column), self.board, en_passant= True))
+
+    '''
+    Dodaje ruch piona do listy moves, w przypadku promocji dodaje osobny ruch dla każdej figury, na którą pion może zostać zamieniony
+    '''
+    def add_pawn_move(self, start_square, end_square, pawn_promotion, moves):
+        if pawn_promotion:
+            for promotion_piece in Move.promotion_pieces:
+                moves.append(Move(start_square, end_square, self.board, pawn_promotion = True, promotion_piece = promotion_piece))
+        else:
+            moves.append(Move(start_square, end_square, self.board))
+
+    '''
+    Sprawdza, czy bicie w przelocie piona z (row, column) na kolumnę capture_column odsłania własnego króla.
+    Bicie usuwa z rzędu dwa piony naraz, czego nie wykrywa zwykłe sprawdzanie związań (np. wieża i król w tym samym rzędzie)
+    '''
+    def en_passant_exposes_king(self, row, column, capture_column):
+        end_row = self.en_passant_possible[0]
+        pawn = self.board[row][column]
+        captured_pawn = self.board[row][capture_column]
+        self.board[row][column] = "--"
+        self.board[row][capture_column] = "--"
+        self.board[end_row][capture_column] = pawn
+        is_in_check = self.check_for_pins_and_checks()[0]
+        self.board[row][column] = pawn
+        self.board[row][capture_column] = captured_pawn
+        self.board[end_row][capture_column] = "--"
+        return is_in_check
+
+    '''
+    Ruchy figury poruszającej się po liniach w podanych kierunkach. Związana figura porusza się tylko wzdłuż linii związania,
+    przy szachu dodawane są tylko ruchy na pola z maski szacha. captures_only - tylko bicia (przeszukiwanie stabilizujące),
+    quiets_only - tylko ruchy na puste pola (etap cichych ruchów w generate_moves)
+    '''
+    def get_sliding_moves(self, row, column, moves, directions, captures_only=False, quiets_only=False):
+        pin_mask = self.pin_masks.get(row * 8 + column, ALL_SQUARES)
+        allowed = self.check_mask & pin_mask
+        if not allowed:
+            return
+        board = self.board
+        enemy_color = "b" if self.whiteToMove else "w"
+        for d_row, d_column in directions: #sprawdzanie dostępnych pól we wszystkich kierunkach
+            end_row = row + d_row
+            end_column = column + d_column
+            if pin_mask != ALL_SQUARES and not (0 <= end_row < 8 and 0 <= end_column < 8 and pin_mask >> (end_row * 8 + end_column) & 1):
+                continue #kierunek poza linią związania (ruch wzdłuż związania jest możliwy w obie strony)
+            while 0 <= end_row < 8 and 0 <= end_column < 8: #zapewnienie, że znajdujemy się na planszy
+                stop_square = board[end_row][end_column]
+                if stop_square == "--": #puste pole
+                    if not captures_only and allowed >> (end_row * 8 + end_column) & 1:
+                        moves.append(Move((row, column), (end_row, end_column), board))
+                else:
+                    if not quiets_only and stop_square[0] == enemy_color and allowed >> (end_row * 8 + end_column) & 1: #figura przeciwnika
+                        moves.append(Move((row, column), (end_row, end_column), board))
+                    break #figura przeciwnika lub własna zatrzymuje ruch
+                end_row += d_row
+                end_column += d_column
 
     '''
     Pobiera wszystkie ruchy wież stojących na row, column i dodaje te ruchy do listy moves
     '''
     def get_rook_moves(self, row, column, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == column:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                if self.board[row][column][1] != "Q": #nie mozna usunac dam z wiazania na wiezy, jedynie gonce
-                    self.pins.remove(self.pins[i])
-                break
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1)) #góra, lewo, dół, prawo
-        enemy_color = "b" if self.whiteToMove else "w"
-        for d in directions: #sprawdzanie dostępnych pól we wszystkich kierunkach
-            for i in range(1, 8): #maksymalna liczba pól o jakie może sie poruszyć to 7
-                end_row = row + d[0] * i
-                end_column = column + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_column < 8: #zapewnienie, że znajdujemy się na planszy
-                    if not piece_pinned or pin_direction == d or pin_direction == (-d[0], -d[1]): #ostatni warunek pozwala poruszać się wzdłuż wiązania w przeciwnym kierunku
-                        stop_square = self.board[end_row][end_column]
-                        if stop_square == "--": #puste pole
-                            moves.append(Move((row, column), (end_row, end_column), self.board))
-                        elif stop_square[0] == enemy_color: #figura przeciwnika, sprawdzanie po pierwszej literze: [0]
-                            moves.append(Move((row, column), (end_row, end_column), self.board))
-                            break
-                        else: #własna figura
-                            break
-                else: #sytuacja, gdy pola są poza planszą
-                    break
+        self.get_sliding_moves(row, column, moves, ROOK_DIRECTIONS)
 
     '''
     Pobiera wszystkie ruchy skoczków stojących na row, column i dodaje te ruchy do listy moves
     '''
     def get_knight_moves(self, row, column, moves):
-        piece_pinned = False
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == column:
-                piece_pinned = True
-                self.pins.remove(self.pins[i])
-                break
-        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)) #pola na które może skoczyć skoczek, w kształcie litery L
+        if row * 8 + column in self.pin_masks: #związany skoczek nie może się ruszyć
+            return
+        allowed = self.check_mask
         own_color = "w" if self.whiteToMove else "b" #figura tego samego koloru
-        for m in knight_moves:
+        for m in KNIGHT_OFFSETS: #pola na które może skoczyć skoczek, w kształcie litery L
             end_row = row + m[0]
             end_column = column + m[1]
-            if 0 <= end_row < 8 and 0 <= end_column < 8: #warunek pozostawania na szachownicy
-                if not piece_pinned:
-                    stop_square = self.board[end_row][end_column]
-                    if stop_square[0] != own_color: #puste pole lub figura przeciwnika
-                        moves.append(Move((row, column), (end_row, end_column), self.board))
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and allowed >> (end_row * 8 + end_column) & 1: #warunek pozostawania na szachownicy
+                stop_square = self.board[end_row][end_column]
+                if stop_square[0] != own_color: #puste pole lub figura przeciwnika
+                    moves.append(Move((row, column), (end_row, end_column), self.board))
 
     '''
     Pobiera wszystkie ruchy gońców stojących na row, column i dodaje te ruchy do listy moves
     '''
     def get_bishop_moves(self, row, column, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == column:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1)) #określenie kierunków po przekątnych
-        enemy_color = "b" if self.whiteToMove else "w"
-        for d in directions: #sprawdzanie dostępnych pól we wszystkich określonych kierunkach
-            for i in range(1, 8): #maksymalna liczba pól o jakie może sie poruszyć to 7
-                end_row = row + d[0] * i
-                end_column = column + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_column < 8:  #zapewnienie, że znajdujemy się na planszy
-                    if not piece_pinned or pin_direction == d or pin_direction == (-d[0], -d[1]):
-                        stop_square = self.board[end_row][end_column]
-                        if stop_square == "--": #puste pole
-                            moves.append(Move((row, column), (end_row, end_column), self.board))
-                        elif stop_square[0] == enemy_color: #figura przeciwnika, sprawdzanie po pierwszej literze: [0]
-                            moves.append(Move((row, column), (end_row, end_column), self.board))
-                            break
-                        else: #własna figura
-                            break 
-                else:  #sytuacja, gdy pola są poza planszą
-                    break
+        self.get_sliding_moves(row, column, moves, BISHOP_DIRECTIONS)
 
-        '''
+    '''
     Pobiera wszystkie ruchy królowych stojących na row, column i dodaje te ruchy do listy moves
     '''
     def get_queen_moves(self, row, column, moves):
-        self.get_rook_moves(row, column, moves)
-        self.get_bishop_moves(row, column, moves)
+        self.get_sliding_moves(row, column, moves, QUEEN_DIRECTIONS)
 
         '''
     Pobiera wszystkie ruchy króli stojących na row, column i dodaje te ruchy do listy moves
@@ -466,25 +871,14 @@ class GameState():
         row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
         column_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
         own_color = "w" if self.whiteToMove else "b"
+        attacked = self.get_enemy_attack_map()
         for i in range(8):
             end_row = row + row_moves[i]
             end_column = column + column_moves[i]
             if 0 <= end_row < 8 and 0 <= end_column < 8:
                 stop_square = self.board[end_row][end_column]
-                if stop_square[0] != own_color:
-                    #postawienie króla na stop_square i sprawdzenie czy występuje na nim szach 
-                    if own_color == "w":
-                       self.white_king_location = (end_row, end_column)
-                    else: 
-                        self.black_king_location = (end_row, end_column)
-                    is_in_check, pins, checks = self.check_for_pins_and_checks()
-                    if not is_in_check:
-                        moves.append(Move((row, column), (end_row, end_column), self.board))
-                    #postawienie króla z powrotem na jego oryginalnej pozycji
-                    if own_color == "w":
-                        self.white_king_location = (row, column)
-                    else:
-                        self.black_king_location = (row, column)
+                if stop_square[0] != own_color and (end_row, end_column) not in attacked: #król nie może wejść na atakowane pole
+                    moves.append(Move((row, column), (end_row, end_column), self.board))
 
         
 
@@ -492,31 +886,411 @@ class GameState():
     Generuje wszystkie dozwolone ruchy związane z roszadą dla króla w (row, column) i dodaje je do listy ruchów
     '''
     def get_castle_moves(self, row, column, moves):
-        if self.square_under_attack(row, column):
+        if self.is_in_check:
             return #nie można przeprowadzić roszady, gdy król znajduje się w szachu
-        if (self.whiteToMove and self.current_castling_rights.wks) or (not self.whiteToMove and self.current_castling_rights.bks):
+        if self.castling_rights & (CASTLE_WKS if self.whiteToMove else CASTLE_BKS):
             self.get_kingside_castle_moves(row, column, moves)
-        if (self.whiteToMove and self.current_castling_rights.wqs) or (not self.whiteToMove and self.current_castling_rights.bqs):
+        if self.castling_rights & (CASTLE_WQS if self.whiteToMove else CASTLE_BQS):
             self.get_queenside_castle_moves(row, column, moves)
     
     def get_kingside_castle_moves(self, row, column, moves):
         if self.board[row][column+1] == "--" and self.board[row][column+2] == "--": #sprawdzenie, oba pola pomiędzy królem i wieżą na skrzydle królewskim sa puste
-            if not self.square_under_attack(row, column+1) and not self.square_under_attack(row, column+2):
+            attacked = self.get_enemy_attack_map()
+            if (row, column+1) not in attacked and (row, column+2) not in attacked:
                 moves.append(Move((row, column), (row, column+2), self.board, is_castle_move=True))
 
     def get_queenside_castle_moves(self, row, column, moves):
         if self.board[row][column-1] == "--" and self.board[row][column-2] == "--" and self.board[row][column-3] == "--": #na skrzydle hemtańskim
-            if not self.square_under_attack(row, column-1) and not self.square_under_attack(row, column-2): #brak sprawdzenia column-3, ponieważ król i tak nie trafia na to pole
+            attacked = self.get_enemy_attack_map()
+            if (row, column-1) not in attacked and (row, column-2) not in attacked: #brak sprawdzenia column-3, ponieważ król i tak nie trafia na to pole
                 moves.append(Move((row, column), (row, column-2), self.board, is_castle_move=True))
 
 
-"""Klasa reprezentująca zasady związane z roszadą"""
-class CastleRights():
-    def __init__(self, wks, bks, wqs, bqs):
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
+    '''
+    Legalne bicia oraz promocje pionów, bez cichych ruchów - generator dla przeszukiwania stabilizującego (quiescence).
+    Gdy król jest szachowany, zwraca wszystkie legalne ruchy (każda obrona przed szachem musi zostać sprawdzona)
+    '''
+    def get_valid_captures(self):
+        self.is_in_check, self.pin_masks, self.check_mask = self.check_for_pins_and_checks()
+        if self.is_in_check:
+            return self.get_valid_moves()
+        moves = []
+        board = self.board
+        for square in self.piece_squares["w" if self.whiteToMove else "b"]:
+            row, column = SQUARE_COORDINATES[square]
+            self.capture_functions[board[row][column][1]](row, column, moves)
+        return moves
+
+    '''
+    Legalny ruch o danym ID (np. ruch z tablicy transpozycji) lub None, gdy w tej pozycji jest nielegalny.
+    Generowane są tylko ruchy figury stojącej na polu startowym. Wymaga aktualnych masek związań i szacha
+    '''
+    def get_hash_move(self, move_id):
+        start_row, start_column = SQUARE_COORDINATES[move_id & 63]
+        piece = self.board[start_row][start_column]
+        if piece[0] != ("w" if self.whiteToMove else "b"):
+            return None
+        moves = []
+        if piece[1] == "K":
+            self.get_king_moves(start_row, start_column, moves)
+            self.get_castle_moves(start_row, start_column, moves)
+        elif not self.is_in_check or self.check_mask != 0: #przy podwójnym szachu ruszać się może tylko król
+            self.move_functions[piece[1]](start_row, start_column, moves)
+        for move in moves:
+            if (move.move_id ^ move_id) & MOVE_KEY_MASK == 0:
+                return move
+        return None
+
+    '''
+    Leniwa, etapowa generacja legalnych ruchów: najpierw ruch hash_move_id (jeśli jest legalny), potem bicia i promocje,
+    na końcu ciche ruchy. Kolejny etap generowany jest dopiero, gdy wywołujący poprosi o następny ruch, więc po obcięciu
+    beta lub po znalezieniu pierwszego legalnego ruchu pozostałe nie są tworzone. order_key - opcjonalny klucz sortowania
+    (malejąco) ruchów w obrębie etapu. Pomiędzy pobraniem kolejnych ruchów można wykonywać i cofać ruchy -
+    maski związań i szacha są przywracane na początku każdego etapu
+    '''
+    def generate_moves(self, hash_move_id=0, order_key=None):
+        is_in_check, pin_masks, check_mask = self.check_for_pins_and_checks()
+        self.is_in_check, self.pin_masks, self.check_mask = is_in_check, pin_masks, check_mask
+        hash_move = self.get_hash_move(hash_move_id) if hash_move_id else None
+        if hash_move is not None:
+            hash_move_id = hash_move.move_id & MOVE_KEY_MASK
+            yield hash_move
+        else:
+            hash_move_id = -1
+
+        for stage in (0, 1) if not is_in_check else (2,):
+            self.is_in_check, self.pin_masks, self.check_mask = is_in_check, pin_masks, check_mask
+            if stage == 2: #szach - wszystkie obrony w jednym etapie, jest ich niewiele
+                moves = self.get_valid_moves()
+            else: #etap 0 - bicia i promocje, etap 1 - ciche ruchy i roszady; każdy ruch tworzony jest tylko w swoim etapie
+                moves = []
+                board = self.board
+                functions = self.capture_functions if stage == 0 else self.quiet_functions
+                for square in self.piece_squares["w" if self.whiteToMove else "b"]:
+                    row, column = SQUARE_COORDINATES[square]
+                    functions[board[row][column][1]](row, column, moves)
+                if stage == 1:
+                    king_row, king_column = self.white_king_location if self.whiteToMove else self.black_king_location
+                    self.get_castle_moves(king_row, king_column, moves)
+            if order_key is not None:
+                moves.sort(key=order_key, reverse=True)
+            for move in moves:
+                if move.move_id & MOVE_KEY_MASK != hash_move_id:
+                    yield move
+
+    '''
+    Sprawdza, czy strona na ruchu ma jakikolwiek legalny ruch, i ustawia check_mate oraz stale_mate.
+    Generacja kończy się na pierwszym znalezionym ruchu
+    '''
+    def has_legal_moves(self):
+        has_moves = next(self.generate_moves(), None) is not None
+        self.check_mate = not has_moves and self.is_in_check
+        self.stale_mate = not has_moves and not self.is_in_check
+        return has_moves
+
+    '''
+    Bicia (w tym w przelocie) i promocje piona stojącego na row, column
+    '''
+    def get_pawn_captures(self, row, column, moves):
+        pin_mask = self.pin_masks.get(row * 8 + column, ALL_SQUARES)
+        if self.whiteToMove:
+            move_amount = -1
+            back_row = 0
+            enemy_color = 'b'
+        else:
+            move_amount = 1
+            back_row = 7
+            enemy_color = 'w'
+        end_row = row + move_amount
+        pawn_promotion = end_row == back_row
+        if pawn_promotion and self.board[end_row][column] == "--" and pin_mask >> (end_row * 8 + column) & 1:
+            self.add_pawn_move((row, column), (end_row, column), True, moves)
+        for end_column in (column - 1, column + 1):
+            if 0 <= end_column < 8 and pin_mask >> (end_row * 8 + end_column) & 1:
+                if self.board[end_row][end_column][0] == enemy_color:
+                    self.add_pawn_move((row, column), (end_row, end_column), pawn_promotion, moves)
+                elif (end_row, end_column) == self.en_passant_possible and not self.en_passant_exposes_king(row, column, end_column):
+                    moves.append(Move((row, column), (end_row, end_column), self.board, en_passant = True))
+
+    def get_rook_captures(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, ROOK_DIRECTIONS, captures_only=True)
+
+    def get_bishop_captures(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, BISHOP_DIRECTIONS, captures_only=True)
+
+    def get_queen_captures(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, QUEEN_DIRECTIONS, captures_only=True)
+
+    def get_knight_captures(self, row, column, moves):
+        if row * 8 + column in self.pin_masks: #związany skoczek nie może się ruszyć
+            return
+        enemy_color = "b" if self.whiteToMove else "w"
+        for d_row, d_column in KNIGHT_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and self.board[end_row][end_column][0] == enemy_color:
+                moves.append(Move((row, column), (end_row, end_column), self.board))
+
+    def get_king_captures(self, row, column, moves):
+        enemy_color = "b" if self.whiteToMove else "w"
+        attacked = self.get_enemy_attack_map()
+        for d_row, d_column in KING_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and self.board[end_row][end_column][0] == enemy_color \
+                    and (end_row, end_column) not in attacked:
+                moves.append(Move((row, column), (end_row, end_column), self.board))
+
+    '''
+    Ciche ruchy piona stojącego na row, column (o jedno lub dwa pola, bez promocji - te należą do etapu bić)
+    '''
+    def get_pawn_quiets(self, row, column, moves):
+        allowed = self.check_mask & self.pin_masks.get(row * 8 + column, ALL_SQUARES)
+        if self.whiteToMove:
+            move_amount = -1
+            start_row = 6
+            back_row = 0
+        else:
+            move_amount = 1
+            start_row = 1
+            back_row = 7
+        end_row = row + move_amount
+        if end_row == back_row or self.board[end_row][column] != "--":
+            return
+        if allowed >> (end_row * 8 + column) & 1:
+            moves.append(Move((row, column), (end_row, column), self.board))
+        if row == start_row and self.board[end_row + move_amount][column] == "--" \
+                and allowed >> ((end_row + move_amount) * 8 + column) & 1:
+            moves.append(Move((row, column), (end_row + move_amount, column), self.board))
+
+    def get_rook_quiets(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, ROOK_DIRECTIONS, quiets_only=True)
+
+    def get_bishop_quiets(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, BISHOP_DIRECTIONS, quiets_only=True)
+
+    def get_queen_quiets(self, row, column, moves):
+        self.get_sliding_moves(row, column, moves, QUEEN_DIRECTIONS, quiets_only=True)
+
+    def get_knight_quiets(self, row, column, moves):
+        if row * 8 + column in self.pin_masks: #związany skoczek nie może się ruszyć
+            return
+        allowed = self.check_mask
+        for d_row, d_column in KNIGHT_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and self.board[end_row][end_column] == "--" \
+                    and allowed >> (end_row * 8 + end_column) & 1:
+                moves.append(Move((row, column), (end_row, end_column), self.board))
+
+    def get_king_quiets(self, row, column, moves):
+        attacked = self.get_enemy_attack_map()
+        for d_row, d_column in KING_OFFSETS:
+            end_row = row + d_row
+            end_column = column + d_column
+            if 0 <= end_row < 8 and 0 <= end_column < 8 and self.board[end_row][end_column] == "--" \
+                    and (end_row, end_column) not in attacked:
+                moves.append(Move((row, column), (end_row, end_column), self.board))
+
+
+    '''
+    Perft - liczba liści drzewa legalnych ruchów o zadanej głębokości. Służy do sprawdzania poprawności
+    generatora ruchów (porównanie ze znanymi wartościami) oraz do pomiaru jego szybkości
+    '''
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        moves = self.get_valid_moves()
+        if depth == 1: #na ostatnim poziomie wystarczy liczba legalnych ruchów, bez ich wykonywania
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.undo_move()
+        return nodes
+
+    '''
+    Perft rozbity na ruchy z bieżącej pozycji: {notacja ruchu: liczba liści}. Pozwala zlokalizować ruch, w którym
+    generator różni się od wartości referencyjnych
+    '''
+    def divide(self, depth):
+        result = {}
+        for move in self.get_valid_moves():
+            self.make_move(move)
+            result[move.get_chess_notation()] = self.perft(depth - 1)
+            self.undo_move()
+        return result
+
+
+ROOK_DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+#kierunki promieni oraz figury, które atakują wzdłuż danego kierunku
+ATTACK_RAYS = ((-1, 0, "RQ"), (0, -1, "RQ"), (1, 0, "RQ"), (0, 1, "RQ"),
+               (-1, -1, "BQ"), (-1, 1, "BQ"), (1, -1, "BQ"), (1, 1, "BQ"))
+
+#Losowe 64-bitowe liczby do haszowania pozycji metodą Zobrista (stałe ziarno - klucze są takie same w każdym uruchomieniu)
+_zobrist_random = random.Random(20210101)
+ZOBRIST_PIECES = {piece: [_zobrist_random.getrandbits(64) for square in range(64)]
+                  for piece in ("wp", "wR", "wN", "wB", "wQ", "wK", "bp", "bR", "bN", "bB", "bQ", "bK")}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for rights in range(16)]
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for column in range(8)]
+
+#Ocena pozycji: wartości figur i tablice figura-pole (w setnych częściach piona) osobno dla gry środkowej i końcówki.
+#Tablice zapisane są z perspektywy białych, pierwszy wiersz to 8. rząd (tak jak board). Źródło: "Simplified Evaluation
+#Function" (T. Michniewski), w końcówce król dąży do centrum, a piony są premiowane za zaawansowanie
+PIECE_VALUES_MG = {"p": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+PIECE_VALUES_EG = {"p": 120, "N": 300, "B": 320, "R": 530, "Q": 950, "K": 0}
+PHASE_WEIGHTS = {"p": 0, "N": 1, "B": 1, "R": 2, "Q": 4, "K": 0} #faza gry: 24 przy pełnym komplecie figur, 0 w końcówce pionowej
+MAX_PHASE = 24
+PST_MG = {
+    "p": (0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0),
+    "N": (-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50),
+    "B": (-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20),
+    "R": (0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0),
+    "Q": (-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20),
+    "K": (-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20),
+}
+PST_EG = dict(PST_MG)
+PST_EG["p"] = (0, 0, 0, 0, 0, 0, 0, 0,
+               80, 80, 80, 80, 80, 80, 80, 80,
+               50, 50, 50, 50, 50, 50, 50, 50,
+               30, 30, 30, 30, 30, 30, 30, 30,
+               15, 15, 15, 15, 15, 15, 15, 15,
+               5, 5, 5, 5, 5, 5, 5, 5,
+               0, 0, 0, 0, 0, 0, 0, 0,
+               0, 0, 0, 0, 0, 0, 0, 0)
+PST_EG["K"] = (-50, -40, -30, -20, -20, -30, -40, -50,
+               -30, -20, -10, 0, 0, -10, -20, -30,
+               -30, -10, 20, 30, 30, 20, -10, -30,
+               -30, -10, 30, 40, 40, 30, -10, -30,
+               -30, -10, 30, 40, 40, 30, -10, -30,
+               -30, -10, 20, 30, 30, 20, -10, -30,
+               -30, -30, 0, 0, 0, 0, -30, -30,
+               -50, -30, -30, -30, -30, -30, -30, -50)
+
+
+"""
+Łączy wartość figury z tablicą figura-pole: {figura: [wynik z perspektywy białych dla każdego pola]}.
+Dla czarnych tablica jest odbijana w pionie, a wynik ma przeciwny znak - ocena to po prostu suma wpisów dla figur na planszy
+"""
+def piece_square_scores(values, tables):
+    scores = {}
+    for piece_type, table in tables.items():
+        scores["w" + piece_type] = [values[piece_type] + table[square] for square in range(64)]
+        scores["b" + piece_type] = [-values[piece_type] - table[(7 - square // 8) * 8 + square % 8] for square in range(64)]
+    return scores
+
+PIECE_SQUARE_MG = piece_square_scores(PIECE_VALUES_MG, PST_MG)
+PIECE_SQUARE_EG = piece_square_scores(PIECE_VALUES_EG, PST_EG)
+
+ALL_SQUARES = (1 << 64) - 1 #maska ze wszystkimi polami planszy
+SQUARE_COORDINATES = [(square // 8, square % 8) for square in range(64)] #pole (row * 8 + column) -> (row, column)
+
+#Prawa do roszady - bity w GameState.castling_rights (wartość 0-15 jest też indeksem w ZOBRIST_CASTLING)
+CASTLE_WKS = 1
+CASTLE_BKS = 2
+CASTLE_WQS = 4
+CASTLE_BQS = 8
+CASTLE_ALL = CASTLE_WKS | CASTLE_BKS | CASTLE_WQS | CASTLE_BQS
+CASTLING_FEN = (("K", CASTLE_WKS), ("Q", CASTLE_WQS), ("k", CASTLE_BKS), ("q", CASTLE_BQS))
+#maska praw do roszady pozostających po ruchu z danego pola lub na dane pole (pola królów i wież w narożnikach)
+CASTLING_MASKS = [CASTLE_ALL] * 64
+CASTLING_MASKS[60] = CASTLE_ALL & ~(CASTLE_WKS | CASTLE_WQS) #e1
+CASTLING_MASKS[63] = CASTLE_ALL & ~CASTLE_WKS #h1
+CASTLING_MASKS[56] = CASTLE_ALL & ~CASTLE_WQS #a1
+CASTLING_MASKS[4] = CASTLE_ALL & ~(CASTLE_BKS | CASTLE_BQS) #e8
+CASTLING_MASKS[7] = CASTLE_ALL & ~CASTLE_BKS #h8
+CASTLING_MASKS[0] = CASTLE_ALL & ~CASTLE_BQS #a8
+#pola początkowe królów i wież - brak figury na którymś z nich odbiera prawa wskazane przez CASTLING_MASKS
+CASTLING_HOME_SQUARES = ((60, "wK"), (63, "wR"), (56, "wR"), (4, "bK"), (7, "bR"), (0, "bR"))
+
+UNDO_STACK_CHUNK = 32 #liczba rekordów, o którą rośnie stos cofania, gdy brakuje w nim miejsca na kolejny ruch
+FIFTY_MOVE_PLIES = 100 #zasada 50 ruchów liczona w półruchach
+DRAW_REPETITION = "repetition"
+DRAW_FIFTY_MOVES = "fifty-move rule"
+
+#Mapowanie znaków notacji FEN na oznaczenia figur na planszy i odwrotnie
+FEN_TO_PIECE = {"P": "wp", "R": "wR", "N": "wN", "B": "wB", "Q": "wQ", "K": "wK",
+                "p": "bp", "r": "bR", "n": "bN", "b": "bB", "q": "bQ", "k": "bK"}
+PIECE_TO_FEN = {v: k for k, v in FEN_TO_PIECE.items()}
+EMPTY_RUNS = {str(n): ["--"] * n for n in range(1, 9)} #gotowe ciągi pustych pól dla cyfr w zapisie FEN
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+#dane figury dla znaku FEN potrzebne przy wczytywaniu pozycji:
+#(figura, kolor, klucze Zobrista, oceny gry środkowej i końcówki dla pól, waga fazy gry)
+FEN_PIECE_DATA = {char: (piece, piece[0], ZOBRIST_PIECES[piece], PIECE_SQUARE_MG[piece], PIECE_SQUARE_EG[piece], PHASE_WEIGHTS[piece[1]])
+                  for char, piece in FEN_TO_PIECE.items()}
+
+
+#Flagi w upakowanym ID ruchu (Move.move_id)
+MOVE_KEY_MASK = (1 << 14) - 1 #pole startowe, pole końcowe i figura promocji - jednoznacznie identyfikują ruch w danej pozycji
+MOVE_PROMOTION = 1 << 14
+MOVE_EN_PASSANT = 1 << 15
+MOVE_CASTLE = 1 << 16
+
+
+"""
+Rekord stosu cofania ruchów: stan pozycji sprzed ruchu, którego nie da się odtworzyć na podstawie obiektu Move
+(zbita figura jest zapisana w samym ruchu - Move.piece_captured)
+"""
+class UndoRecord():
+    __slots__ = ("castling_rights", "en_passant_possible", "halfmove_clock", "zobrist_key", "pawn_key", "mg_score", "eg_score", "phase")
+
+    def __init__(self):
+        self.castling_rights = 0
+        self.en_passant_possible = ()
+        self.halfmove_clock = 0
+        self.zobrist_key = 0
+        self.pawn_key = 0
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
 
 
 
@@ -532,36 +1306,67 @@ class Move():
 
 
 
-    def __init__(self, startSq, endSq, board, en_passant = False, pawn_promotion = False, is_castle_move = False):
-        self.start_row = startSq[0]
-        self.start_column = startSq[1]
-        self.end_row = endSq[0]
-        self.end_column = endSq[1]
-        self.piece_moved = board[self.start_row][self.start_column]
-        self.piece_captured = board[self.end_row][self.end_column]
+    promotion_pieces = ("Q", "R", "B", "N") #figury, na które może zostać promowany pion
+    promotion_codes = {"Q": 0, "R": 1, "B": 2, "N": 3} #promocja na hetmana ma kod 0, dzięki czemu ruch z kliknięcia myszy jest promocją na hetmana
+
+    #brak __dict__ - obiekty ruchu są mniejsze i szybciej tworzone, generator tworzy ich bardzo dużo
+    __slots__ = ("start_row", "start_column", "end_row", "end_column", "piece_moved", "piece_captured", "en_passant",
+                 "pawn_promotion", "promotion_piece", "is_castle_move", "is_capture", "move_id")
+
+    def __init__(self, startSq, endSq, board, en_passant = False, pawn_promotion = False, is_castle_move = False, promotion_piece = "Q"):
+        start_row, start_column = startSq
+        end_row, end_column = endSq
+        self.start_row = start_row
+        self.start_column = start_column
+        self.end_row = end_row
+        self.end_column = end_column
+        self.piece_moved = board[start_row][start_column]
         self.en_passant = en_passant
         self.pawn_promotion = pawn_promotion
+        self.promotion_piece = promotion_piece
         self.is_castle_move = is_castle_move
+        #ID ruchu upakowane w jednej liczbie: bity 0-5 pole startowe, 6-11 pole końcowe, 12-13 figura promocji, 14-16 flagi
+        move_id = start_row << 3 | start_column | end_row << 9 | end_column << 6
         if en_passant:
             self.piece_captured = 'bp' if self.piece_moved == 'wp' else 'wp' #bicie w przelocie bije pionka o przeciwnym kolorze
+            move_id |= MOVE_EN_PASSANT
+        else:
+            self.piece_captured = board[end_row][end_column]
+        if pawn_promotion:
+            move_id |= MOVE_PROMOTION | self.promotion_codes[promotion_piece] << 12
+        if is_castle_move:
+            move_id |= MOVE_CASTLE
         self.is_capture = self.piece_captured != "--"
-        self.move_id = self.start_row * 1000 + self.start_column * 100 + self.end_row * 10 + self.end_column #unikalne ID ruchu
-
-        
-
+        self.move_id = move_id
 
+    '''
+    Odtwarza pełny obiekt ruchu z upakowanego ID (np. zapisanego w tablicy transpozycji) dla danej planszy
+    '''
+    @classmethod
+    def from_id(cls, move_id, board):
+        start_square = move_id & 63
+        end_square = move_id >> 6 & 63
+        return cls((start_square >> 3, start_square & 7), (end_square >> 3, end_square & 7), board,
+                   en_passant = bool(move_id & MOVE_EN_PASSANT), pawn_promotion = bool(move_id & MOVE_PROMOTION),
+                   is_castle_move = bool(move_id & MOVE_CASTLE), promotion_piece = cls.promotion_pieces[move_id >> 12 & 3])
 
     '''
     Przesłanianie metody równościowej
     '''
     def __eq__(self, other):
         if isinstance(other, Move):
-            return self.move_id == other.move_id
+            return (self.move_id ^ other.move_id) & MOVE_KEY_MASK == 0 #flagi nie są porównywane - ruch z kliknięcia myszy ich nie ma
         return False
 
+    def __hash__(self):
+        return self.move_id & MOVE_KEY_MASK
+
     def get_chess_notation(self):
         #TODO: Zmodyfikowac metode, aby notacja przypominala jeszcze bardziej prawdziwa notacje szachowa
-        return self.get_rank_file(self.start_row, self.start_column) + self.get_rank_file(self.end_row, self.end_column)
+        notation = self.get_rank_file(self.start_row, self.start_column) + self.get_rank_file(self.end_row, self.end_column)
+        if self.pawn_promotion:
+            notation += self.promotion_piece.lower()
+        return notation
 
 
 
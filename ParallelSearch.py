@@ -0,0 +1,205 @@
+"""Wyszukiwanie równoległe w stylu Lazy SMP. Kilka procesów przeszukuje tę samą pozycję niezależnie, a wyniki
+wymieniają przez wspólną tablicę transpozycji umieszczoną w pamięci współdzielonej. Procesy zamiast wątków, ponieważ
+GIL nie pozwala wątkom wykonywać kodu Pythona równolegle.
+Procesy pomocnicze różnią się kolejnością ruchów w korzeniu i co drugi z nich pomija pierwszą iterację,
+dzięki czemu częściej trafiają na wpisy zapisane przez pozostałe procesy zamiast powtarzać tę samą pracę.
+Procesy uruchamiane są metodą "spawn" (pula startuje w wątku wyszukiwania, a fork w programie z wieloma wątkami może
+skopiować zablokowane blokady) i dostają pozycję razem z ruchami od ostatniego bicia lub ruchu pionem, więc wykrywają
+powtórzenia tak samo jak wyszukiwanie na jednym rdzeniu - inaczej ich wyniki we wspólnej tablicy byłyby błędne.
+Przykład użycia (porównanie z wyszukiwaniem na jednym rdzeniu, czas do osiągnięcia głębokości):
+    python ParallelSearch.py --workers 4 --depth 4
+    python ParallelSearch.py --workers 2 --positions startpos kiwipete --backend bitboard
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+import ChessAI
+import Perft
+from Engine import Move
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+START_METHOD = "spawn" #metoda uruchamiania procesów roboczych (multiprocessing.get_context)
+
+#stan procesu roboczego, ustawiany raz przy jego starcie
+worker_memory = None
+worker_table = None
+worker_stop_event = None
+
+
+"""
+Inicjalizacja procesu roboczego: podłączenie do pamięci współdzielonej z tablicą transpozycji
+"""
+def init_worker(memory_name, size_mb, stop_event):
+    global worker_memory, worker_table, worker_stop_event
+    worker_memory = shared_memory.SharedMemory(name=memory_name)
+    worker_table = ChessAI.TranspositionTable(size_mb, buffer=worker_memory.buf)
+    worker_stop_event = stop_event
+    random.seed(os.getpid()) #każdy proces z innym ziarnem, aby kolejność ruchów w korzeniu się różniła
+
+
+"""
+FEN pozycji sprzed ostatnich ruchów odwracalnych (od ostatniego bicia lub ruchu pionem) i ID tych ruchów.
+Pozycja jest na chwilę cofana i odtwarzana, więc po powrocie gs jest w tym samym stanie
+"""
+def reversible_history(gs):
+    count = min(gs.halfmove_clock, len(gs.moveLog))
+    moves = gs.moveLog[len(gs.moveLog) - count:]
+    for move in moves:
+        gs.undo_move()
+    fen = gs.to_fen()
+    for move in moves:
+        gs.make_move(move)
+    return fen, [move.move_id for move in moves]
+
+
+"""
+Zadanie wykonywane w procesie roboczym. Pozycja odtwarzana jest z FEN i ruchów z reversible_history, aby historia
+(a z nią wykrywanie powtórzeń) zgadzała się z procesem głównym. Zwraca słownik z ID najlepszego ruchu, ostatnią
+ukończoną głębokością, wynikiem i liczbą węzłów
+"""
+def search_worker(backend, fen, move_ids, worker_index, move_time_ms, max_depth):
+    gs = backend.from_fen(fen)
+    for move_id in move_ids:
+        gs.make_move(Move.from_id(move_id, gs.board))
+    result = {"worker": worker_index, "depth": 0, "score": 0}
+
+    def info(depth, score, nodes, seconds, pv):
+        result["depth"] = depth
+        result["score"] = score
+
+    start_depth = 1 + worker_index % 2 if worker_index > 0 else 1
+    move = ChessAI.find_best_move_iterative_deepening(gs, gs.get_valid_moves(), move_time_ms, max_depth, table=worker_table,
+                                                      info=info, stop_event=worker_stop_event, start_depth=start_depth)
+    result["move_id"] = move.move_id if move is not None else 0
+    result["nodes"] = ChessAI.nodes
+    return result
+
+
+"""
+Pula procesów przeszukujących wspólnie jedną pozycję. Procesy i pamięć współdzielona tworzone są raz,
+na całą grę - należy je zwolnić metodą close()
+"""
+class ParallelSearch():
+    def __init__(self, workers=DEFAULT_WORKERS, size_mb=ChessAI.TT_SIZE_MB):
+        self.workers = workers
+        self.memory = shared_memory.SharedMemory(create=True, size=ChessAI.TranspositionTable.buffer_size(size_mb))
+        self.table = ChessAI.TranspositionTable(size_mb, buffer=self.memory.buf)
+        self.table.clear()
+        context = multiprocessing.get_context(START_METHOD)
+        self.stop_event = context.Event()
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                                           initargs=(self.memory.name, size_mb, self.stop_event))
+        self.nodes = 0
+
+    '''
+    Wyszukuje najlepszy ruch na wszystkich procesach. Kończy się, gdy pierwszy proces ukończy wyszukiwanie
+    (upływ czasu, osiągnięcie max_depth lub znaleziony mat) - pozostałe są wtedy zatrzymywane.
+    Wybierany jest ruch z procesu, który ukończył największą głębokość
+    '''
+    def search(self, gs, valid_moves, move_time_ms=None, max_depth=ChessAI.MAX_DEPTH, info=None):
+        if len(valid_moves) == 0:
+            return None
+        start = time.perf_counter()
+        fen, move_ids = reversible_history(gs)
+        futures = [self.pool.submit(search_worker, gs.__class__, fen, move_ids, i, move_time_ms, max_depth)
+                   for i in range(self.workers)]
+        concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+        self.stop_event.set()
+        results = [future.result() for future in futures]
+        self.stop_event.clear()
+        self.nodes = sum(result["nodes"] for result in results)
+        best = max(results, key=lambda result: (result["depth"], -result["worker"]))
+        if best["move_id"] == 0:
+            return valid_moves[0]
+        move = Move.from_id(best["move_id"], gs.board)
+        if info is not None:
+            info(best["depth"], best["score"], self.nodes, time.perf_counter() - start,
+                 ChessAI.get_principal_variation(gs, best["depth"], self.table))
+        for valid_move in valid_moves: #zwracany jest obiekt z listy legalnych ruchów, tak jak przy wyszukiwaniu na jednym rdzeniu
+            if valid_move == move:
+                return valid_move
+        return move
+
+    '''
+    Przerywa trwające wyszukiwanie (np. z innego wątku) - search() zwraca ruch z ostatniej ukończonej iteracji
+    '''
+    def stop(self):
+        self.stop_event.set()
+
+    def close(self):
+        self.pool.shutdown()
+        self.table = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+"""
+Czas potrzebny do osiągnięcia danej głębokości na jednym rdzeniu i na wielu procesach dla pozycji testowych
+"""
+def benchmark(positions, depth, workers, backend="list", size_mb=ChessAI.TT_SIZE_MB):
+    results = []
+    parallel = ParallelSearch(workers, size_mb)
+    try:
+        for name, fen, expected, default_depth in positions:
+            gs = Perft.BACKENDS[backend].from_fen(fen)
+            ChessAI.set_hash_size(size_mb)
+            start = time.perf_counter()
+            ChessAI.find_best_move_iterative_deepening(gs, gs.get_valid_moves(), max_depth=depth)
+            single_seconds = time.perf_counter() - start
+            single_nodes = ChessAI.nodes
+
+            parallel.table.clear()
+            start = time.perf_counter()
+            parallel.search(gs, gs.get_valid_moves(), max_depth=depth)
+            parallel_seconds = time.perf_counter() - start
+            results.append({
+                "name": name,
+                "depth": depth,
+                "single_seconds": round(single_seconds, 4),
+                "single_nodes": single_nodes,
+                "parallel_seconds": round(parallel_seconds, 4),
+                "parallel_nodes": parallel.nodes,
+                "speedup": round(single_seconds / parallel_seconds, 2) if parallel_seconds > 0 else 0,
+            })
+    finally:
+        parallel.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Przyspieszenie wyszukiwania równoległego względem jednego rdzenia")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument("--depth", type=int, default=4, help="głębokość wyszukiwania")
+    parser.add_argument("--positions", nargs="*", help="nazwy pozycji z Perft.POSITIONS (domyślnie wszystkie)")
+    parser.add_argument("--backend", choices=sorted(Perft.BACKENDS), default="list", help="reprezentacja planszy")
+    parser.add_argument("--hash", type=int, default=ChessAI.TT_SIZE_MB, help="rozmiar tablicy transpozycji w MB")
+    parser.add_argument("--output", help="plik, do którego zostaną zapisane wyniki w formacie JSON")
+    args = parser.parse_args(argv)
+
+    positions = [position for position in Perft.POSITIONS if not args.positions or position[0] in args.positions]
+    results = benchmark(positions, args.depth, args.workers, args.backend, args.hash)
+    for result in results:
+        print("%-10s depth %d  1 core %8.2fs %9d nodes  %d workers %8.2fs %9d nodes  speedup %.2fx" % (
+              result["name"], result["depth"], result["single_seconds"], result["single_nodes"], args.workers,
+              result["parallel_seconds"], result["parallel_nodes"], result["speedup"]))
+    single_total = sum(result["single_seconds"] for result in results)
+    parallel_total = sum(result["parallel_seconds"] for result in results)
+    summary = {"workers": args.workers, "positions": results,
+               "speedup": round(single_total / parallel_total, 2) if parallel_total > 0 else 0}
+    print("total speedup %.2fx (%d workers, %d cores)" % (summary["speedup"], args.workers, os.cpu_count() or 1))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
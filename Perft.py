@@ -0,0 +1,175 @@
+"""Benchmark generatora ruchów (perft). Działa bez pygame, wyniki zapisuje w formacie JSON.
+Przykład użycia:
+    python Perft.py --depth 3 --output bench_output.txt
+    python Perft.py --positions startpos kiwipete --divide
+    python Perft.py --backend bitboard --depth 4
+Zwraca kod wyjścia 1, gdy liczba węzłów różni się od wartości referencyjnej dla którejkolwiek pozycji
+lub gdy remis z DRAW_CHECKS (np. trzykrotne powtórzenie) nie zostanie rozpoznany albo niepoprawny FEN z INVALID_FENS
+zostanie przyjęty.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import Bitboard
+import Engine
+
+#dostępne reprezentacje planszy
+BACKENDS = {"list": Engine.GameState, "bitboard": Bitboard.BitboardGameState}
+
+#Standardowe pozycje testowe (https://www.chessprogramming.org/Perft_Results)
+#(nazwa, FEN, referencyjne liczby węzłów dla głębokości 1, 2, 3, ..., domyślna głębokość)
+POSITIONS = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     (20, 400, 8902, 197281, 4865609), 3),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     (48, 2039, 97862, 4085603), 3),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     (14, 191, 2812, 43238, 674624), 4),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     (6, 264, 9467, 422333), 3),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     (44, 1486, 62379, 2103487), 3),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     (46, 2079, 89890, 3894594), 3),
+]
+
+#Sprawdzenie remisów wynikających z historii partii: (nazwa, FEN, ruchy, oczekiwany powód remisu po ostatnim ruchu).
+#Pozycja po 1.e4 (pole bicia w przelocie bez piona, który mógłby bić) musi zostać rozpoznana przy trzecim wystąpieniu
+DRAW_CHECKS = [
+    ("repetition-ep", Engine.START_FEN, "e2e4 g8f6 g1f3 f6g8 f3g1 g8f6 g1f3 f6g8 f3g1", Engine.DRAW_REPETITION),
+]
+
+#Zapisy FEN, które muszą zostać odrzucone (ValueError) - generatory ruchów nie obsługują takich pozycji
+INVALID_FENS = [
+    "4k3/8/8/8/3p4/8/8/4K3 b - e3 0 1", #pole bicia w przelocie bez piona, który wykonał ruch o dwa pola
+    "4k3/8/8/8/8/8/8/4K2p b - - 0 1", #pion na pierwszym rzędzie
+    "P3k3/8/8/8/8/8/8/4K3 w - - 0 1", #pion na ostatnim rzędzie
+    "4k3/8/8/8/8/8/8/8 w - - 0 1", #brak białego króla
+    "7k/8/6K1/8/8/8/8/Q7 w - - 0 1", #szach dla strony, która nie ma ruchu
+]
+
+
+"""
+Wczytuje pozycje testowe z pliku EPD, np. linia: <FEN> ;D1 20 ;D2 400 ;D3 8902
+Zwraca listę w tym samym formacie co POSITIONS, domyślną głębokością jest najmniejsza podana w pliku
+"""
+def load_epd(path):
+    positions = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            gs, operations = Engine.GameState.from_epd(line)
+            depths = sorted(int(op[1:]) for op in operations if op[0] == "D" and op[1:].isdigit())
+            expected = tuple(int(operations["D%d" % d]) if "D%d" % d in operations else None for d in range(1, depths[-1] + 1)) if depths else ()
+            positions.append((operations.get("id", "line%d" % line_number), gs.to_fen(), expected, depths[0] if depths else 1))
+    return positions
+
+
+"""
+Wykonuje ruchy z DRAW_CHECKS i zwraca słownik z wynikiem sprawdzenia (powód remisu po ostatnim ruchu)
+"""
+def run_draw_check(name, fen, moves, expected, backend="list"):
+    gs = BACKENDS[backend].from_fen(fen)
+    gs.zobrist_self_check = True
+    for notation in moves.split():
+        move = next((move for move in gs.get_valid_moves() if move.get_chess_notation() == notation), None)
+        if move is None:
+            return {"name": name, "backend": backend, "fen": fen, "draw": None, "expected": expected, "ok": False}
+        gs.make_move(move)
+    draw = gs.get_draw_reason()
+    return {"name": name, "backend": backend, "fen": fen, "draw": draw, "expected": expected, "ok": draw == expected}
+
+
+"""
+Sprawdza, czy zapis FEN z INVALID_FENS zostaje odrzucony
+"""
+def run_invalid_fen_check(fen, backend="list"):
+    try:
+        BACKENDS[backend].from_fen(fen)
+    except ValueError as error:
+        return {"fen": fen, "backend": backend, "error": str(error), "ok": True}
+    return {"fen": fen, "backend": backend, "error": None, "ok": False}
+
+
+"""
+Uruchamia perft dla jednej pozycji i zwraca słownik z wynikiem pomiaru
+"""
+def run_position(name, fen, expected, depth, backend="list", zobrist_check=False, eval_check=False):
+    gs = BACKENDS[backend].from_fen(fen)
+    gs.zobrist_self_check = zobrist_check
+    gs.evaluation_self_check = eval_check
+    start = time.perf_counter()
+    nodes = gs.perft(depth)
+    seconds = time.perf_counter() - start
+    expected_nodes = expected[depth - 1] if depth <= len(expected) else None
+    return {
+        "name": name,
+        "backend": backend,
+        "fen": fen,
+        "depth": depth,
+        "nodes": nodes,
+        "expected": expected_nodes,
+        "ok": expected_nodes is None or nodes == expected_nodes,
+        "seconds": round(seconds, 4),
+        "nps": int(nodes / seconds) if seconds > 0 else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft - poprawność i szybkość generatora ruchów")
+    parser.add_argument("--depth", type=int, help="głębokość dla wszystkich pozycji (domyślnie osobna dla każdej pozycji)")
+    parser.add_argument("--positions", nargs="*", help="nazwy pozycji do uruchomienia (domyślnie wszystkie)")
+    parser.add_argument("--divide", action="store_true", help="wypisz liczbę węzłów dla każdego ruchu z pozycji")
+    parser.add_argument("--epd", help="plik EPD z pozycjami i operacjami D<głębokość> <liczba węzłów> (format perftsuite.epd)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="list", help="reprezentacja planszy")
+    parser.add_argument("--zobrist-check", action="store_true", help="po każdym ruchu porównuj klucz Zobrista z kluczem liczonym od zera")
+    parser.add_argument("--eval-check", action="store_true", help="po każdym ruchu porównuj ocenę pozycji z oceną liczoną od zera")
+    parser.add_argument("--output", help="plik, do którego zostaną zapisane wyniki w formacie JSON")
+    args = parser.parse_args(argv)
+
+    positions = load_epd(args.epd) if args.epd else POSITIONS
+    results = []
+    for name, fen, expected, default_depth in positions:
+        if args.positions and name not in args.positions:
+            continue
+        depth = args.depth or default_depth
+        if args.divide:
+            for move, nodes in sorted(BACKENDS[args.backend].from_fen(fen).divide(depth).items()):
+                print(name, move, nodes)
+        result = run_position(name, fen, expected, depth, args.backend, args.zobrist_check, args.eval_check)
+        results.append(result)
+        print("%-10s depth %d  nodes %10d  %8.2fs  %8d nps  %s" % (name, depth, result["nodes"], result["seconds"],
+              result["nps"], "ok" if result["ok"] else "MISMATCH (expected %d)" % result["expected"]))
+
+    draw_checks = [run_draw_check(name, fen, moves, expected, args.backend) for name, fen, moves, expected in DRAW_CHECKS]
+    for check in draw_checks:
+        print("%-10s draw %-16s %s" % (check["name"], check["draw"], "ok" if check["ok"] else "MISMATCH (expected %s)" % check["expected"]))
+    fen_checks = [run_invalid_fen_check(fen, args.backend) for fen in INVALID_FENS]
+    for check in fen_checks:
+        if not check["ok"]:
+            print("invalid FEN accepted: %s" % check["fen"])
+
+    total_nodes = sum(r["nodes"] for r in results)
+    total_seconds = sum(r["seconds"] for r in results)
+    summary = {
+        "positions": results,
+        "total_nodes": total_nodes,
+        "total_seconds": round(total_seconds, 4),
+        "nps": int(total_nodes / total_seconds) if total_seconds > 0 else 0,
+        "draw_checks": draw_checks,
+        "invalid_fen_checks": fen_checks,
+        "ok": all(r["ok"] for r in results + draw_checks + fen_checks),
+    }
+    print("total %d nodes, %.2fs, %d nps" % (total_nodes, total_seconds, summary["nps"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1057 @@
+"""Sondowanie tablic końcówek w formacie Syzygy (pliki lokalne, np. KQvK.rtbw i KQvK.rtbz). Tablice sondowane są dopiero,
+gdy liczba figur na planszy (razem z królami) spadnie do max_pieces - wtedy wyszukiwanie zamiast oceny heurystycznej
+dostaje dokładny wynik: wygrana, przegrana lub remis (WDL) z perspektywy strony na ruchu, a w korzeniu ruch wybierany
+jest według odległości do wyzerowania licznika 50 ruchów (DTZ), co gwarantuje zrealizowanie wygranej.
+Pliki wyszukiwane są po sygnaturze materiału (figury białych, "v", figury czarnych), mapowane do pamięci (mmap)
+i rozpakowywane przy pierwszym użyciu. Wyniki WDL (także nieznane, gdy brakuje pliku) trafiają do tablicy podręcznej
+indeksowanej kluczem Zobrista. Pozycje martwe (brak materiału do zamatowania) są remisem bez sięgania do plików.
+Format plików (indeksowanie pozycji i kompresja słownikowa z kodami Huffmana) odpowiada generatorowi Syzygy;
+pola liczone są od a1 (a1 = 0, h8 = 63), czyli odwrotnie niż rzędy planszy w GameState (pole Syzygy = pole ^ 56).
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+import Perft
+from Engine import FIFTY_MOVE_PLIES
+
+TABLEBASE_DIR = "resources/syzygy" #katalog z plikami .rtbw/.rtbz
+TB_PROBE_LIMIT = 5 #maksymalna liczba figur (z królami), przy której sondowane są tablice
+TB_CACHE_ENTRIES = 1 << 16 #liczba wpisów tablicy podręcznej (potęga dwójki)
+WDL_SUFFIX = ".rtbw"
+DTZ_SUFFIX = ".rtbz"
+MAGIC = {WDL_SUFFIX: bytes((0x71, 0xE8, 0x23, 0x5D)), DTZ_SUFFIX: bytes((0xD7, 0x66, 0x0C, 0xA5))}
+PIECE_ORDER = "KQRBNp" #kolejność figur w nazwach plików Syzygy
+UINT16 = struct.Struct("<H")
+UINT32 = struct.Struct("<I")
+UINT32_BE = struct.Struct(">I")
+UINT64_BE = struct.Struct(">Q")
+
+#wyniki WDL z perspektywy strony na ruchu (CURSED_WIN / BLESSED_LOSS - wygrana/przegrana, której nie da się
+#osiągnąć przed upływem 50 ruchów, zatem w praktyce remis)
+LOSS = -2
+BLESSED_LOSS = -1
+DRAW = 0
+CURSED_WIN = 1
+WIN = 2
+
+#kody figur w plikach Syzygy: 1 - pion, 2 - skoczek, 3 - goniec, 4 - wieża, 5 - hetman, 6 - król, +8 dla czarnych
+TB_PIECE_CODES = {"wp": 1, "wN": 2, "wB": 3, "wR": 4, "wQ": 5, "wK": 6, "bp": 9, "bN": 10, "bB": 11, "bR": 12, "bQ": 13, "bK": 14}
+TB_PIECE_LETTERS = " PNBRQK" #kod figury (bez koloru) -> litera w sygnaturze
+WDL_TO_MAP = (1, 3, 0, 2, 0) #WDL + 2 -> numer mapy wartości DTZ
+PA_FLAGS = (8, 0, 0, 0, 4) #WDL + 2 -> flaga tablicy DTZ zapisanej w półruchach (bez zaokrąglenia do ruchów)
+WDL_TO_DTZ = (-1, -101, 0, 101, 1)
+PIVOT_FACTORS = (31332, 28056, 462) #liczba ustawień pierwszych figur: trzy różne figury (typ 0), para królów (typ 2)
+
+#pozycje kontrolne: (FEN, WDL, DTZ) - wartości zgodne z referencyjnym sondowaniem Syzygy
+PROBE_CHECKS = [
+    ("8/2K5/4B3/3N4/8/8/4k3/8 b - - 0 1", LOSS, -53),
+    ("8/8/8/8/4k3/8/8/K1Q5 w - - 0 1", WIN, 13),
+    ("8/8/8/8/4k3/8/8/K1Q5 w - - 95 1", WIN, 13), #wygrana nie zdąży przed upływem 50 ruchów
+    ("8/8/8/8/8/8/2k5/K3R3 b - - 0 1", LOSS, -30),
+    ("8/8/4k3/8/8/8/4P3/4K3 w - - 0 1", DRAW, 0),
+    ("8/1k6/8/8/8/r7/6R1/K7 w - - 0 1", DRAW, 0),
+    ("8/8/8/8/1p6/8/P7/K1k5 w - - 0 1", LOSS, -1),
+    ("8/8/8/8/8/3k4/3p4/5K2 b - - 0 1", WIN, 1),
+]
+
+#numer pola w trójkącie a1-d1-d4 po sprowadzeniu symetriami (pozostałe pola odbijane są do tego trójkąta)
+TRIANGLE = (
+    6, 0, 1, 2, 2, 1, 0, 6,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    2, 4, 5, 9, 9, 5, 4, 2,
+    1, 3, 8, 5, 5, 8, 3, 1,
+    0, 7, 3, 4, 4, 3, 7, 0,
+    6, 0, 1, 2, 2, 1, 0, 6)
+INVERSE_TRIANGLE = (1, 2, 3, 10, 11, 19, 0, 9, 18, 27)
+
+#numer pola poniżej przekątnej a1-h8 (pola na przekątnej mają numery 28-35)
+LOWER = (
+    28,  0,  1,  2,  3,  4,  5,  6,
+     0, 29,  7,  8,  9, 10, 11, 12,
+     1,  7, 30, 13, 14, 15, 16, 17,
+     2,  8, 13, 31, 18, 19, 20, 21,
+     3,  9, 14, 18, 32, 22, 23, 24,
+     4, 10, 15, 19, 22, 33, 25, 26,
+     5, 11, 16, 20, 23, 25, 34, 27,
+     6, 12, 17, 21, 24, 26, 27, 35)
+
+#numer pola na przekątnych a1-h8 i h1-a8
+DIAGONAL = (
+     0,  0,  0,  0,  0,  0,  0,  8,
+     0,  1,  0,  0,  0,  0,  9,  0,
+     0,  0,  2,  0,  0, 10,  0,  0,
+     0,  0,  0,  3, 11,  0,  0,  0,
+     0,  0,  0, 12,  4,  0,  0,  0,
+     0,  0, 13,  0,  0,  5,  0,  0,
+     0, 14,  0,  0,  0,  0,  6,  0,
+    15,  0,  0,  0,  0,  0,  0,  7)
+
+#pola pionów: numer pola pierwszego piona (kolumny a-d) i kolejność pozostałych pionów
+FLAP = (
+    0,  0,  0,  0,  0,  0,  0, 0,
+    0,  6, 12, 18, 18, 12,  6, 0,
+    1,  7, 13, 19, 19, 13,  7, 1,
+    2,  8, 14, 20, 20, 14,  8, 2,
+    3,  9, 15, 21, 21, 15,  9, 3,
+    4, 10, 16, 22, 22, 16, 10, 4,
+    5, 11, 17, 23, 23, 17, 11, 5,
+    0,  0,  0,  0,  0,  0,  0, 0)
+PAWN_TWIST = (
+     0,  0,  0,  0,  0,  0,  0,  0,
+    47, 35, 23, 11, 10, 22, 34, 46,
+    45, 33, 21,  9,  8, 20, 32, 44,
+    43, 31, 19,  7,  6, 18, 30, 42,
+    41, 29, 17,  5,  4, 16, 28, 40,
+    39, 27, 15,  3,  2, 14, 26, 38,
+    37, 25, 13,  1,  0, 12, 24, 36,
+     0,  0,  0,  0,  0,  0,  0,  0)
+INVERSE_FLAP = (
+     8, 16, 24, 32, 40, 48,
+     9, 17, 25, 33, 41, 49,
+    10, 18, 26, 34, 42, 50,
+    11, 19, 27, 35, 43, 51)
+FILE_TO_FILE = (0, 1, 2, 3, 3, 2, 1, 0)
+
+
+def binomial(n, k):
+    return math.comb(n, k) if n >= 0 else 0
+
+def off_diagonal(square):
+    return (square >> 3) - (square & 7)
+
+def flip_diagonal(square):
+    return ((square >> 3) | (square << 3)) & 63
+
+
+"""
+Indeksy par królów: pierwszy król w trójkącie a1-d1-d4 (wiersz według TRIANGLE), drugi na dowolnym polu, na którym nie
+sąsiaduje z pierwszym (-1 - ustawienie niemożliwe). Gdy pierwszy król stoi na przekątnej a1-h8, drugi nie może stać
+nad nią, a ustawienia z oboma królami na przekątnej mają najwyższe indeksy (razem 462 ustawienia)
+"""
+def king_pair_indices():
+    indices = [[-1] * 64 for triangle in range(10)]
+    both_on_diagonal = []
+    index = 0
+    for triangle, first in enumerate(INVERSE_TRIANGLE):
+        for second in range(64):
+            if abs((first >> 3) - (second >> 3)) <= 1 and abs((first & 7) - (second & 7)) <= 1:
+                continue
+            if off_diagonal(first) == 0 and off_diagonal(second) > 0:
+                continue
+            if off_diagonal(first) == 0 and off_diagonal(second) == 0:
+                both_on_diagonal.append((triangle, second))
+            else:
+                indices[triangle][second] = index
+                index += 1
+    for triangle, second in both_on_diagonal:
+        indices[triangle][second] = index
+        index += 1
+    return indices
+
+
+"""
+Indeksy pierwszych pionów: pawn_index[liczba pionów - 1][FLAP pionu prowadzącego] oraz liczba ustawień tych pionów
+dla każdej kolumny pionu prowadzącego (a-d) - pawn_factor[liczba pionów - 1][kolumna]
+"""
+def pawn_index_tables():
+    pawn_index = [[0] * 24 for count in range(5)]
+    pawn_factor = [[0] * 4 for count in range(5)]
+    for count in range(5):
+        for file in range(4):
+            total = 0
+            for flap in range(6 * file, 6 * file + 6):
+                pawn_index[count][flap] = total
+                total += 1 if count == 0 else binomial(PAWN_TWIST[INVERSE_FLAP[flap]], count)
+            pawn_factor[count][file] = total
+    return pawn_index, pawn_factor
+
+
+KING_PAIR_INDEX = king_pair_indices()
+PAWN_INDEX, PAWN_FACTOR = pawn_index_tables()
+
+
+"""
+Sygnatura materiału w konwencji nazw plików Syzygy, np. KRPvKR
+"""
+def material_signature(gs):
+    sides = []
+    for color in ("w", "b"):
+        pieces = sorted((gs.board[square >> 3][square & 7][1] for square in gs.piece_squares[color]), key=PIECE_ORDER.index)
+        sides.append("".join(pieces).upper())
+    return "v".join(sides)
+
+
+"""
+Sygnatura materiału z listy kodów figur zapisanej w pliku (mirror - z zamienionymi kolorami)
+"""
+def pieces_signature(pieces, mirror=False):
+    sides = []
+    for color in (8, 0) if mirror else (0, 8):
+        sides.append("".join(TB_PIECE_LETTERS[code & 7] for code in sorted(pieces, reverse=True) if code & 8 == color))
+    return "v".join(sides)
+
+
+"""
+Pozycja martwa - żadna ze stron nie może dać mata (sam król, król z lekką figurą, gońce tylko jednego koloru pól)
+"""
+def is_dead_position(gs):
+    minors = 0
+    bishop_colors = set()
+    knights = 0
+    for color in ("w", "b"):
+        for square in gs.piece_squares[color]:
+            row, column = square >> 3, square & 7
+            piece = gs.board[row][column][1]
+            if piece == "B":
+                bishop_colors.add((row + column) % 2)
+                minors += 1
+            elif piece == "N":
+                knights += 1
+                minors += 1
+            elif piece != "K":
+                return False
+    return minors <= 1 or (knights == 0 and len(bishop_colors) == 1)
+
+
+"""
+Pola Syzygy figur pozycji pogrupowane po kodzie figury, rosnąco
+"""
+def piece_squares_by_code(gs):
+    squares = {}
+    for color in ("w", "b"):
+        for square in gs.piece_squares[color]:
+            squares.setdefault(TB_PIECE_CODES[gs.board[square >> 3][square & 7]], []).append(square ^ 56)
+    for code_squares in squares.values():
+        code_squares.sort()
+    return squares
+
+
+"""
+Wynik DTZ ruchu zerującego licznik 50 ruchów (bicia lub ruchu pionem) przy danym wyniku WDL
+"""
+def dtz_before_zeroing(wdl):
+    return ((wdl > 0) - (wdl < 0)) * (1 if abs(wdl) == 2 else 101)
+
+
+"""
+Ocena ruchu w korzeniu według DTZ po ruchu i licznika półruchów w korzeniu. Wygrana, którą da się zrealizować przed
+upływem 50 ruchów (dtz + halfmove_clock <= FIFTY_MOVE_PLIES), jest lepsza od wygranej przekraczającej ten limit
+(w praktyce remis, ale z szansą na błąd przeciwnika), a ta od remisu - analogicznie dla przegranych. W obrębie
+grupy lepszy jest mniejszy DTZ (szybsze wyzerowanie licznika przy wygranej, późniejsze przy przegranej)
+"""
+def root_rank(dtz, halfmove_clock):
+    if dtz > 0:
+        return (2 if dtz + halfmove_clock <= FIFTY_MOVE_PLIES else 1), -dtz
+    if dtz < 0:
+        return (-2 if -dtz + halfmove_clock <= FIFTY_MOVE_PLIES else -1), -dtz
+    return 0, 0
+
+
+"""
+Brak pliku tablicy potrzebnego do sondowania pozycji (także pozycji po biciu lub promocji)
+"""
+class MissingTableError(Exception):
+    pass
+
+
+"""
+Dane skompresowanej części tablicy: tablica indeksów bloków, rozmiary bloków, dane oraz słownik symboli
+(każdy symbol to pojedyncza wartość albo para symboli) z kodami Huffmana
+"""
+class PairsData():
+    __slots__ = ("index_table", "size_table", "data", "offset", "symbol_lengths", "symbol_pattern", "block_size",
+                 "index_bits", "min_length", "base")
+
+    def __init__(self):
+        self.index_table = 0
+        self.size_table = 0
+        self.data = 0
+        self.offset = 0
+        self.symbol_lengths = []
+        self.symbol_pattern = 0
+        self.block_size = 0
+        self.index_bits = 0
+        self.min_length = 0
+        self.base = []
+
+
+"""
+Jeden plik tablicy Syzygy (WDL lub DTZ) zmapowany do pamięci. Plik zawiera osobne części dla każdej kolumny pionu
+prowadzącego (tablice z pionami) i, w plikach WDL, dla każdej strony na ruchu
+"""
+class SyzygyTable():
+    def __init__(self, path, suffix):
+        self.path = path
+        self.is_wdl = suffix == WDL_SUFFIX
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.num = len(name) - 1 #liczba figur
+        self.has_pawns = "P" in name
+        self.key = name
+        self.mirrored_key = "v".join(reversed(name.split("v")))
+        first, second = name.split("v")
+        if self.has_pawns: #piony prowadzące to piony strony, która ma ich mniej (ale co najmniej jeden)
+            self.pawns = [second.count("P"), first.count("P")]
+            if self.pawns[1] > 0 and (self.pawns[0] == 0 or self.pawns[1] < self.pawns[0]):
+                self.pawns.reverse()
+        else: #typ 0 - trzy pojedyncze figury na początku indeksu, typ 2 - tylko para królów
+            unique = sum((first.count(piece) == 1) + (second.count(piece) == 1) for piece in "KQRBNP")
+            self.encoding = 0 if unique >= 3 else 2
+
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != MAGIC[suffix] or self.data.size() % 64 != 16:
+            self.close()
+            raise ValueError("%s: niepoprawny nagłówek pliku Syzygy" % path)
+        if self.is_wdl:
+            self.setup_wdl()
+        else:
+            self.setup_dtz()
+        if not self.has_pawns: #klucz według figur zapisanych w pliku, który nie zawsze odpowiada nazwie pliku
+            self.key = pieces_signature(self.pieces[0][0])
+            self.mirrored_key = pieces_signature(self.pieces[0][0], mirror=True)
+        self.symmetric = self.key == self.mirrored_key
+
+    def read_uint16(self, offset):
+        return UINT16.unpack_from(self.data, offset)[0]
+
+    def read_uint32(self, offset):
+        return UINT32.unpack_from(self.data, offset)[0]
+
+    '''
+    Układ pliku WDL: figury dla każdej kolumny, nagłówki kompresji, tablice indeksów, tablice rozmiarów bloków i dane
+    (wyrównane do 64 bajtów) - kolejno dla każdej kolumny pionu prowadzącego i strony na ruchu
+    '''
+    def setup_wdl(self):
+        sides = 2 if self.data[4] & 0x01 else 1
+        files = 4 if self.data[4] & 0x02 else 1
+        offset = self.setup_pieces(5, 2)
+        self.precomp = [[None] * sides for file in range(files)]
+        sizes = [[None] * sides for file in range(files)]
+        for file in range(files):
+            for side in range(sides):
+                self.precomp[file][side], offset, sizes[file][side], flags = self.setup_pairs(offset, self.table_sizes[file][side])
+        self.setup_blocks(offset, sizes)
+
+    '''
+    Układ pliku DTZ: jak w pliku WDL, ale dla jednej strony na ruchu (flags & 1) i z mapami wartości DTZ
+    dla poszczególnych wyników WDL zapisanymi po nagłówkach kompresji
+    '''
+    def setup_dtz(self):
+        files = 4 if self.data[4] & 0x02 else 1
+        offset = self.setup_pieces(5, 1)
+        self.precomp = [[None] for file in range(files)]
+        sizes = [[None] for file in range(files)]
+        self.flags = [0] * files
+        for file in range(files):
+            self.precomp[file][0], offset, sizes[file][0], self.flags[file] = self.setup_pairs(offset, self.table_sizes[file][0])
+        self.map_offset = offset
+        self.map_indices = [[0] * 4 for file in range(files)]
+        for file in range(files):
+            if self.flags[file] & 0x02:
+                if not self.flags[file] & 0x10: #mapy jednobajtowe
+                    for i in range(4):
+                        self.map_indices[file][i] = offset + 1 - self.map_offset
+                        offset += 1 + self.data[offset]
+                else: #mapy dwubajtowe
+                    if self.has_pawns:
+                        offset += offset & 1
+                    for i in range(4):
+                        self.map_indices[file][i] = (offset + 2 - self.map_offset) // 2
+                        offset += 2 + 2 * self.read_uint16(offset)
+        offset += offset & 1
+        self.setup_blocks(offset, sizes)
+
+    '''
+    Odczyt kolejności figur w indeksie (kody figur, młodsze 4 bity - pierwsza strona, starsze - druga) i obliczenie
+    mnożników indeksu dla każdej kolumny pionu prowadzącego. Zwraca pozycję w pliku za opisem figur
+    '''
+    def setup_pieces(self, offset, sides):
+        files = 4 if self.has_pawns else 1
+        self.pieces = [[None] * sides for file in range(files)]
+        self.norm = [[None] * sides for file in range(files)]
+        self.factor = [[None] * sides for file in range(files)]
+        self.table_sizes = [[0] * sides for file in range(files)]
+        header = 1 + (self.has_pawns and self.pawns[1] > 0)
+        for file in range(files):
+            for side in range(sides):
+                shift = 4 * side
+                pieces = [self.data[offset + header + i] >> shift & 0x0f for i in range(self.num)]
+                order = self.data[offset] >> shift & 0x0f
+                norm = [0] * self.num
+                factor = [0] * self.num
+                if self.has_pawns:
+                    order2 = self.data[offset + 1] >> shift & 0x0f if self.pawns[1] else 0x0f
+                    self.set_norm_pawn(norm, pieces)
+                    self.table_sizes[file][side] = self.calc_factors_pawn(factor, order, order2, norm, file)
+                else:
+                    self.set_norm_piece(norm, pieces)
+                    self.table_sizes[file][side] = self.calc_factors_piece(factor, order, norm)
+                self.pieces[file][side] = pieces
+                self.norm[file][side] = norm
+                self.factor[file][side] = factor
+            offset += self.num + header
+        return offset + (offset & 1)
+
+    '''
+    Długości grup jednakowych figur w indeksie (norm[i] - długość grupy zaczynającej się od figury i)
+    '''
+    def set_norm_piece(self, norm, pieces):
+        norm[0] = 3 if self.encoding == 0 else 2
+        self.set_norm_groups(norm, pieces, norm[0])
+
+    def set_norm_pawn(self, norm, pieces):
+        norm[0] = self.pawns[0]
+        if self.pawns[1]:
+            norm[self.pawns[0]] = self.pawns[1]
+        self.set_norm_groups(norm, pieces, self.pawns[0] + self.pawns[1])
+
+    def set_norm_groups(self, norm, pieces, i):
+        while i < self.num:
+            j = i
+            while j < self.num and pieces[j] == pieces[i]:
+                norm[i] += 1
+                j += 1
+            i += norm[i]
+
+    '''
+    Mnożniki kolejnych grup figur w indeksie (order - miejsce pierwszej grupy w kolejności mnożenia). Zwraca liczbę pozycji
+    '''
+    def calc_factors_piece(self, factor, order, norm):
+        free = 64 - norm[0]
+        size = 1
+        i = norm[0]
+        k = 0
+        while i < self.num or k == order:
+            if k == order:
+                factor[0] = size
+                size *= PIVOT_FACTORS[self.encoding]
+            else:
+                factor[i] = size
+                size *= binomial(free, norm[i])
+                free -= norm[i]
+                i += norm[i]
+            k += 1
+        return size
+
+    def calc_factors_pawn(self, factor, order, order2, norm, file):
+        i = norm[0]
+        if order2 < 0x0f:
+            i += norm[i]
+        free = 64 - i
+        size = 1
+        k = 0
+        while i < self.num or k == order or k == order2:
+            if k == order:
+                factor[0] = size
+                size *= PAWN_FACTOR[norm[0] - 1][file]
+            elif k == order2:
+                factor[norm[0]] = size
+                size *= binomial(48 - norm[0], norm[norm[0]])
+            else:
+                factor[i] = size
+                size *= binomial(free, norm[i])
+                free -= norm[i]
+                i += norm[i]
+            k += 1
+        return size
+
+    '''
+    Nagłówek kompresji jednej części tablicy. Zwraca (dane kompresji, pozycja za nagłówkiem, rozmiary tablicy indeksów,
+    tablicy rozmiarów bloków i danych, flagi)
+    '''
+    def setup_pairs(self, offset, table_size):
+        data = self.data
+        pairs = PairsData()
+        flags = data[offset]
+        if flags & 0x80: #cała część ma jedną wartość
+            pairs.min_length = data[offset + 1] if self.is_wdl else 0
+            return pairs, offset + 2, (0, 0, 0), flags
+
+        pairs.block_size = data[offset + 1]
+        pairs.index_bits = data[offset + 2]
+        real_blocks = self.read_uint32(offset + 4)
+        blocks = real_blocks + data[offset + 3]
+        max_length = data[offset + 8]
+        min_length = data[offset + 9]
+        lengths = max_length - min_length + 1
+        symbols = self.read_uint16(offset + 10 + 2 * lengths)
+        pairs.offset = offset + 10
+        pairs.symbol_pattern = offset + 12 + 2 * lengths
+        pairs.min_length = min_length
+        next_offset = offset + 12 + 2 * lengths + 3 * symbols + (symbols & 1)
+        indices = (table_size + (1 << pairs.index_bits) - 1) >> pairs.index_bits
+        sizes = (6 * indices, 2 * blocks, (1 << pairs.block_size) * real_blocks)
+
+        #długość symbolu - liczba wartości w nim zapisanych minus jeden (symbol 0xfff po prawej - pojedyncza wartość)
+        symbol_lengths = [None] * symbols
+        for symbol in range(symbols):
+            stack = [symbol]
+            while stack:
+                current = stack[-1]
+                if symbol_lengths[current] is not None:
+                    stack.pop()
+                    continue
+                left, right = self.symbol_children(pairs, current)
+                if right == 0x0fff:
+                    symbol_lengths[current] = 0
+                elif symbol_lengths[left] is None:
+                    stack.append(left)
+                elif symbol_lengths[right] is None:
+                    stack.append(right)
+                else:
+                    symbol_lengths[current] = symbol_lengths[left] + symbol_lengths[right] + 1
+        pairs.symbol_lengths = symbol_lengths
+
+        #najmniejsze kody Huffmana każdej długości, wyrównane do lewej w 64 bitach
+        base = [0] * lengths
+        for i in range(lengths - 2, -1, -1):
+            base[i] = (base[i + 1] + self.read_uint16(pairs.offset + 2 * i) - self.read_uint16(pairs.offset + 2 * i + 2)) // 2
+        for i in range(lengths):
+            base[i] <<= 64 - (min_length + i)
+        pairs.base = base
+        pairs.offset -= 2 * min_length
+        return pairs, next_offset, sizes, flags
+
+    def symbol_children(self, pairs, symbol):
+        data = self.data
+        pattern = pairs.symbol_pattern + 3 * symbol
+        return ((data[pattern + 1] & 0x0f) << 8) | data[pattern], (data[pattern + 2] << 4) | (data[pattern + 1] >> 4)
+
+    '''
+    Położenie tablic indeksów, tablic rozmiarów bloków i danych każdej części tablicy
+    '''
+    def setup_blocks(self, offset, sizes):
+        parts = [(pairs, size) for file_pairs, file_sizes in zip(self.precomp, sizes) for pairs, size in zip(file_pairs, file_sizes)]
+        for pairs, size in parts:
+            pairs.index_table = offset
+            offset += size[0]
+        for pairs, size in parts:
+            pairs.size_table = offset
+            offset += size[1]
+        for pairs, size in parts:
+            offset = (offset + 0x3f) & ~0x3f
+            pairs.data = offset
+            offset += size[2]
+
+    '''
+    Wartość zapisana pod indeksem pozycji: odnalezienie bloku w tablicy indeksów, a w nim symbolu przez dekodowanie
+    kodów Huffmana i rozwinięcie par symboli
+    '''
+    def decompress_pairs(self, pairs, index):
+        if not pairs.index_bits:
+            return pairs.min_length
+        data = self.data
+        main_index = index >> pairs.index_bits
+        literal_index = (index & (1 << pairs.index_bits) - 1) - (1 << (pairs.index_bits - 1))
+        block = self.read_uint32(pairs.index_table + 6 * main_index)
+        literal_index += self.read_uint16(pairs.index_table + 6 * main_index + 4)
+        if literal_index < 0:
+            while literal_index < 0:
+                block -= 1
+                literal_index += self.read_uint16(pairs.size_table + 2 * block) + 1
+        else:
+            while literal_index > self.read_uint16(pairs.size_table + 2 * block):
+                literal_index -= self.read_uint16(pairs.size_table + 2 * block) + 1
+                block += 1
+
+        pointer = pairs.data + (block << pairs.block_size)
+        min_length = pairs.min_length
+        base = pairs.base
+        symbol_lengths = pairs.symbol_lengths
+        code = UINT64_BE.unpack_from(data, pointer)[0]
+        pointer += 8
+        bit_count = 0 #liczba pustych bitów w code
+        while True:
+            length = min_length
+            while code < base[length - min_length]:
+                length += 1
+            symbol = self.read_uint16(pairs.offset + 2 * length) + ((code - base[length - min_length]) >> (64 - length))
+            if literal_index < symbol_lengths[symbol] + 1:
+                break
+            literal_index -= symbol_lengths[symbol] + 1
+            code = (code << length) & 0xffffffffffffffff
+            bit_count += length
+            if bit_count >= 32:
+                bit_count -= 32
+                code |= UINT32_BE.unpack_from(data, pointer)[0] << bit_count
+                pointer += 4
+
+        while symbol_lengths[symbol]:
+            left, right = self.symbol_children(pairs, symbol)
+            if literal_index < symbol_lengths[left] + 1:
+                symbol = left
+            else:
+                literal_index -= symbol_lengths[left] + 1
+                symbol = right
+        left, right = self.symbol_children(pairs, symbol)
+        return left if not self.is_wdl else data[pairs.symbol_pattern + 3 * symbol]
+
+    '''
+    Indeks pozycji bez pionów: pierwsze figury (trzy pojedyncze figury lub para królów) sprowadzane są symetriami
+    planszy do trójkąta a1-d1-d4, pozostałe grupy jednakowych figur kodowane są jako kombinacje wolnych pól
+    '''
+    def encode_piece(self, norm, squares, factor):
+        n = self.num
+        if squares[0] & 0x04:
+            squares[:] = [square ^ 0x07 for square in squares]
+        if squares[0] & 0x20:
+            squares[:] = [square ^ 0x38 for square in squares]
+        for i in range(n):
+            if off_diagonal(squares[i]):
+                break
+        if i < (3 if self.encoding == 0 else 2) and off_diagonal(squares[i]) > 0:
+            squares[:] = [flip_diagonal(square) for square in squares]
+
+        if self.encoding == 0:
+            first, second, third = squares[0], squares[1], squares[2]
+            i = int(second > first)
+            j = int(third > first) + int(third > second)
+            if off_diagonal(first):
+                index = TRIANGLE[first] * 63 * 62 + (second - i) * 62 + (third - j)
+            elif off_diagonal(second):
+                index = 6 * 63 * 62 + DIAGONAL[first] * 28 * 62 + LOWER[second] * 62 + third - j
+            elif off_diagonal(third):
+                index = 6 * 63 * 62 + 4 * 28 * 62 + DIAGONAL[first] * 7 * 28 + (DIAGONAL[second] - i) * 28 + LOWER[third]
+            else:
+                index = (6 * 63 * 62 + 4 * 28 * 62 + 4 * 7 * 28 + DIAGONAL[first] * 7 * 6 + (DIAGONAL[second] - i) * 6
+                         + (DIAGONAL[third] - j))
+            i = 3
+        else:
+            index = KING_PAIR_INDEX[TRIANGLE[squares[0]]][squares[1]]
+            i = 2
+        return index * factor[0] + self.encode_groups(norm, squares, factor, i)
+
+    '''
+    Indeks pozycji z pionami: piony prowadzące (o najniższym FLAP) wyznaczają kolumnę i część tablicy, ich ustawienie
+    kodowane jest osobno, kolejne piony tylko na polach pionów, pozostałe figury jak w encode_piece
+    '''
+    def encode_pawn(self, norm, squares, factor):
+        if squares[0] & 0x04:
+            squares[:] = [square ^ 0x07 for square in squares]
+        leading = self.pawns[0]
+        squares[1:leading] = sorted(squares[1:leading], key=PAWN_TWIST.__getitem__, reverse=True)
+        count = leading - 1
+        index = PAWN_INDEX[count][FLAP[squares[0]]]
+        for i in range(count, 0, -1):
+            index += binomial(PAWN_TWIST[squares[i]], count - i + 1)
+        index *= factor[0]
+
+        i = leading
+        end = i + self.pawns[1]
+        if end > i:
+            squares[i:end] = sorted(squares[i:end])
+            combination = 0
+            for m in range(i, end):
+                square = squares[m]
+                below = sum(square > squares[k] for k in range(i))
+                combination += binomial(square - below - 8, m - i + 1)
+            index += combination * factor[i]
+            i = end
+        return index + self.encode_groups(norm, squares, factor, i)
+
+    '''
+    Indeks pozostałych grup jednakowych figur, od figury i: każda grupa to kombinacja pól niezajętych przez
+    wcześniejsze figury
+    '''
+    def encode_groups(self, norm, squares, factor, i):
+        index = 0
+        while i < self.num:
+            size = norm[i]
+            squares[i:i + size] = sorted(squares[i:i + size])
+            combination = 0
+            for m in range(i, i + size):
+                square = squares[m]
+                below = sum(square > squares[k] for k in range(i))
+                combination += binomial(square - below, m - i + 1)
+            index += combination * factor[i]
+            i += size
+        return index
+
+    '''
+    Odczyt wartości pozycji z tablicy. signature - sygnatura pozycji (białe v czarne), squares - pola figur według kodów
+    (piece_squares_by_code), wdl - wynik pozycji (tylko dla tablic DTZ). Zwraca wynik WDL, wartość DTZ lub None,
+    gdy plik DTZ nie zawiera pozycji z tą stroną na ruchu
+    '''
+    def probe(self, signature, squares, white_to_move, wdl=0):
+        if self.symmetric: #czarne na ruchu - pozycja odbijana jest na białe
+            color_mirror = 0 if white_to_move else 8
+            square_mirror = 0 if white_to_move else 0x38
+            side = 0
+        elif signature != self.key: #kolory zamienione względem pliku
+            color_mirror = 8
+            square_mirror = 0x38
+            side = int(white_to_move)
+        else:
+            color_mirror = square_mirror = 0
+            side = int(not white_to_move)
+
+        if not self.has_pawns: #bez pionów odbicie planszy wykonuje encode_piece
+            square_mirror = 0
+        if self.has_pawns:
+            positions = [square ^ square_mirror for square in squares[self.pieces[0][0][0] ^ color_mirror]]
+            for i in range(1, self.pawns[0]): #pion prowadzący - najniższy FLAP
+                if FLAP[positions[0]] > FLAP[positions[i]]:
+                    positions[0], positions[i] = positions[i], positions[0]
+            file = FILE_TO_FILE[positions[0] & 0x07]
+        else:
+            positions = []
+            file = 0
+        if not self.is_wdl:
+            if self.flags[file] & 1 != side and (self.has_pawns or not self.symmetric):
+                return None
+            side = 0
+        pieces = self.pieces[file][side]
+        while len(positions) < self.num:
+            positions.extend(square ^ square_mirror for square in squares[pieces[len(positions)] ^ color_mirror])
+        if self.has_pawns:
+            index = self.encode_pawn(self.norm[file][side], positions, self.factor[file][side])
+        else:
+            index = self.encode_piece(self.norm[file][side], positions, self.factor[file][side])
+        value = self.decompress_pairs(self.precomp[file][side], index)
+        if self.is_wdl:
+            return value - 2
+
+        flags = self.flags[file]
+        if flags & 0x02:
+            map_index = self.map_indices[file][WDL_TO_MAP[wdl + 2]]
+            if not flags & 0x10:
+                value = self.data[self.map_offset + map_index + value]
+            else:
+                value = self.read_uint16(self.map_offset + 2 * (map_index + value))
+        if not flags & PA_FLAGS[wdl + 2] or wdl & 1:
+            value *= 2
+        return value
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+"""
+Zbiór tablic końcówek z jednego katalogu. Brak katalogu nie jest błędem - sondowane są wtedy tylko pozycje martwe.
+Sondowanie wymaga też tablic pozycji osiągalnych biciem lub promocją (np. dla KRvKP także KRvK, KQvKR i KRvKR)
+"""
+class Tablebase():
+    def __init__(self, directory=TABLEBASE_DIR, max_pieces=TB_PROBE_LIMIT, cache_entries=TB_CACHE_ENTRIES):
+        self.directory = directory
+        self.max_pieces = max_pieces
+        self.paths = {} #(sygnatura, rozszerzenie) -> ścieżka pliku
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                signature, suffix = os.path.splitext(name)
+                if suffix in MAGIC:
+                    self.paths[(signature, suffix)] = os.path.join(directory, name)
+        self.tables = {} #(sygnatura, rozszerzenie) -> SyzygyTable lub None (brak pliku), otwierane przy pierwszej sondzie
+        self.mask = cache_entries - 1
+        self.keys = [0] * cache_entries
+        self.results = [None] * cache_entries
+        self.probes = 0 #sondy pozycji z liczbą figur w limicie
+        self.hits = 0 #sondy zakończone dokładnym wynikiem
+        self.cache_hits = 0 #sondy rozstrzygnięte przez tablicę podręczną (także z nieznanym wynikiem)
+
+    '''
+    Tablica dla sygnatury (lub None, gdy nie ma pliku). Pliki istnieją tylko dla jednej kolejności stron,
+    więc sprawdzana jest też sygnatura z zamienionymi kolorami. Wynik, także brak pliku, jest zapamiętywany
+    '''
+    def open_table(self, signature, suffix=WDL_SUFFIX):
+        key = (signature, suffix)
+        if key in self.tables:
+            return self.tables[key]
+        mirrored = ("v".join(reversed(signature.split("v"))), suffix)
+        path = self.paths.get(key) or self.paths.get(mirrored)
+        table = SyzygyTable(path, suffix) if path is not None else None
+        self.tables[key] = self.tables[mirrored] = table
+        return table
+
+    '''
+    Wartość pozycji zapisana w pliku (bez rozstrzygania bić). Pozycje martwe są remisem bez sięgania do plików
+    '''
+    def probe_table(self, gs, suffix=WDL_SUFFIX, wdl=0):
+        if suffix == WDL_SUFFIX and is_dead_position(gs):
+            return DRAW
+        signature = material_signature(gs)
+        table = self.open_table(signature, suffix)
+        if table is None:
+            raise MissingTableError(signature + suffix)
+        return table.probe(signature, piece_squares_by_code(gs), gs.whiteToMove, wdl)
+
+    '''
+    Wynik WDL z rozstrzygnięciem bić (oprócz bicia w przelocie) przez przeszukiwanie alfa-beta - plik nie musi
+    zawierać poprawnych wartości pozycji, w których bicie jest najlepszym ruchem. Zwraca (wynik, 2 gdy najlepszy jest
+    ruch bijący, 1 w przeciwnym razie)
+    '''
+    def probe_alpha_beta(self, gs, alpha, beta):
+        for move in gs.get_valid_captures():
+            if not move.is_capture or move.en_passant:
+                continue
+            gs.make_move(move)
+            try:
+                score = -self.probe_alpha_beta(gs, -beta, -alpha)[0]
+            finally:
+                gs.undo_move()
+            if score > alpha:
+                if score >= beta:
+                    return score, 2
+                alpha = score
+        score = self.probe_table(gs)
+        if alpha >= score:
+            return alpha, 1 + (alpha > 0)
+        return score, 1
+
+    '''
+    Wynik wszystkich bić w przelocie (lub -3, gdy żadne nie jest możliwe) - tablice nie uwzględniają pola bicia
+    w przelocie
+    '''
+    def en_passant_wdl(self, gs):
+        best = -3
+        for move in gs.get_valid_captures():
+            if move.en_passant:
+                gs.make_move(move)
+                try:
+                    best = max(best, -self.probe_alpha_beta(gs, -2, 2)[0])
+                finally:
+                    gs.undo_move()
+        return best
+
+    def only_en_passant_moves(self, gs):
+        return all(move.en_passant for move in gs.get_valid_moves())
+
+    '''
+    Dokładny wynik WDL pozycji (przy wyzerowanym liczniku 50 ruchów). Zgłasza MissingTableError, gdy brakuje pliku
+    '''
+    def position_wdl(self, gs):
+        wdl = self.probe_alpha_beta(gs, -2, 2)[0]
+        if gs.en_passant_possible == ():
+            return wdl
+        en_passant = self.en_passant_wdl(gs)
+        if en_passant > -3:
+            if en_passant >= wdl:
+                wdl = en_passant
+            elif wdl == DRAW and self.only_en_passant_moves(gs): #jedyny ruch to przegrywające bicie w przelocie
+                wdl = en_passant
+        return wdl
+
+    '''
+    Odległość do wyzerowania licznika 50 ruchów w półruchach (dodatnia - wygrana, ujemna - przegrana, 0 - remis),
+    z dokładnością do jednego półruchu. Plik DTZ zawiera wartości tylko dla jednej strony na ruchu - dla drugiej
+    wartość wyznaczana jest z ruchów prowadzących do pozycji zapisanych w pliku
+    '''
+    def position_dtz_no_en_passant(self, gs):
+        wdl, success = self.probe_alpha_beta(gs, -2, 2)
+        if wdl == DRAW:
+            return 0
+        if success == 2: #najlepszy ruch to bicie
+            return dtz_before_zeroing(wdl)
+        if wdl > 0: #wygrana ruchem pionem (zeruje licznik)
+            for move in gs.get_valid_moves():
+                if move.piece_moved[1] != "p" or move.is_capture:
+                    continue
+                gs.make_move(move)
+                try:
+                    score = -self.position_wdl(gs)
+                finally:
+                    gs.undo_move()
+                if score == wdl:
+                    return 1 if score == WIN else 101
+
+        dtz = self.probe_table(gs, DTZ_SUFFIX, wdl)
+        if dtz is not None:
+            return dtz_before_zeroing(wdl) + (dtz if wdl > 0 else -dtz)
+
+        if wdl > 0:
+            best = 0xffff
+            for move in gs.get_valid_moves():
+                if move.piece_moved[1] == "p" or move.is_capture:
+                    continue
+                gs.make_move(move)
+                try:
+                    score = -self.position_dtz(gs)
+                    if score == 1 and not gs.has_legal_moves() and gs.is_in_check:
+                        best = 1
+                    elif score > 0 and score + 1 < best:
+                        best = score + 1
+                finally:
+                    gs.undo_move()
+            return best
+
+        best = -1
+        for move in gs.get_valid_moves():
+            gs.make_move(move)
+            try:
+                if gs.halfmove_clock == 0:
+                    if wdl == LOSS:
+                        score = -1
+                    else:
+                        score = 0 if self.probe_alpha_beta(gs, 1, 2)[0] == WIN else -101
+                else:
+                    score = -self.position_dtz(gs) - 1
+            finally:
+                gs.undo_move()
+            best = min(best, score)
+        return best
+
+    def position_dtz(self, gs):
+        dtz = self.position_dtz_no_en_passant(gs)
+        if gs.en_passant_possible == ():
+            return dtz
+        en_passant = self.en_passant_wdl(gs)
+        if en_passant > -3:
+            en_passant = WDL_TO_DTZ[en_passant + 2]
+            if dtz < -100:
+                if en_passant >= 0:
+                    dtz = en_passant
+            elif dtz < 0:
+                if en_passant >= 0 or en_passant < -100:
+                    dtz = en_passant
+            elif dtz > 100:
+                if en_passant > 0:
+                    dtz = en_passant
+            elif dtz > 0:
+                if en_passant == 1:
+                    dtz = en_passant
+            elif en_passant >= 0:
+                dtz = en_passant
+            elif self.only_en_passant_moves(gs):
+                dtz = en_passant
+        return dtz
+
+    '''
+    Czy pozycja może być sondowana: liczba figur w limicie, bez prawa do roszady (tablice Syzygy nie obejmują takich pozycji)
+    '''
+    def can_probe(self, gs):
+        return len(gs.piece_squares["w"]) + len(gs.piece_squares["b"]) <= self.max_pieces and not gs.castling_rights
+
+    '''
+    Wynik WDL z perspektywy strony na ruchu lub None, gdy pozycja jest poza limitem figur lub brakuje pliku.
+    Wynik dotyczy pozycji tuż po biciu lub ruchu pionem (licznik 50 ruchów równy 0)
+    '''
+    def probe_wdl(self, gs):
+        if not self.can_probe(gs):
+            return None
+        self.probes += 1
+        key = gs.zobrist_key
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.cache_hits += 1
+            result = self.results[index]
+        else:
+            try:
+                result = self.position_wdl(gs)
+            except MissingTableError:
+                result = None
+            self.keys[index] = key
+            self.results[index] = result
+        if result is not None:
+            self.hits += 1
+        return result
+
+    '''
+    Wartość DTZ pozycji (w półruchach, ze znakiem wyniku) lub None, gdy pozycja jest poza limitem figur lub brakuje pliku
+    '''
+    def probe_dtz(self, gs):
+        if not self.can_probe(gs):
+            return None
+        try:
+            return self.position_dtz(gs)
+        except MissingTableError:
+            return None
+
+    '''
+    DTZ pozycji po ruchu z perspektywy strony wykonującej ruch: ruch zerujący licznik ma wartość według wyniku WDL,
+    mat w jednym ruchu wartość 1
+    '''
+    def move_dtz(self, gs, move):
+        gs.make_move(move)
+        try:
+            if gs.halfmove_clock == 0:
+                dtz = dtz_before_zeroing(-self.position_wdl(gs))
+            else:
+                dtz = -self.position_dtz(gs)
+                dtz += (dtz > 0) - (dtz < 0)
+                if dtz == 2 and not gs.has_legal_moves() and gs.is_in_check:
+                    dtz = 1
+        finally:
+            gs.undo_move()
+        return dtz
+
+    '''
+    Ruchy w korzeniu z najlepszym wynikiem według tablic (root_rank). Przy wygranej zostają ruchy o najmniejszym DTZ
+    (wygrana zostanie zrealizowana przed upływem 50 ruchów), przy przegranej - o największym, przy remisie - wszystkie
+    remisujące. Bez plików DTZ ruchy wybierane są tylko według wyniku WDL. Gdy wynik któregoś ruchu nie jest znany
+    lub sondowanie przekroczy deadline (time.perf_counter), zwraca wszystkie ruchy - o wyborze decyduje wtedy wyszukiwanie
+    '''
+    def filter_root_moves(self, gs, valid_moves, deadline=None):
+        if self.probe_wdl(gs) is None:
+            return valid_moves
+        try:
+            ranks = []
+            for move in valid_moves:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return valid_moves
+                ranks.append(root_rank(self.move_dtz(gs, move), gs.halfmove_clock))
+        except MissingTableError:
+            ranks = []
+            for move in valid_moves:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return valid_moves
+                gs.make_move(move)
+                wdl = self.probe_wdl(gs)
+                gs.undo_move()
+                if wdl is None:
+                    return valid_moves
+                ranks.append(-wdl)
+        best = max(ranks)
+        return [move for move, rank in zip(valid_moves, ranks) if rank == best]
+
+    def hit_rate(self):
+        return 100.0 * self.hits / self.probes if self.probes else 0.0
+
+    def close(self):
+        for table in set(self.tables.values()):
+            if table is not None:
+                table.close()
+        self.tables.clear()
+
+
+"""
+Kontrola sondowania na pozycjach PROBE_CHECKS (python Tablebase.py): WDL i DTZ muszą zgadzać się z wartościami
+referencyjnymi, a ruchy wybrane w korzeniu muszą zachowywać wynik. Przy braku plików tablic kontrola jest pomijana
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kontrola sondowania tablic końcówek Syzygy")
+    parser.add_argument("--directory", default=TABLEBASE_DIR, help="katalog z plikami .rtbw/.rtbz")
+    parser.add_argument("--backend", choices=sorted(Perft.BACKENDS), default="list", help="reprezentacja planszy")
+    args = parser.parse_args(argv)
+
+    tablebase = Tablebase(args.directory)
+    ok = True
+    try:
+        for fen, expected_wdl, expected_dtz in PROBE_CHECKS:
+            gs = Perft.BACKENDS[args.backend].from_fen(fen)
+            try:
+                wdl, dtz = tablebase.probe_wdl(gs), tablebase.probe_dtz(gs)
+            except MissingTableError:
+                wdl = dtz = None
+            if wdl is None:
+                print("%-36s skipped (missing table %s)" % (fen, material_signature(gs)))
+                continue
+            moves = tablebase.filter_root_moves(gs, gs.get_valid_moves())
+            kept = all(root_rank(tablebase.move_dtz(gs, move), gs.halfmove_clock) == root_rank(dtz, gs.halfmove_clock) for move in moves)
+            check_ok = wdl == expected_wdl and dtz == expected_dtz and kept
+            ok = ok and check_ok
+            print("%-36s wdl %2d dtz %4d  %s" % (fen, wdl, dtz, "ok" if check_ok else "MISMATCH (expected wdl %d dtz %d)" % (expected_wdl, expected_dtz)))
+    finally:
+        tablebase.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())